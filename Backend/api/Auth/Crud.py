@@ -1,19 +1,24 @@
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.concurrency import run_in_threadpool
 from model.User import User
 from fastapi import HTTPException,status
 from schemas.User import Create_User_Schema, Read_User_Schema, Update_User_Schama
 from Auth.Security import hash_password
+from Auth.user_cache import get_user_cache
 
-def search_with_email(email:str,db:Session):
-    return db.query(User).filter(User.email==email).first()
+async def search_with_email(email:str,db:AsyncSession):
+    result = await db.execute(select(User).where(User.email==email))
+    return result.scalars().first()
 
 
-def create_user(email:str, password:str, name:str, db:Session):
-    if search_with_email(email=email,db=db):
+async def create_user(email:str, password:str, name:str, db:AsyncSession):
+    if await search_with_email(email=email,db=db):
         raise HTTPException(status_code=status.HTTP_208_ALREADY_REPORTED,detail="User already exists")
     
-    user_hash_password=hash_password(password)
+    # Hashing is deliberately slow; keep it off the event loop
+    user_hash_password=await run_in_threadpool(hash_password, password)
     user=User(
         name=name,
         email=email,
@@ -21,23 +26,23 @@ def create_user(email:str, password:str, name:str, db:Session):
     )
     
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     
     return user
 
 
-def delete_user(id: int , db:Session):
-    user= db.query(User).filter(User.id==id).first()
+async def delete_user(id: int , db:AsyncSession):
+    user= await db.get(User, id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="User not found ")
     
     
-    db.delete(user)
-    db.commit()
-    db.refresh(user)
+    await db.delete(user)
+    await db.commit()
+    # Tokens of a deleted user must stop working right away
+    get_user_cache().invalidate_user(id)
     
     
     return {"Deletion is completed!"}
         
-    
\ No newline at end of file
@@ -10,4 +10,83 @@ class Config:
     ACCESS_TOKEN_EXPIRE_MINUTES:str=os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES")
     REFRESH_TOKEN_EXPIRE_DAYS:str=os.getenv("REFRESH_TOKEN_EXPIRE_DAYS")
     
+    # Signed share links (the secret defaults to SECRET_KEY)
+    SIGNED_URL_SECRET:str=os.getenv("SIGNED_URL_SECRET") or os.getenv("SECRET_KEY")
+    SIGNED_URL_DEFAULT_EXPIRY_SECONDS:int=int(os.getenv("SIGNED_URL_DEFAULT_EXPIRY_SECONDS","3600"))
+    SIGNED_URL_MAX_EXPIRY_SECONDS:int=int(os.getenv("SIGNED_URL_MAX_EXPIRY_SECONDS","604800"))
+    
+    # Storage backend: "local" or "blob" (defaults to blob when a token is set)
+    STORAGE_BACKEND:str=os.getenv("STORAGE_BACKEND")
+    BLOB_READ_WRITE_TOKEN:str=os.getenv("BLOB_READ_WRITE_TOKEN")
+    BLOB_BASE_URL:str=os.getenv("BLOB_BASE_URL","https://blob.vercel-storage.com")
+    BLOB_MAX_CONNECTIONS:int=int(os.getenv("BLOB_MAX_CONNECTIONS","100"))
+    BLOB_TIMEOUT_SECONDS:float=float(os.getenv("BLOB_TIMEOUT_SECONDS","60"))
+    BLOB_CONNECT_TIMEOUT_SECONDS:float=float(os.getenv("BLOB_CONNECT_TIMEOUT_SECONDS","5"))
+    BLOB_KEEPALIVE_SECONDS:float=float(os.getenv("BLOB_KEEPALIVE_SECONDS","30"))
+    # Retries of idempotent blob calls, with exponential backoff and jitter (0 disables)
+    BLOB_MAX_RETRIES:int=int(os.getenv("BLOB_MAX_RETRIES","3"))
+    BLOB_RETRY_BASE_SECONDS:float=float(os.getenv("BLOB_RETRY_BASE_SECONDS","0.1"))
+    BLOB_RETRY_MAX_SECONDS:float=float(os.getenv("BLOB_RETRY_MAX_SECONDS","2"))
+    # Writes up to this size are held in memory so they can be retried; larger ones stream once
+    BLOB_RETRY_BUFFER_MB:int=int(os.getenv("BLOB_RETRY_BUFFER_MB","8"))
+    LOCAL_STORAGE_PATH:str=os.getenv("LOCAL_STORAGE_PATH","./.storage")
+    STORAGE_IO_THREADS:int=int(os.getenv("STORAGE_IO_THREADS","16"))
+    # Read-through cache of remote blob objects: small ones in memory, larger on local disk (0 MB disables a tier)
+    OBJECT_CACHE_MEMORY_MB:int=int(os.getenv("OBJECT_CACHE_MEMORY_MB","64"))
+    OBJECT_CACHE_MEMORY_MAX_OBJECT_KB:int=int(os.getenv("OBJECT_CACHE_MEMORY_MAX_OBJECT_KB","512"))
+    OBJECT_CACHE_DISK_MB:int=int(os.getenv("OBJECT_CACHE_DISK_MB","1024"))
+    OBJECT_CACHE_DISK_MAX_OBJECT_MB:int=int(os.getenv("OBJECT_CACHE_DISK_MAX_OBJECT_MB","64"))
+    OBJECT_CACHE_PATH:str=os.getenv("OBJECT_CACHE_PATH","./.object_cache")
+    # Authenticated-user cache (0 disables)
+    AUTH_CACHE_TTL_SECONDS:float=float(os.getenv("AUTH_CACHE_TTL_SECONDS","60"))
+    AUTH_CACHE_MAX_SIZE:int=int(os.getenv("AUTH_CACHE_MAX_SIZE","10000"))
+    # Image thumbnails: fitted sizes in px, WebP quality, worker processes (0 = threads)
+    THUMBNAIL_SIZES:str=os.getenv("THUMBNAIL_SIZES","128,256,512")
+    THUMBNAIL_QUALITY:int=int(os.getenv("THUMBNAIL_QUALITY","80"))
+    THUMBNAIL_WORKERS:int=int(os.getenv("THUMBNAIL_WORKERS","2"))
+    THUMBNAIL_MAX_SOURCE_MB:int=int(os.getenv("THUMBNAIL_MAX_SOURCE_MB","50"))
+    # On-the-fly image transforms, cached on local disk
+    TRANSFORM_CACHE_PATH:str=os.getenv("TRANSFORM_CACHE_PATH","./.transform_cache")
+    TRANSFORM_CACHE_MAX_MB:int=int(os.getenv("TRANSFORM_CACHE_MAX_MB","512"))
+    TRANSFORM_MAX_DIMENSION:int=int(os.getenv("TRANSFORM_MAX_DIMENSION","4096"))
+    QUOTA_RECONCILE_INTERVAL_SECONDS:float=float(os.getenv("QUOTA_RECONCILE_INTERVAL_SECONDS","0"))
+    # Deleted files stay restorable this long, then a purge pass removes them (0 = on the next pass)
+    FILE_RESTORE_WINDOW_HOURS:float=float(os.getenv("FILE_RESTORE_WINDOW_HOURS","72"))
+    FILE_PURGE_INTERVAL_SECONDS:float=float(os.getenv("FILE_PURGE_INTERVAL_SECONDS","300"))
+    # Multipart uploads not completed this long after they started are aborted by the purge pass (0 = never)
+    UPLOAD_SESSION_TTL_HOURS:float=float(os.getenv("UPLOAD_SESSION_TTL_HOURS","24"))
+    # Storage vs DB reconciliation, see Services.storage_gc (0 = only via its CLI)
+    STORAGE_GC_INTERVAL_SECONDS:float=float(os.getenv("STORAGE_GC_INTERVAL_SECONDS","0"))
+    STORAGE_GC_GRACE_SECONDS:float=float(os.getenv("STORAGE_GC_GRACE_SECONDS","3600"))
+    # Background jobs: workers inside the app (0 = run "python -m Services.job_queue work" instead)
+    JOB_IN_APP_WORKERS:int=int(os.getenv("JOB_IN_APP_WORKERS","1"))
+    JOB_CONCURRENCY:int=int(os.getenv("JOB_CONCURRENCY","4"))
+    JOB_KIND_CONCURRENCY:str=os.getenv("JOB_KIND_CONCURRENCY","thumbnails=2,virus_scan=1,video=1")
+    JOB_MAX_ATTEMPTS:int=int(os.getenv("JOB_MAX_ATTEMPTS","5"))
+    JOB_RETRY_BASE_SECONDS:float=float(os.getenv("JOB_RETRY_BASE_SECONDS","5"))
+    JOB_RETRY_MAX_SECONDS:float=float(os.getenv("JOB_RETRY_MAX_SECONDS","600"))
+    JOB_TIMEOUT_SECONDS:float=float(os.getenv("JOB_TIMEOUT_SECONDS","300"))
+    JOB_LOCK_TIMEOUT_SECONDS:float=float(os.getenv("JOB_LOCK_TIMEOUT_SECONDS","900"))
+    JOB_POLL_INTERVAL_SECONDS:float=float(os.getenv("JOB_POLL_INTERVAL_SECONDS","2"))
+    JOB_MAINTENANCE_INTERVAL_SECONDS:float=float(os.getenv("JOB_MAINTENANCE_INTERVAL_SECONDS","60"))
+    JOB_RETENTION_HOURS:float=float(os.getenv("JOB_RETENTION_HOURS","168"))
+    # Digests run on their own threads (0 = one per CPU); objects re-read at once by the verifier
+    HASH_THREADS:int=int(os.getenv("HASH_THREADS","0"))
+    VERIFY_CONCURRENCY:int=int(os.getenv("VERIFY_CONCURRENCY","8"))
+    # Post-upload checks: re-read and re-hash stored content; pipe content into a scanner
+    JOB_VERIFY_UPLOADS:bool=os.getenv("JOB_VERIFY_UPLOADS","false").lower() in ("1","true","yes")
+    VIRUS_SCAN_COMMAND:str=os.getenv("VIRUS_SCAN_COMMAND")
+    # Video pipeline: probe mp4/avi uploads and cut them into HLS segments with ffprobe/ffmpeg
+    VIDEO_PIPELINE:bool=os.getenv("VIDEO_PIPELINE","false").lower() in ("1","true","yes")
+    FFMPEG_PATH:str=os.getenv("FFMPEG_PATH","ffmpeg")
+    FFPROBE_PATH:str=os.getenv("FFPROBE_PATH","ffprobe")
+    VIDEO_SEGMENT_SECONDS:int=int(os.getenv("VIDEO_SEGMENT_SECONDS","6"))
+    VIDEO_MAX_HEIGHT:int=int(os.getenv("VIDEO_MAX_HEIGHT","720"))
+    VIDEO_MAX_SOURCE_MB:int=int(os.getenv("VIDEO_MAX_SOURCE_MB","2048"))
+    VIDEO_JOB_TIMEOUT_SECONDS:float=float(os.getenv("VIDEO_JOB_TIMEOUT_SECONDS","3600"))
+    VIDEO_URL_EXPIRY_SECONDS:int=int(os.getenv("VIDEO_URL_EXPIRY_SECONDS","21600"))
+    # Prometheus metrics; /metrics is only served once a token is set, which scrapers send as a Bearer token
+    METRICS_ENABLED:bool=os.getenv("METRICS_ENABLED","true").lower() in ("1","true","yes")
+    METRICS_TOKEN:str=os.getenv("METRICS_TOKEN")
+    
 settings=Config()
@@ -4,8 +4,9 @@ from Auth.config import settings
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from api.database import get_db
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from model.User import User
+from Auth.user_cache import CurrentUser, get_user_cache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
@@ -28,13 +29,19 @@ def create_token(data: dict, expire_minutes: int):
 
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> CurrentUser:
     credential_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Unauthorized user",
         headers={"WWW-Authenticate": "Bearer"}
     )
 
+    # Repeated callers are served from memory, no decode and no DB round trip
+    cache = get_user_cache()
+    cached = cache.get(token)
+    if cached:
+        return cached
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id = payload.get("sub")
@@ -43,8 +50,10 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credential_exception
 
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = await db.get(User, int(user_id))
     if not user:
         raise credential_exception
 
-    return user
+    current_user = CurrentUser(id=user.id, email=user.email, name=user.name)
+    cache.put(token, current_user, token_expires_at=payload.get("exp"))
+    return current_user
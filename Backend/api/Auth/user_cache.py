@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """
+    The authenticated principal handed to endpoints. It carries only what the
+    services read, so it can be cached and shared between requests without a
+    DB session.
+    """
+    id: int
+    email: str
+    name: str
+
+
+class UserCache:
+    """
+    Bounded LRU of token -> principal with a TTL. A hit skips both the JWT
+    decode and the users lookup. Entries never outlive their token's expiry,
+    and invalidate_user() drops every token of a user, e.g. when the user is
+    deleted or changes their password. Invalidation is per process, so the
+    TTL bounds how stale other instances can be.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 60):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, token: str) -> Optional[CurrentUser]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= now:
+                del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def put(self, token: str, user: CurrentUser, token_expires_at: Optional[float] = None):
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        with self._lock:
+            self._entries[token] = (user, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in [token for token, (user, _) in self._entries.items() if user.id == user_id]:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+# Singleton instance
+_user_cache = None
+
+def get_user_cache() -> UserCache:
+    global _user_cache
+    if _user_cache is None:
+        from Auth.config import settings
+        _user_cache = UserCache(
+            max_size=settings.AUTH_CACHE_MAX_SIZE,
+            ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS
+        )
+        from Helpers.metrics import register_cache
+        register_cache("auth", _user_cache)
+    return _user_cache
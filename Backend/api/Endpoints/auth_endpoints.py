@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import jwt, JWTError
 from Auth.Security import hash_password
@@ -29,14 +30,14 @@ auth_endpoints = APIRouter(prefix="/api/auth", tags=["Authentication"])
 # SIGNUP
 # =========================
 @auth_endpoints.post("/signup", status_code=status.HTTP_201_CREATED)
-def signup(user: Create_User_Schema, db: Session = Depends(get_db)):
-    existing_user = search_with_email(user.email, db)
+async def signup(user: Create_User_Schema, db: AsyncSession = Depends(get_db)):
+    existing_user = await search_with_email(user.email, db)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="Email already registered"
         )
-    new_user = create_user(
+    new_user = await create_user(
         email=user.email,
         password=user.password,
         name=user.name,
@@ -53,13 +54,14 @@ def signup(user: Create_User_Schema, db: Session = Depends(get_db)):
 # LOGIN
 # =========================
 @auth_endpoints.post("/login", response_model=TokenResponse)
-def login(
+async def login(
     credentials: LoginSchema,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = search_with_email(credentials.username, db)
+    user = await search_with_email(credentials.username, db)
 
-    if not user or not verify_password(credentials.password, user.password):
+    # Verifying the hash is deliberately slow; keep it off the event loop
+    if not user or not await run_in_threadpool(verify_password, credentials.password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
@@ -85,7 +87,7 @@ def login(
 # REFRESH TOKEN
 # =========================
 @auth_endpoints.post("/refresh", response_model=TokenResponse)
-def refresh_token_endpoint(request_body: dict, db: Session = Depends(get_db)):
+def refresh_token_endpoint(request_body: dict, db: AsyncSession = Depends(get_db)):
     refresh_token = request_body.get("refresh_token")
     
     if not refresh_token:
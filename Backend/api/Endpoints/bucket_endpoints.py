@@ -1,11 +1,14 @@
-from fastapi import APIRouter,HTTPException,status
+from fastapi import APIRouter,HTTPException,Query,status
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
 from schemas.Bucket import Bucket_create_Schema, Bucket_Response_schema, Bucket_update_Schema
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
-from database import get_db
+from api.database import get_db
 from Auth.token import get_current_user
 from model.User import User
 from Services.bucket_service import BucketService
+from Helpers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, stream_json_array
 bucket_router=APIRouter(
     prefix="/buckets",
     tags=["Buckets"]
@@ -13,19 +16,32 @@ bucket_router=APIRouter(
 
 # Create
 @bucket_router.post("",response_model=Bucket_Response_schema)
-def create_bucket(bucket:Bucket_create_Schema, db:Session=Depends(get_db),user:User=Depends(get_current_user)):
+async def create_bucket(bucket:Bucket_create_Schema, db:AsyncSession=Depends(get_db),user:User=Depends(get_current_user)):
     bucketservice= BucketService(db=db)
-    return bucketservice.create_bucket(user=user,name=bucket.name,storage_limit=bucket.storage_limit)
+    return await bucketservice.create_bucket(user=user,name=bucket.name,storage_limit=bucket.storage_limit,is_public=bucket.is_public,compression=bucket.compression)
 
 
 
 # Get All
 @bucket_router.get("",
     response_model=list[Bucket_Response_schema])
-def list_buckets(user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)):
+async def list_buckets(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort: Literal["created_at", "name"] = "created_at",
+    order: Literal["asc", "desc"] = "asc",
+    name_prefix: Optional[str] = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)):
     service = BucketService(db=db)
-    return service.list_buckets(user=user)
+    buckets, next_cursor = await service.list_buckets(
+        user=user, limit=limit, cursor=cursor, sort=sort, order=order, name_prefix=name_prefix
+    )
+
+    # Stream the page; the next page's cursor goes in a header
+    items = (Bucket_Response_schema.model_validate(bucket).model_dump_json() for bucket in buckets)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return StreamingResponse(stream_json_array(items), media_type="application/json", headers=headers)
 
 
 # GEt by ID
@@ -33,13 +49,13 @@ def list_buckets(user: User = Depends(get_current_user),
     "/{bucket_id}",
     response_model=Bucket_Response_schema
 )
-def get_bucket(
+async def get_bucket(
     bucket_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     service = BucketService(db=db)
-    return service.get_bucket(user=user, bucket_id=bucket_id)
+    return await service.get_bucket(user=user, bucket_id=bucket_id)
 
 
 # Delete
@@ -47,13 +63,13 @@ def get_bucket(
     "/{bucket_id}",
     status_code=status.HTTP_204_NO_CONTENT
 )
-def delete_bucket(
+async def delete_bucket(
     bucket_id: int,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     service = BucketService(db=db)
-    service.delete_bucket(user=user, bucket_id=bucket_id)
+    await service.delete_bucket(user=user, bucket_id=bucket_id)
 
 
 
@@ -64,15 +80,18 @@ def delete_bucket(
     "/{bucket_id}",
     response_model=Bucket_Response_schema
 )
-def update_bucket(
+async def update_bucket(
     bucket_id: int,
     data: Bucket_update_Schema,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     service = BucketService(db=db)
-    return service.update_bucket(
+    return await service.update_bucket(
         user=user,
         bucket_id=bucket_id,
-        data=data
+        name=data.name,
+        storage_limit=data.storage_limit,
+        is_public=data.is_public,
+        compression=data.compression
     )
\ No newline at end of file
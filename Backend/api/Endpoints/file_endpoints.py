@@ -1,13 +1,22 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
-from fastapi.responses import FileResponse, StreamingResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Header, Query, Request, status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from model.User import User
-from model.Bucket import Bucket
-from model.File import File as FileModel
-from database import get_db
+from api.database import get_db
 from Auth.token import get_current_user
+from Helpers.http_range import RangeNotSatisfiable, parse_range_header, if_range_matches, http_date, content_etag, is_not_modified
+from Helpers.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, stream_json_array
+from Helpers.signed_urls import InvalidSignedURL, SignedObject, sign as sign_url, verify as verify_url, sign_claims, verify_claims
+from Helpers.compression import accepts_encoding, decompress_chunks
+from schemas.Batch import Batch_Delete_Schema, Batch_Move_Schema, Batch_Result_Schema
+from schemas.File import Signed_URL_Schema
+from schemas.Video import Video_Response_Schema
+from Auth.config import settings
+from typing import List, Literal, Optional
+from datetime import datetime, timezone
+import json
+import time
 import traceback
-import io
 
 file_router = APIRouter(prefix="/api")
 
@@ -20,44 +29,39 @@ MAX_FILE_SIZE = 4 * 1024 * 1024  # 4MB for Vercel serverless
 async def upload_file(
     bucket_id: int,
     file: UploadFile = File(...),
-    db: Session = Depends(get_db),
+    content_sha256: Optional[str] = Header(None, alias="X-Content-SHA256"),
+    db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     try:
-        # Validate bucket exists
-        bucket = db.query(Bucket).filter(Bucket.id == bucket_id).first()
-        if not bucket:
-            raise HTTPException(status_code=404, detail=f"Bucket {bucket_id} not found")
-        
-        # Check ownership
-        if bucket.user_id != user.id:
-            raise HTTPException(status_code=403, detail="Access denied to this bucket")
-        
-        # Read file content
-        content = await file.read()
-        
-        # Validate size
-        if len(content) > MAX_FILE_SIZE:
+        # Reject early when the declared size is already too big
+        if file.size is not None and file.size > MAX_FILE_SIZE:
             raise HTTPException(status_code=413, detail=f"File too large. Max size: 4MB")
         
-        # Save using storage service
+        # Save using storage service; the body is streamed in chunks and the
+        # size limit is enforced again while reading
         from Services.Storage_services import StorageService
         storage = StorageService(db=db)
         
         file_data = {
             "name": file.filename,
-            "content": content,
+            "stream": file,
             "content_type": file.content_type,
-            "file_size": len(content)
+            "file_size": file.size,
+            "max_size": MAX_FILE_SIZE,
+            "sha256_hash": content_sha256
         }
         
-        result = storage.upload_file(user=user, bucket_id=bucket_id, file=file_data)
+        result = await storage.upload_file(user=user, bucket_id=bucket_id, file=file_data)
         
         return {
             "id": result.id,
             "file_name": result.file_name,
             "file_size": result.file_size,
+            "stored_size": result.stored_size,
             "bucket_id": result.bucket_id,
+            "sha256_hash": result.sha256_hash,
+            "md5_hash": result.md5_hash,
             "created_at": result.created_at.isoformat() if result.created_at else None
         }
         
@@ -69,65 +73,560 @@ async def upload_file(
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
+# ----------------------------
+# Upload several files in one request
+# ----------------------------
+@file_router.post("/buckets/{bucket_id}/files/batch", response_model=Batch_Result_Schema)
+async def upload_files_batch(
+    bucket_id: int,
+    files: List[UploadFile] = File(...),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    from Services.batch_service import BatchFileService
+    service = BatchFileService(db=db)
+    return await service.upload_files(
+        user=user,
+        bucket_id=bucket_id,
+        files=[
+            {
+                "name": file.filename,
+                "stream": file,
+                "content_type": file.content_type,
+                "file_size": file.size,
+                "max_size": MAX_FILE_SIZE
+            }
+            for file in files
+        ]
+    )
+
+
+# ----------------------------
+# Delete many files (by id, or by bucket + filters)
+# ----------------------------
+@file_router.post("/files/batch/delete", response_model=Batch_Result_Schema)
+async def delete_files_batch(data: Batch_Delete_Schema,
+                             user: User = Depends(get_current_user),
+                             db: AsyncSession = Depends(get_db)):
+    from Services.batch_service import BatchFileService
+    service = BatchFileService(db=db)
+    return await service.delete_files(
+        user=user,
+        file_ids=data.file_ids,
+        bucket_id=data.bucket_id,
+        filters=data.filters.model_dump() if data.filters else None
+    )
+
+
+# ----------------------------
+# Move many files to another bucket
+# ----------------------------
+@file_router.post("/files/batch/move", response_model=Batch_Result_Schema)
+async def move_files_batch(data: Batch_Move_Schema,
+                           user: User = Depends(get_current_user),
+                           db: AsyncSession = Depends(get_db)):
+    from Services.batch_service import BatchFileService
+    service = BatchFileService(db=db)
+    return await service.move_files(user=user, file_ids=data.file_ids, target_bucket_id=data.target_bucket_id)
+
+
 # ----------------------------
 # List files in a bucket
 # ----------------------------
 @file_router.get("/buckets/{bucket_id}/files")
-def list_files(bucket_id: int,
+async def list_files(bucket_id: int,
+               limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+               cursor: Optional[str] = None,
+               sort: Literal["created_at", "file_name", "file_size"] = "created_at",
+               order: Literal["asc", "desc"] = "asc",
+               content_type: Optional[str] = None,
+               name_prefix: Optional[str] = None,
+               min_size: Optional[int] = Query(None, ge=0),
+               max_size: Optional[int] = Query(None, ge=0),
+               created_after: Optional[datetime] = None,
+               created_before: Optional[datetime] = None,
+               deleted: bool = False,
                user: User = Depends(get_current_user),
-               db: Session = Depends(get_db)):
+               db: AsyncSession = Depends(get_db)):
     from Services.File_Services import list_files_service
-    return list_files_service(user=user, bucket_id=bucket_id, db=db)
+    rows, next_cursor = await list_files_service(
+        user=user, bucket_id=bucket_id, db=db,
+        limit=limit, cursor=cursor, sort=sort, order=order,
+        content_type=content_type, name_prefix=name_prefix,
+        min_size=min_size, max_size=max_size,
+        created_after=created_after, created_before=created_before,
+        deleted=deleted
+    )
+
+    def item(f) -> dict:
+        row = {
+            "id": f.id,
+            "file_name": f.file_name,
+            "file_size": f.file_size,
+            "content_type": f.file_content_type,
+            "created_at": f.created_at.isoformat()
+        }
+        if deleted:
+            row["deleted_at"] = f.deleted_at.isoformat() if f.deleted_at else None
+        return row
+
+    # Body stays a plain JSON array; the next page's cursor goes in a header
+    items = (json.dumps(item(f)) for f in rows)
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return StreamingResponse(stream_json_array(items), media_type="application/json", headers=headers)
+
+
+def _response_encoding(compression: Optional[str], accept_encoding: Optional[str], range_header: Optional[str]) -> Optional[str]:
+    """
+    The Content-Encoding to send a stored file with: the encoding it is
+    compressed with at rest, passed through as is, when the client accepts it
+    and asks for the whole file. None means send the file decoded.
+    """
+    if compression and not range_header and accepts_encoding(accept_encoding, compression):
+        return compression
+    return None
+
+
+def _send_stored_file(
+    file_path: str,
+    file_name: str,
+    content_type: Optional[str],
+    file_size: int,
+    cache_headers: dict,
+    range_header: Optional[str] = None,
+    if_range: Optional[str] = None,
+    compression: Optional[str] = None,
+    stored_size: Optional[int] = None,
+    encoding: Optional[str] = None
+):
+    """
+    Stream a stored object, honouring Range/If-Range against the validators in
+    cache_headers. Objects compressed at rest are sent with Content-Encoding
+    when encoding is set (see _response_encoding), else decoded on the fly.
+    """
+    from Helpers.cloud_storage import get_cloud_storage_manager
+    storage = get_cloud_storage_manager()
+    stored_size = file_size if stored_size is None else stored_size
+    
+    # Local storage: FileResponse handles Range/If-Range and sends straight from disk
+    try:
+        local_path = storage.local_path(file_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found on storage")
+    if local_path is not None and (compression is None or encoding):
+        return FileResponse(
+            local_path,
+            media_type=content_type,
+            filename=file_name,
+            headers={**cache_headers, "Content-Encoding": encoding} if encoding else cache_headers
+        )
+    
+    # Blob storage (or a compressed local file to decode): proxy only the requested byte window
+    headers = {
+        **cache_headers,
+        "Content-Disposition": f"attachment; filename={file_name}",
+        "Accept-Ranges": "bytes"
+    }
+    
+    if encoding:
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(stored_size)
+        return StreamingResponse(
+            storage.iter_file(file_path, size=stored_size),
+            media_type=content_type,
+            headers=headers
+        )
+    
+    def read(start: int = 0, end: Optional[int] = None):
+        if compression:
+            # Compressed data can't be seeked: decode from the start, stop after end
+            return decompress_chunks(storage.iter_file(file_path, size=stored_size), compression, start=start, end=end)
+        return storage.iter_file(file_path, start=start, end=end, size=file_size)
+    
+    byte_range = None
+    if if_range_matches(if_range, etag=cache_headers.get("ETag"), last_modified=cache_headers.get("Last-Modified")):
+        try:
+            byte_range = parse_range_header(range_header, file_size)
+        except RangeNotSatisfiable:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{file_size}"}
+            )
+    
+    if byte_range is None:
+        headers["Content-Length"] = str(file_size)
+        return StreamingResponse(
+            read(),
+            media_type=content_type,
+            headers=headers
+        )
+    
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        read(start, end),
+        status_code=206,
+        media_type=content_type,
+        headers=headers
+    )
+
+
+def _validator_headers(cache_control: str, etag: Optional[str], last_modified: Optional[str], compressed: bool = False) -> dict:
+    headers = {"Cache-Control": cache_control}
+    if compressed:
+        # The representation depends on whether the client takes the stored encoding
+        headers["Vary"] = "Accept-Encoding"
+    if etag:
+        headers["ETag"] = etag
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    return headers
 
 
 # ----------------------------
 # Download a file
 # ----------------------------
 @file_router.get("/files/{file_id}/download")
-def download_file(file_id: int,
-                  user: User = Depends(get_current_user),
-                  db: Session = Depends(get_db)):
-    # Get file from database
-    file = db.query(FileModel).filter(FileModel.id == file_id).first()
-    if not file:
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    # Check bucket ownership
-    bucket = db.query(Bucket).filter(Bucket.id == file.bucket_id).first()
-    if bucket.user_id != user.id:
-        raise HTTPException(status_code=403, detail="Access denied")
-    
-    # Read file from Vercel Blob
+async def download_file(file_id: int,
+                        range_header: Optional[str] = Header(None, alias="Range"),
+                        if_range: Optional[str] = Header(None, alias="If-Range"),
+                        if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+                        if_modified_since: Optional[str] = Header(None, alias="If-Modified-Since"),
+                        accept_encoding: Optional[str] = Header(None, alias="Accept-Encoding"),
+                        user: User = Depends(get_current_user),
+                        db: AsyncSession = Depends(get_db)):
+    # Get file from database; ownership is checked in the same query
+    from Services.file_repository import FileRepository
+    file = await FileRepository(db=db).get_owned_file(user_id=user.id, file_id=file_id)
+    
+    # Validators come from the DB row: the content hash and upload time
+    encoding = _response_encoding(file.compression, accept_encoding, range_header)
+    etag = content_etag(file.sha256_hash, encoding)
+    cache_headers = _validator_headers(
+        "public, max-age=3600" if file.bucket.is_public else "private, no-cache",
+        etag=etag,
+        last_modified=http_date(file.created_at) if file.created_at else None,
+        compressed=file.compression is not None
+    )
+    
+    # Revalidation: answer 304 without touching the storage backend
+    if is_not_modified(if_none_match, if_modified_since, etag=etag, last_modified=file.created_at):
+        return Response(status_code=304, headers=cache_headers)
+    
+    return _send_stored_file(
+        file_path=file.file_path,
+        file_name=file.file_name,
+        content_type=file.file_content_type,
+        file_size=file.file_size,
+        cache_headers=cache_headers,
+        range_header=range_header,
+        if_range=if_range,
+        compression=file.compression,
+        stored_size=file.stored_size,
+        encoding=encoding
+    )
+
+
+# ----------------------------
+# Create a signed share link
+# ----------------------------
+@file_router.post("/files/{file_id}/share", response_model=Signed_URL_Schema)
+async def share_file(file_id: int,
+                     request: Request,
+                     expires_in: Optional[int] = Query(None, ge=1, le=settings.SIGNED_URL_MAX_EXPIRY_SECONDS, description="Link lifetime in seconds"),
+                     user: User = Depends(get_current_user),
+                     db: AsyncSession = Depends(get_db)):
+    from Services.file_repository import FileRepository
+    file = await FileRepository(db=db).get_owned_file(user_id=user.id, file_id=file_id)
+    
+    expires_at = int(time.time()) + (expires_in or settings.SIGNED_URL_DEFAULT_EXPIRY_SECONDS)
+    created_at = file.created_at
+    if created_at and created_at.tzinfo is None:
+        # SQLite hands back naive UTC
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    token = sign_url(
+        SignedObject(
+            file_id=file.id,
+            file_path=file.file_path,
+            content_type=file.file_content_type,
+            file_name=file.file_name,
+            file_size=file.file_size,
+            sha256_hash=file.sha256_hash,
+            created_at=int(created_at.timestamp()) if created_at else None,
+            is_public=bool(file.is_public and file.bucket.is_public),
+            expires_at=expires_at,
+            stored_size=file.stored_size,
+            compression=file.compression
+        ),
+        settings.SIGNED_URL_SECRET
+    )
+    return {
+        "url": str(request.url_for("download_shared_file", token=token)),
+        "expires_at": datetime.fromtimestamp(expires_at, tz=timezone.utc)
+    }
+
+
+# ----------------------------
+# Download through a share link (no auth, no DB)
+# ----------------------------
+@file_router.get("/shared/{token}", name="download_shared_file")
+async def download_shared_file(token: str,
+                               range_header: Optional[str] = Header(None, alias="Range"),
+                               if_range: Optional[str] = Header(None, alias="If-Range"),
+                               if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+                               if_modified_since: Optional[str] = Header(None, alias="If-Modified-Since"),
+                               accept_encoding: Optional[str] = Header(None, alias="Accept-Encoding")):
+    # The token carries everything needed; only its signature and expiry are checked
+    try:
+        shared = verify_url(token, settings.SIGNED_URL_SECRET)
+    except InvalidSignedURL as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    
+    # Caches may keep the response for as long as the link is valid
+    max_age = max(int(shared.expires_at - time.time()), 0)
+    created_at = datetime.fromtimestamp(shared.created_at, tz=timezone.utc) if shared.created_at else None
+    encoding = _response_encoding(shared.compression, accept_encoding, range_header)
+    etag = content_etag(shared.sha256_hash, encoding)
+    cache_headers = _validator_headers(
+        f"{'public' if shared.is_public else 'private'}, max-age={max_age}",
+        etag=etag,
+        last_modified=http_date(created_at) if created_at else None,
+        compressed=shared.compression is not None
+    )
+    
+    if is_not_modified(if_none_match, if_modified_since, etag=etag, last_modified=created_at):
+        return Response(status_code=304, headers=cache_headers)
+    
+    return _send_stored_file(
+        file_path=shared.file_path,
+        file_name=shared.file_name,
+        content_type=shared.content_type,
+        file_size=shared.file_size,
+        cache_headers=cache_headers,
+        range_header=range_header,
+        if_range=if_range,
+        compression=shared.compression,
+        stored_size=shared.stored_size,
+        encoding=encoding
+    )
+
+
+# ----------------------------
+# Thumbnail of an image file
+# ----------------------------
+@file_router.get("/files/{file_id}/thumbnail")
+async def get_thumbnail(file_id: int,
+                        size: Optional[int] = Query(None, ge=1, description="Longest edge in px; the nearest generated size at least this big is served"),
+                        user: User = Depends(get_current_user),
+                        db: AsyncSession = Depends(get_db)):
+    from Services.thumbnail_service import ThumbnailService
+    thumbnail = await ThumbnailService(db=db).get_thumbnail(user=user, file_id=file_id, size=size)
+    
     from Helpers.cloud_storage import get_cloud_storage_manager
     storage = get_cloud_storage_manager()
-    content = storage.read_file(file.file_path)
     
-    # Stream the file
+    # Content-addressed and never rewritten, so browsers may keep it
+    headers = {"Cache-Control": "private, max-age=86400"}
+    try:
+        local_path = storage.local_path(thumbnail.thumbnail_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Thumbnail not found on storage")
+    if local_path is not None:
+        return FileResponse(local_path, media_type=thumbnail.content_type, headers=headers)
+    
+    headers["Content-Length"] = str(thumbnail.thumbnail_size)
     return StreamingResponse(
-        io.BytesIO(content),
-        media_type=file.file_content_type,
-        headers={"Content-Disposition": f"attachment; filename={file.file_name}"}
+        storage.iter_file(thumbnail.thumbnail_path, size=thumbnail.thumbnail_size),
+        media_type=thumbnail.content_type,
+        headers=headers
+    )
+
+
+# ----------------------------
+# Video metadata and its HLS playlist link
+# ----------------------------
+@file_router.get("/files/{file_id}/video", response_model=Video_Response_Schema)
+async def get_video(file_id: int,
+                    request: Request,
+                    response: Response,
+                    user: User = Depends(get_current_user),
+                    db: AsyncSession = Depends(get_db)):
+    from Services.video_service import VideoService
+    file, video, error = await VideoService(db=db).get_file_video(user=user, file_id=file_id)
+    if error is not None:
+        raise HTTPException(status_code=422, detail=f"Video processing failed: {error}")
+    
+    body = {"file_id": file.id, "status": "processing"}
+    if video is not None:
+        for column in ("duration", "width", "height", "video_codec", "audio_codec", "bit_rate", "format_name"):
+            body[column] = getattr(video, column)
+    if video is None or video.segment_count is None:
+        # Queued or running; poll again
+        response.status_code = status.HTTP_202_ACCEPTED
+        return body
+    
+    # Players fetch the playlist and segments without the Authorization header, so the link carries its own signature
+    expires_at = int(time.time()) + settings.VIDEO_URL_EXPIRY_SECONDS
+    token = sign_claims({"b": video.blob_id, "e": expires_at}, settings.SIGNED_URL_SECRET, purpose="video")
+    body.update(
+        status="ready",
+        segment_count=video.segment_count,
+        hls_size=video.hls_size,
+        playlist_url=str(request.url_for("get_video_playlist", token=token)),
+        expires_at=datetime.fromtimestamp(expires_at, tz=timezone.utc)
+    )
+    return body
+
+
+def _video_link(token: str):
+    """The blob a signed video link is for and how long it stays valid"""
+    try:
+        claims = verify_claims(token, settings.SIGNED_URL_SECRET, purpose="video")
+        blob_id = int(claims["b"])
+    except InvalidSignedURL as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except (KeyError, TypeError, ValueError):
+        raise HTTPException(status_code=403, detail="Malformed link")
+    return blob_id, max(int(claims["e"] - time.time()), 0)
+
+
+# ----------------------------
+# HLS playlist of a video (signed link, no auth)
+# ----------------------------
+@file_router.get("/videos/{token}/playlist.m3u8", name="get_video_playlist")
+async def get_video_playlist(token: str, db: AsyncSession = Depends(get_db)):
+    blob_id, max_age = _video_link(token)
+    from Services.video_service import VideoService, render_playlist
+    segments = await VideoService(db=db).get_segments(blob_id)
+    if not segments:
+        raise HTTPException(status_code=404, detail="Video not found")
+    
+    from Helpers.media import PLAYLIST_CONTENT_TYPE
+    return Response(
+        render_playlist(segments),
+        media_type=PLAYLIST_CONTENT_TYPE,
+        headers={"Cache-Control": f"private, max-age={max_age}"}
     )
 
 
+# ----------------------------
+# One HLS segment of a video (signed link, no auth)
+# ----------------------------
+@file_router.get("/videos/{token}/segments/{sequence}.ts")
+async def get_video_segment(token: str, sequence: int, db: AsyncSession = Depends(get_db)):
+    blob_id, max_age = _video_link(token)
+    from Services.video_service import VideoService
+    segment = await VideoService(db=db).get_segment(blob_id, sequence)
+    if segment is None:
+        raise HTTPException(status_code=404, detail="Segment not found")
+    
+    from Helpers.cloud_storage import get_cloud_storage_manager
+    from Helpers.media import SEGMENT_CONTENT_TYPE
+    storage = get_cloud_storage_manager()
+    
+    # Content-addressed and never rewritten: cacheable for as long as the link is valid
+    headers = {"Cache-Control": f"private, max-age={max_age}"}
+    try:
+        local_path = storage.local_path(segment.segment_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Segment not found on storage")
+    if local_path is not None:
+        return FileResponse(local_path, media_type=SEGMENT_CONTENT_TYPE, headers=headers)
+    
+    headers["Content-Length"] = str(segment.segment_size)
+    return StreamingResponse(
+        storage.iter_file(segment.segment_path, size=segment.segment_size),
+        media_type=SEGMENT_CONTENT_TYPE,
+        headers=headers
+    )
+
+
+# ----------------------------
+# Resize / crop / re-encode an image
+# ----------------------------
+@file_router.get("/files/{file_id}/transform")
+async def transform_image(file_id: int,
+                          w: Optional[int] = Query(None, description="Target width in px"),
+                          h: Optional[int] = Query(None, description="Target height in px"),
+                          fit: Literal["contain", "cover"] = "contain",
+                          fmt: Literal["webp", "jpeg", "jpg", "png"] = "webp",
+                          q: int = Query(80, description="Quality 1-100 (webp/jpeg)"),
+                          user: User = Depends(get_current_user),
+                          db: AsyncSession = Depends(get_db)):
+    from Services.transform_service import TransformService
+    path, content_type, hit = await TransformService(db=db).transform(
+        user=user, file_id=file_id, width=w, height=h, fit=fit, fmt=fmt, quality=q
+    )
+    headers = {
+        "Cache-Control": "private, max-age=86400",
+        "X-Transform-Cache": "HIT" if hit else "MISS"
+    }
+    return FileResponse(path, media_type=content_type, headers=headers)
+
+
+# ----------------------------
+# Re-read a file and check its digests
+# ----------------------------
+@file_router.post("/files/{file_id}/verify")
+async def verify_file(file_id: int,
+                      user: User = Depends(get_current_user),
+                      db: AsyncSession = Depends(get_db)):
+    from Services.file_repository import FileRepository
+    from Services.integrity_service import mb_per_second, verify_object
+    from Helpers.cloud_storage import get_cloud_storage_manager
+    file = await FileRepository(db=db).get_owned_file(user_id=user.id, file_id=file_id)
+    
+    result = await verify_object(
+        get_cloud_storage_manager(),
+        file.file_path,
+        size=file.file_size,
+        sha256_hash=file.sha256_hash,
+        md5_hash=file.md5_hash,
+        compression=file.compression
+    )
+    return {
+        "file_id": file.id,
+        "status": result["status"],
+        "problems": result["problems"],
+        "size": result["size"],
+        "sha256_hash": result["digests"].get("sha256"),
+        "md5_hash": result["digests"].get("md5"),
+        "seconds": round(result["seconds"], 3),
+        "mb_per_s": mb_per_second(result["size"], result["seconds"])
+    }
+
+
 # ----------------------------
 # Delete a file
 # ----------------------------
 @file_router.delete("/files/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_file(file_id: int,
-                user: User = Depends(get_current_user),
-                db: Session = Depends(get_db)):
+async def delete_file(file_id: int,
+                      user: User = Depends(get_current_user),
+                      db: AsyncSession = Depends(get_db)):
     from Services.File_Services import delete_file_service
-    delete_file_service(user=user, file_id=file_id, db=db)
+    await delete_file_service(user=user, file_id=file_id, db=db)
     return {"detail": "File deleted successfully"}
 
 
+# ----------------------------
+# Restore a deleted file
+# ----------------------------
+@file_router.post("/files/{file_id}/restore")
+async def restore_file(file_id: int,
+                       user: User = Depends(get_current_user),
+                       db: AsyncSession = Depends(get_db)):
+    from Services.File_Services import restore_file_service
+    return await restore_file_service(user=user, file_id=file_id, db=db)
+
+
 # ----------------------------
 # Move file between buckets
 # ----------------------------
 @file_router.patch("/files/{file_id}/move/{target_bucket_id}")
-def move_file(file_id: int, target_bucket_id: int,
-              user: User = Depends(get_current_user),
-              db: Session = Depends(get_db)):
+async def move_file(file_id: int, target_bucket_id: int,
+                    user: User = Depends(get_current_user),
+                    db: AsyncSession = Depends(get_db)):
     from Services.File_Services import move_file_service
-    return move_file_service(user=user, file_id=file_id, target_bucket_id=target_bucket_id, db=db)
\ No newline at end of file
+    return await move_file_service(user=user, file_id=file_id, target_bucket_id=target_bucket_id, db=db)
\ No newline at end of file
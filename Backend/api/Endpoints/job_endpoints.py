@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from model.User import User
+from model.Job import Job
+from api.database import get_db
+from Auth.token import get_current_user
+from schemas.Job import Job_Response_Schema, Job_Stats_Schema
+from Services.job_queue import queue_stats
+
+job_router = APIRouter(prefix="/api", tags=["Jobs"])
+
+
+# ----------------------------
+# The user's jobs per kind and status
+# ----------------------------
+@job_router.get("/jobs/stats", response_model=Job_Stats_Schema)
+async def get_job_stats(user: User = Depends(get_current_user),
+                        db: AsyncSession = Depends(get_db)):
+    return await queue_stats(db, user_id=user.id)
+
+
+# ----------------------------
+# One background job
+# ----------------------------
+@job_router.get("/jobs/{job_id}", response_model=Job_Response_Schema)
+async def get_job(job_id: int,
+                  user: User = Depends(get_current_user),
+                  db: AsyncSession = Depends(get_db)):
+    job = (await db.execute(
+        select(Job).where(Job.id == job_id, Job.user_id == user.id)
+    )).scalars().first()
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+# ----------------------------
+# Background jobs queued for a file
+# ----------------------------
+@job_router.get("/files/{file_id}/jobs", response_model=List[Job_Response_Schema])
+async def list_file_jobs(file_id: int,
+                         user: User = Depends(get_current_user),
+                         db: AsyncSession = Depends(get_db)):
+    from Services.file_repository import FileRepository
+    await FileRepository(db=db).get_owned_file(user_id=user.id, file_id=file_id)
+    result = await db.execute(
+        select(Job).where(Job.file_id == file_id, Job.user_id == user.id).order_by(Job.id)
+    )
+    return result.scalars().all()
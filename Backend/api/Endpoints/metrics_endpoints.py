@@ -0,0 +1,20 @@
+import hmac
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from Auth.config import settings
+from Helpers.metrics import CONTENT_TYPE, render
+
+metrics_router = APIRouter(tags=["Metrics"])
+
+
+# ----------------------------
+# Prometheus scrape endpoint (this process's metrics)
+# ----------------------------
+@metrics_router.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request):
+    # Fails closed: without a token configured the endpoint doesn't exist
+    if not settings.METRICS_ENABLED or not settings.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    given = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(given.encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(content=render(), media_type=CONTENT_TYPE)
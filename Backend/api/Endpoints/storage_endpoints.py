@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from model.User import User
+from Auth.token import get_current_user
+from schemas.Storage import Storage_Stats_Schema
+from Helpers.storage_backend import BLOB_REQUEST_SECONDS, get_storage_backend
+
+storage_router = APIRouter(prefix="/api", tags=["Storage"])
+
+
+# ----------------------------
+# Blob request latency per operation and outcome, in this process
+# ----------------------------
+@storage_router.get("/storage/stats", response_model=Storage_Stats_Schema)
+async def get_storage_stats(user: User = Depends(get_current_user)):
+    return {
+        "backend": get_storage_backend().name,
+        "requests": BLOB_REQUEST_SECONDS.summary()
+    }
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, UploadFile, File, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from model.User import User
+from api.database import get_db
+from Auth.token import get_current_user
+from schemas.Upload import Upload_Create_Schema, Upload_Session_Schema, Upload_Part_Schema
+from Services.upload_service import UploadSessionService, MAX_PART_SIZE
+
+upload_router = APIRouter(prefix="/api", tags=["Uploads"])
+
+
+# ----------------------------
+# Start a multipart upload
+# ----------------------------
+@upload_router.post("/buckets/{bucket_id}/uploads",
+                    response_model=Upload_Session_Schema,
+                    status_code=status.HTTP_201_CREATED)
+async def initiate_upload(bucket_id: int,
+                    data: Upload_Create_Schema,
+                    user: User = Depends(get_current_user),
+                    db: AsyncSession = Depends(get_db)):
+    service = UploadSessionService(db=db)
+    session = await service.initiate(
+        user=user,
+        bucket_id=bucket_id,
+        file_name=data.file_name,
+        content_type=data.file_content_type,
+        total_size=data.total_size,
+        sha256_hash=data.sha256_hash
+    )
+    response = Upload_Session_Schema.model_validate(session)
+    response.max_part_size = MAX_PART_SIZE
+    return response
+
+
+# ----------------------------
+# Get session state (to resume)
+# ----------------------------
+@upload_router.get("/uploads/{upload_id}", response_model=Upload_Session_Schema)
+async def get_upload(upload_id: str,
+               user: User = Depends(get_current_user),
+               db: AsyncSession = Depends(get_db)):
+    service = UploadSessionService(db=db)
+    response = Upload_Session_Schema.model_validate(await service.get_session(user=user, upload_id=upload_id))
+    response.max_part_size = MAX_PART_SIZE
+    return response
+
+
+# ----------------------------
+# Upload (or re-upload) part N
+# ----------------------------
+@upload_router.put("/uploads/{upload_id}/parts/{part_number}", response_model=Upload_Part_Schema)
+async def upload_part(upload_id: str,
+                      part_number: int,
+                      file: UploadFile = File(...),
+                      user: User = Depends(get_current_user),
+                      db: AsyncSession = Depends(get_db)):
+    service = UploadSessionService(db=db)
+    return await service.upload_part(user=user, upload_id=upload_id, part_number=part_number, stream=file)
+
+
+# ----------------------------
+# Assemble parts into a file
+# ----------------------------
+@upload_router.post("/uploads/{upload_id}/complete", status_code=status.HTTP_201_CREATED)
+async def complete_upload(upload_id: str,
+                          user: User = Depends(get_current_user),
+                          db: AsyncSession = Depends(get_db)):
+    service = UploadSessionService(db=db)
+    return await service.complete(user=user, upload_id=upload_id)
+
+
+# ----------------------------
+# Abort and discard parts
+# ----------------------------
+@upload_router.delete("/uploads/{upload_id}")
+async def abort_upload(upload_id: str,
+                       user: User = Depends(get_current_user),
+                       db: AsyncSession = Depends(get_db)):
+    service = UploadSessionService(db=db)
+    return await service.abort(user=user, upload_id=upload_id)
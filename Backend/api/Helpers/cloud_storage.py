@@ -1,27 +1,97 @@
-import os
-from typing import Dict, Optional
+import io
+import inspect
+import time
+from contextlib import contextmanager
+from typing import AsyncIterator, Dict, List, Optional
 from pathlib import Path
-import hashlib
 import uuid
 from datetime import datetime
-import requests
+from Helpers.storage_backend import CHUNK_SIZE, BlobStorageBackend, StorageBackend, get_storage_backend
+from Helpers.object_cache import ObjectCache, get_object_cache
+from Helpers.compression import compress_chunks, decompress_chunks, pick_compression
+from Helpers.hashing import StreamHasher
+from Helpers.metrics import STORAGE_ERRORS, counter, gauge, histogram
+
+STORAGE_OPERATION_SECONDS = histogram(
+    "storage_operation_seconds",
+    "Storage backend calls: writes until stored, reads until their first chunk",
+    labels=("backend", "operation")
+)
+STORAGE_BYTES = counter("storage_bytes_total", "Bytes written to and read from the storage backend", labels=("backend", "direction"))
+UPLOADS_IN_PROGRESS = gauge("uploads_in_progress", "Uploads being streamed to storage", labels=("kind",))
+
+
+class FileTooLargeError(ValueError):
+    """Raised while streaming an upload once it grows past the allowed size"""
+
+
+async def _read_chunks(stream, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Iterate a file-like object whose read() may be sync (BytesIO) or async (UploadFile)"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if inspect.isawaitable(chunk):
+            chunk = await chunk
+        if not chunk:
+            break
+        yield chunk
+
 
 class CloudStorageManager:
     """
-    Cloud storage manager using Vercel Blob REST API.
-    Falls back to local storage for development.
+    Cloud storage manager on top of an async StorageBackend: Vercel Blob in
+    production, the local filesystem in development (see get_storage_backend).
+    Adds key naming, hashing and size limits around the raw backend I/O,
+    and a local read-through cache in front of remote backends.
     """
     
-    def __init__(self):
-        self.blob_token = os.getenv("BLOB_READ_WRITE_TOKEN")
-        self.is_production = bool(self.blob_token)
-        
-        # Fallback to local storage in development
-        if not self.is_production:
-            self.local_storage_path = Path("./.storage")
-            self.local_storage_path.mkdir(parents=True, exist_ok=True)
+    def __init__(self, backend: Optional[StorageBackend] = None, cache: Optional[ObjectCache] = None):
+        self.backend = backend or get_storage_backend()
+        # Local storage is already on disk, only remote reads are worth caching
+        if cache is None and isinstance(self.backend, BlobStorageBackend):
+            cache = get_object_cache()
+        self.cache = cache
+
+    @contextmanager
+    def _timed(self, operation: str):
+        """Time a backend call and count it in STORAGE_ERRORS if it fails"""
+        with STORAGE_OPERATION_SECONDS.time(backend=self.backend.name, operation=operation):
+            try:
+                yield
+            except (FileTooLargeError, FileNotFoundError):
+                # The caller's mistake, not the backend's
+                raise
+            except Exception:
+                STORAGE_ERRORS.inc(backend=self.backend.name, operation=operation)
+                raise
+
+    async def _read(self, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """
+        Pass a backend read through, counting its bytes. It is timed to the
+        first chunk: the rest is paced by whoever consumes it.
+        """
+        started = time.perf_counter()
+        timed = False
+        size = 0
+        try:
+            async for chunk in chunks:
+                if not timed:
+                    STORAGE_OPERATION_SECONDS.observe(time.perf_counter() - started, backend=self.backend.name, operation="read")
+                    timed = True
+                size += len(chunk)
+                yield chunk
+        except FileNotFoundError:
+            raise
+        except Exception:
+            STORAGE_ERRORS.inc(backend=self.backend.name, operation="read")
+            raise
+        finally:
+            STORAGE_BYTES.inc(size, backend=self.backend.name, direction="read")
+            await chunks.aclose()
+
+    def _iter_range(self, file_path: str, **kwargs) -> AsyncIterator[bytes]:
+        return self._read(self.backend.iter_range(file_path, **kwargs))
     
-    def save_file(
+    async def save_file(
         self,
         file_name: str,
         content: bytes,
@@ -29,189 +99,270 @@ class CloudStorageManager:
         file_content_type: str
     ) -> Dict:
         """
-        Save file to cloud storage (production) or local (development)
+        Save in-memory content to storage
         """
+        return await self.save_file_stream(
+            file_name=file_name,
+            stream=io.BytesIO(content),
+            bucket_id=bucket_id,
+            file_content_type=file_content_type
+        )
+
+    async def save_file_stream(
+        self,
+        file_name: str,
+        stream,
+        bucket_id: int,
+        file_content_type: str,
+        max_size: Optional[int] = None,
+        chunk_size: int = CHUNK_SIZE,
+        compression: Optional[str] = None
+    ) -> Dict:
+        """
+        Stream a file-like object to storage. The stream is read in chunk_size
+        pieces which are hashed and written as they arrive, so memory use is
+        bounded by the chunk size rather than the file size.
+        Raises FileTooLargeError as soon as more than max_size bytes have been read.
+        compression is the bucket's mode; it is applied to compressible types only.
+        """
+        with UPLOADS_IN_PROGRESS.track(kind="file"):
+            return await self._save_chunks(
+                file_name=file_name,
+                chunks=_read_chunks(stream, chunk_size),
+                bucket_id=bucket_id,
+                file_content_type=file_content_type,
+                max_size=max_size,
+                compression=compression
+            )
+    
+    async def _save_chunks(
+        self,
+        file_name: str,
+        chunks: AsyncIterator[bytes],
+        bucket_id: int,
+        file_content_type: str,
+        max_size: Optional[int] = None,
+        compression: Optional[str] = None
+    ) -> Dict:
         file_id = str(uuid.uuid4())
         extension = file_name.split(".")[-1].lower() if "." in file_name else "bin"
         stored_filename = f"{file_id}.{extension}"
         
-        # Generate blob path
-        blob_path = f"bucket_{bucket_id}/{stored_filename}"
+        # Generate blob path; content is shared across buckets so the key
+        # doesn't encode the bucket
+        blob_path = f"blobs/{stored_filename}"
         
-        if self.is_production:
-            # Upload to Vercel Blob via REST API
-            try:
-                response = requests.put(
-                    f"https://blob.vercel-storage.com/{blob_path}",
-                    headers={
-                        "Authorization": f"Bearer {self.blob_token}",
-                        "Content-Type": file_content_type,
-                        "x-vercel-blob-add-random-suffix": "0"
-                    },
-                    data=content
-                )
-                response.raise_for_status()
-                result = response.json()
-                file_url = result.get("url", f"https://blob.vercel-storage.com/{blob_path}")
-                file_path = file_url  # Store the full URL
-            except Exception as e:
-                print(f"Blob upload failed: {e}")
-                raise
-        
-        if not self.is_production:
-            # Save locally for development
-            bucket_dir = self.local_storage_path / f"bucket_{bucket_id}"
-            bucket_dir.mkdir(parents=True, exist_ok=True)
-            file_path = bucket_dir / stored_filename
-            
-            with open(file_path, "wb") as f:
-                f.write(content)
-            
-            file_url = f"http://localhost:8000/files/{bucket_id}/{stored_filename}"
-            file_path = str(file_path)
-        
-        # Calculate hashes
-        hashes = {
-            "md5": hashlib.md5(content).hexdigest(),
-            "sha256": hashlib.sha256(content).hexdigest()
-        }
+        written = await self._write_stream(
+            blob_path=blob_path,
+            chunks=chunks,
+            file_content_type=file_content_type,
+            max_size=max_size,
+            compression=pick_compression(compression, file_name, file_content_type)
+        )
         
         return {
             "file_id": file_id,
             "original_name": file_name,
             "bucket_id": bucket_id,
             "stored_name": stored_filename,
-            "file_size": len(content),
+            "file_size": written["file_size"],
+            "stored_size": written["stored_size"],
+            "compression": written["compression"],
             "content_type": file_content_type,
-            "file_path": file_path,
-            "file_url": file_url,
-            "md5_hash": hashes["md5"],
-            "sha256_hash": hashes["sha256"],
+            "file_path": written["file_path"],
+            "file_url": written["file_url"],
+            "md5_hash": written["md5_hash"],
+            "sha256_hash": written["sha256_hash"],
             "uploaded_at": datetime.utcnow().isoformat()
         }
     
-    def read_file(self, file_path: str) -> bytes:
-        """
-        Read file from cloud or local storage
-        """
-        if self.is_production:
-            # For Vercel Blob, file_path should be a URL
-            if file_path.startswith("http"):
-                response = requests.get(file_path)
-                response.raise_for_status()
-                return response.content
-            else:
-                # If it's just a path, construct the full URL
-                url = f"https://blob.vercel-storage.com/{file_path}"
-                response = requests.get(url, headers={"Authorization": f"Bearer {self.blob_token}"})
-                response.raise_for_status()
-                return response.content
-        else:
-            # Read from local storage
-            path = Path(file_path)
-            if not path.exists():
-                raise FileNotFoundError(f"File not found: {file_path}")
-            return path.read_bytes()
+    async def save_part(
+        self,
+        upload_id: str,
+        part_number: int,
+        stream,
+        max_size: Optional[int] = None
+    ) -> Dict:
+        """
+        Store one part of a multipart upload session. Parts live under
+        uploads/<upload_id>/, each attempt under its own key, so a re-sent
+        part never touches the copy it replaces.
+        """
+        with UPLOADS_IN_PROGRESS.track(kind="part"):
+            return await self._write_stream(
+                blob_path=f"uploads/{upload_id}/part_{part_number:05d}_{uuid.uuid4().hex[:12]}",
+                chunks=_read_chunks(stream),
+                file_content_type="application/octet-stream",
+                max_size=max_size
+            )
     
-    def delete_file(self, file_path: str) -> bool:
+    async def save_derivative(self, key: str, content: bytes, content_type: str) -> Dict:
         """
-        Delete file from cloud or local storage
+        Store generated content (e.g. a thumbnail) under a fixed key,
+        replacing whatever was there
         """
-        if self.is_production:
-            try:
-                # Extract blob path from URL if needed
-                if file_path.startswith("http"):
-                    # Parse URL to get the path
-                    blob_path = file_path.replace("https://blob.vercel-storage.com/", "")
-                else:
-                    blob_path = file_path
-                
-                response = requests.delete(
-                    f"https://blob.vercel-storage.com/{blob_path}",
-                    headers={"Authorization": f"Bearer {self.blob_token}"}
-                )
-                return response.status_code in [200, 204]
-            except Exception as e:
-                print(f"Error deleting from Blob: {e}")
-                return False
-        else:
-            path = Path(file_path)
-            if path.exists():
-                try:
-                    path.unlink()
-                    return True
-                except Exception:
-                    return False
-            return False
+        return await self._write_stream(
+            blob_path=key,
+            chunks=_read_chunks(io.BytesIO(content)),
+            file_content_type=content_type,
+            overwrite=True
+        )
     
-    def file_exists(self, file_path: str) -> bool:
+    async def compose_parts(
+        self,
+        part_paths: List[str],
+        file_name: str,
+        bucket_id: int,
+        file_content_type: str,
+        compression: Optional[str] = None
+    ) -> Dict:
         """
-        Check if file exists
+        Assemble stored parts, in order, into a single file of the bucket.
+        Parts are streamed one chunk at a time, never loaded whole.
         """
-        if self.is_production:
-            try:
-                # Extract blob path from URL if needed
-                if file_path.startswith("http"):
-                    blob_path = file_path.replace("https://blob.vercel-storage.com/", "")
-                else:
-                    blob_path = file_path
-                
-                response = requests.head(
-                    f"https://blob.vercel-storage.com/{blob_path}",
-                    headers={"Authorization": f"Bearer {self.blob_token}"}
-                )
-                return response.status_code == 200
-            except:
-                return False
-        else:
-            return Path(file_path).exists()
+        async def chunks():
+            for part_path in part_paths:
+                async for chunk in self._iter_range(part_path):
+                    yield chunk
+        
+        return await self._save_chunks(
+            file_name=file_name,
+            chunks=chunks(),
+            bucket_id=bucket_id,
+            file_content_type=file_content_type,
+            compression=compression
+        )
     
-    def move_file(self, old_path: str, new_bucket_id: int, filename: str) -> str:
+    async def _write_stream(
+        self,
+        blob_path: str,
+        chunks: AsyncIterator[bytes],
+        file_content_type: str,
+        max_size: Optional[int] = None,
+        overwrite: bool = False,
+        compression: Optional[str] = None
+    ) -> Dict:
         """
-        Move file between buckets
+        Write chunks under blob_path, hashing them on the way through (in
+        one pass, off the event loop, see StreamHasher). Hashes and file_size
+        describe the content as given; with compression the encoded bytes
+        are written and their count returned as stored_size.
         """
-        new_blob_path = f"bucket_{new_bucket_id}/{filename}"
+        hasher = StreamHasher()
+        state = {"size": 0, "stored": 0}
+        
+        async def hashed():
+            async for chunk in chunks:
+                state["size"] += len(chunk)
+                if max_size is not None and state["size"] > max_size:
+                    raise FileTooLargeError(f"File size exceeded the limit of {max_size} bytes")
+                await hasher.update(chunk)
+                yield chunk
         
-        if self.is_production:
-            # Read from old location
-            content = self.read_file(old_path)
-            
-            # Upload to new location
-            response = requests.put(
-                f"https://blob.vercel-storage.com/{new_blob_path}",
-                headers={"Authorization": f"Bearer {self.blob_token}"},
-                data=content
+        async def stored():
+            body = compress_chunks(hashed(), compression) if compression else hashed()
+            async for chunk in body:
+                state["stored"] += len(chunk)
+                yield chunk
+        
+        with self._timed("write"):
+            written = await self.backend.write(
+                blob_path, stored(), content_type=file_content_type, overwrite=overwrite
             )
-            response.raise_for_status()
-            result = response.json()
-            new_file_url = result.get("url", f"https://blob.vercel-storage.com/{new_blob_path}")
-            
-            # Delete old file
-            self.delete_file(old_path)
-            
-            return new_file_url
-        else:
-            # Local file move
-            import shutil
-            new_bucket_path = self.local_storage_path / f"bucket_{new_bucket_id}"
-            new_bucket_path.mkdir(parents=True, exist_ok=True)
-            new_file_path = new_bucket_path / filename
-            shutil.move(old_path, new_file_path)
-            return str(new_file_path)
+        STORAGE_BYTES.inc(state["stored"], backend=self.backend.name, direction="write")
+        if overwrite and self.cache is not None:
+            await self.cache.invalidate(written["file_path"])
+        digests = await hasher.hexdigests()
+        
+        return {
+            "file_path": written["file_path"],
+            "file_url": written["file_url"],
+            "file_size": state["size"],
+            "stored_size": state["stored"],
+            "compression": compression,
+            "md5_hash": digests["md5"],
+            "sha256_hash": digests["sha256"]
+        }
+    
+    async def read_file(self, file_path: str) -> bytes:
+        """
+        Read a whole file into memory (prefer iter_file for anything large)
+        """
+        if self.cache is not None:
+            content = await self.cache.get(file_path)
+            if content is not None:
+                return content
+        content = b"".join([chunk async for chunk in self._iter_range(file_path)])
+        if self.cache is not None:
+            await self.cache.put(file_path, content)
+        return content
+    
+    def local_path(self, file_path: str) -> Optional[Path]:
+        """
+        Return the on-disk path of a locally stored file, or None when the
+        object lives in cloud storage
+        """
+        return self.backend.local_path(file_path)
+    
+    def iter_file(
+        self,
+        file_path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = CHUNK_SIZE,
+        size: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield the bytes start..end (inclusive) of a stored file in chunks.
+        When the file's size is given and it fits the object cache, it is
+        served from (and on a miss loaded into) the cache; otherwise only
+        the requested window is fetched from the backend.
+        """
+        if self.cache is not None and size is not None and self.cache.accepts(size):
+            def fetch(start: int = 0, end: Optional[int] = None):
+                return self._iter_range(file_path, start=start, end=end, chunk_size=chunk_size)
+            return self.cache.iter_range(file_path, size, fetch, start=start, end=end, chunk_size=chunk_size)
+        return self._iter_range(file_path, start=start, end=end, chunk_size=chunk_size)
+    
+    def iter_content(self, file_path: str, compression: Optional[str] = None) -> AsyncIterator[bytes]:
+        """
+        Yield a stored file's original bytes straight from the backend,
+        decoding compression at rest (for background checks that must not
+        be answered by the cache)
+        """
+        chunks = self._iter_range(file_path)
+        return decompress_chunks(chunks, compression) if compression else chunks
+    
+    async def delete_file(self, file_path: str) -> bool:
+        """
+        Delete file from storage
+        """
+        if self.cache is not None:
+            await self.cache.invalidate(file_path)
+        with self._timed("delete"):
+            return await self.backend.delete(file_path)
+    
+    async def file_exists(self, file_path: str) -> bool:
+        """
+        Check if file exists
+        """
+        with self._timed("exists"):
+            return await self.backend.exists(file_path)
     
-    def get_current_used_storage(self, bucket_id: int, db) -> int:
-        """Get current storage usage for a bucket"""
+    async def get_current_used_storage(self, bucket_id: int, db) -> int:
+        """Get current storage usage for a bucket by summing its files (slow, prefer bucket.used_Storage)"""
         from model.File import File
-        from sqlalchemy import func
+        from sqlalchemy import func, select, false
         
-        total = db.query(func.sum(File.file_size))\
-              .filter(File.bucket_id == bucket_id)\
-              .scalar()
+        total = await db.scalar(
+            select(func.sum(File.file_size)).where(File.bucket_id == bucket_id, File.is_deleted == false())
+        )
         return total or 0
     
     def check_storage_Quota(self, file: dict, bucket, db):
         """Check if file upload would exceed bucket quota"""
-        current_used = self.get_current_used_storage(bucket_id=bucket.id, db=db)
+        # O(1): the bucket keeps a running counter, see QuotaService
+        current_used = bucket.used_Storage or 0
         total_after_upload = current_used + file["file_size"]
         
         if bucket.storage_limit and total_after_upload > bucket.storage_limit:
@@ -0,0 +1,36 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent work on the same key: the first caller starts a
+    task and everyone arriving while it runs shares its result (or error)
+    instead of repeating the work. Per process and per event loop.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    def start(self, key: Hashable, factory: Callable[[], Awaitable]) -> asyncio.Task:
+        """The running task for key, starting factory() if there is none"""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return task
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable]):
+        """
+        Wait for the shared result. Shielded: a caller that goes away (e.g. a
+        disconnected client) doesn't cancel work others are waiting on.
+        """
+        return await asyncio.shield(self.start(key, factory))
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def __len__(self) -> int:
+        return len(self._tasks)
@@ -0,0 +1,120 @@
+import zlib
+from typing import AsyncIterator, Optional
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip always works
+    zstandard = None
+
+COMPRESSION_MODES = ("gzip", "zstd")
+
+# Text-like formats that shrink well. Already-compressed containers (docx,
+# xlsx, images, video) are left alone.
+COMPRESSIBLE_EXTENSIONS = {"txt", "csv", "tsv", "json", "xml", "html", "htm", "md", "log", "doc", "svg"}
+COMPRESSIBLE_CONTENT_TYPES = {
+    "application/json",
+    "application/xml",
+    "application/msword",
+    "application/javascript",
+    "image/svg+xml"
+}
+
+
+def is_compressible(file_name: str, content_type: Optional[str] = None) -> bool:
+    extension = file_name.split(".")[-1].lower() if "." in file_name else ""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    return (
+        extension in COMPRESSIBLE_EXTENSIONS
+        or content_type.startswith("text/")
+        or content_type in COMPRESSIBLE_CONTENT_TYPES
+    )
+
+
+def compression_available(mode: str) -> bool:
+    return mode == "gzip" or (mode == "zstd" and zstandard is not None)
+
+
+def pick_compression(mode: Optional[str], file_name: str, content_type: Optional[str] = None) -> Optional[str]:
+    """The encoding to store a file with under a bucket's mode, or None to store it as is"""
+    if mode and compression_available(mode) and is_compressible(file_name, content_type):
+        return mode
+    return None
+
+
+def _compressor(mode: str):
+    if mode == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    if mode == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    raise ValueError(f"Unsupported compression: {mode}")
+
+
+def _decompressor(mode: str):
+    if mode == "gzip":
+        return zlib.decompressobj(31)
+    if mode == "zstd" and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError(f"Unsupported compression: {mode}")
+
+
+async def compress_chunks(chunks: AsyncIterator[bytes], mode: str) -> AsyncIterator[bytes]:
+    """Compress a chunk stream; the CPU work runs on worker threads"""
+    compressor = _compressor(mode)
+    async for chunk in chunks:
+        compressed = await run_in_threadpool(compressor.compress, chunk)
+        if compressed:
+            yield compressed
+    tail = compressor.flush()
+    if tail:
+        yield tail
+
+
+async def decompress_chunks(
+    chunks: AsyncIterator[bytes],
+    mode: str,
+    start: int = 0,
+    end: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """
+    Decompress a chunk stream, yielding only the decoded bytes start..end
+    (inclusive). Compressed data can't be seeked, so a range still decodes
+    everything before it, but stops reading once past end.
+    """
+    decompressor = _decompressor(mode)
+    position = 0
+
+    async def decoded_chunks():
+        async for chunk in chunks:
+            yield await run_in_threadpool(decompressor.decompress, chunk)
+        yield decompressor.flush()
+
+    async for decoded in decoded_chunks():
+        if not decoded:
+            continue
+        chunk_start, position = position, position + len(decoded)
+        if position <= start:
+            continue
+        window = decoded[max(start - chunk_start, 0):None if end is None else end + 1 - chunk_start]
+        if window:
+            yield window
+        if end is not None and position > end:
+            return
+
+
+def accepts_encoding(header: Optional[str], mode: str) -> bool:
+    """True when an Accept-Encoding header allows mode (q=0 excludes it)"""
+    if not header:
+        return False
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() not in (mode, "*"):
+            continue
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
@@ -0,0 +1,125 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+
+class DiskLRUCache:
+    """
+    Size-bounded LRU of generated files on local disk. The index lives in
+    memory and is rebuilt from the directory (oldest mtime first) on start,
+    so the cache survives restarts. Least recently used entries are deleted
+    once the total goes over max_bytes. Methods do blocking file I/O; call
+    them from a thread (run_in_threadpool).
+
+    Several processes may share the directory; each bounds what it wrote
+    itself, and an entry deleted by another process simply misses.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # key -> bytes
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _path(self, key: str) -> Path:
+        # Fan out so no single directory gets huge
+        return self.root / key[:2] / key
+
+    def _load(self):
+        try:
+            self.root.mkdir(parents=True, exist_ok=True)
+            files = [path for path in self.root.glob("*/*") if path.is_file() and not path.name.endswith(".tmp")]
+        except OSError:
+            return
+        for path in sorted(files, key=lambda path: path.stat().st_mtime):
+            size = path.stat().st_size
+            self._entries[path.name] = size
+            self._total += size
+        self._evict()
+
+    def get(self, key: str) -> Optional[Path]:
+        path = self._path(key)
+        with self._lock:
+            known = key in self._entries
+        if not path.exists():
+            with self._lock:
+                if known:
+                    self._total -= self._entries.pop(key, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            if not known:
+                # Written by another process sharing the directory
+                self._entries[key] = path.stat().st_size
+                self._total += self._entries[key]
+            self._entries.move_to_end(key)
+            self.hits += 1
+        try:
+            # Keep recency across restarts, which reload in mtime order
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def temp_path(self, key: str) -> Path:
+        """A private path to write an entry to before put_file() publishes it"""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f"{key}.{uuid.uuid4().hex}.tmp")
+
+    def put(self, key: str, content: bytes) -> Path:
+        tmp_path = self.temp_path(key)
+        tmp_path.write_bytes(content)
+        return self.put_file(key, tmp_path)
+
+    def put_file(self, key: str, tmp_path: Path) -> Path:
+        """Publish a file written to temp_path(key) as the entry for key"""
+        path = self._path(key)
+        size = tmp_path.stat().st_size
+        # Written aside and renamed, so readers never see a partial file
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._total += size
+        self._evict(keep=key)
+        return path
+
+    def delete(self, key: str):
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+        self._path(key).unlink(missing_ok=True)
+
+    def _evict(self, keep: Optional[str] = None):
+        victims = []
+        with self._lock:
+            while self._total > self.max_bytes and self._entries:
+                key, size = next(iter(self._entries.items()))
+                if key == keep:
+                    break
+                del self._entries[key]
+                self._total -= size
+                self.evictions += 1
+                victims.append(key)
+        for key in victims:
+            self._path(key).unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,98 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+# Digests kept for stored content: sha256 addresses blobs, md5 is the usual ETag/S3 checksum
+DEFAULT_ALGORITHMS = ("md5", "sha256")
+
+# Below this, handing a chunk to the pool costs more than hashing it inline
+PARALLEL_MIN_CHUNK = 64 * 1024
+
+
+class StreamHasher:
+    """
+    Computes several digests in one pass over a stream. Each chunk is fed
+    to every digest at once on the hash pool (hashlib releases the GIL for
+    large buffers, so the digests really run in parallel), and update()
+    returns as soon as the previous chunk is done: a chunk is hashed while
+    the caller writes it out and reads the next one. Chunks must not be
+    modified after they are passed in.
+    """
+
+    def __init__(self, algorithms: Sequence[str] = DEFAULT_ALGORITHMS, executor: Optional[ThreadPoolExecutor] = None):
+        self._hashers = {name: hashlib.new(name) for name in algorithms}
+        self._executor = executor
+        self._pending: List[Future] = []
+        self.size = 0
+
+    def _submit(self, chunk: bytes):
+        self.size += len(chunk)
+        if len(chunk) < PARALLEL_MIN_CHUNK:
+            for hasher in self._hashers.values():
+                hasher.update(chunk)
+            return
+        pool = self._executor or get_hash_pool()
+        self._pending = [pool.submit(hasher.update, chunk) for hasher in self._hashers.values()]
+
+    async def update(self, chunk: bytes):
+        """Start hashing chunk, once the previous one is hashed"""
+        await self._drain()
+        self._submit(chunk)
+
+    async def _drain(self):
+        pending, self._pending = self._pending, []
+        if pending:
+            await asyncio.gather(*(asyncio.wrap_future(future) for future in pending))
+
+    async def hexdigests(self) -> Dict[str, str]:
+        await self._drain()
+        return {name: hasher.hexdigest() for name, hasher in self._hashers.items()}
+
+    # Same, for blocking callers
+
+    def update_blocking(self, chunk: bytes):
+        self._wait()
+        self._submit(chunk)
+
+    def _wait(self):
+        pending, self._pending = self._pending, []
+        for future in pending:
+            future.result()
+
+    def hexdigests_blocking(self) -> Dict[str, str]:
+        self._wait()
+        return {name: hasher.hexdigest() for name, hasher in self._hashers.items()}
+
+
+def digest_bytes(content: bytes, algorithms: Sequence[str] = DEFAULT_ALGORITHMS) -> Dict[str, str]:
+    """All digests of an in-memory buffer, computed side by side"""
+    hasher = StreamHasher(algorithms)
+    hasher.update_blocking(content)
+    return hasher.hexdigests_blocking()
+
+
+# Singleton instance
+_hash_pool = None
+
+def get_hash_pool() -> ThreadPoolExecutor:
+    """
+    Threads the digests run on, apart from the default executor so hashing
+    can't starve file I/O or sync endpoints of threads. HASH_THREADS=0
+    sizes it to the CPUs.
+    """
+    global _hash_pool
+    if _hash_pool is None:
+        from Auth.config import settings
+        threads = settings.HASH_THREADS or os.cpu_count() or 4
+        _hash_pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="hash")
+    return _hash_pool
+
+
+def shutdown_hash_pool():
+    """Stop the hashing threads (on app shutdown)"""
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
@@ -0,0 +1,115 @@
+from typing import Optional, Tuple
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header asks for bytes outside of the file"""
+
+
+def parse_range_header(range_header: Optional[str], file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=" Range header into an inclusive (start, end) pair.
+    Returns None when the whole file should be sent (no header, unknown unit,
+    malformed value or a multi-range request, which we answer with a plain 200).
+    """
+    if not range_header:
+        return None
+
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_text, sep, end_text = ranges.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if start_text == "":
+            # Suffix range: the last N bytes
+            suffix = int(end_text)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            start = max(file_size - suffix, 0)
+            end = file_size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else file_size - 1
+    except ValueError:
+        return None
+
+    if start >= file_size:
+        raise RangeNotSatisfiable()
+
+    if start > end:
+        return None
+
+    return start, min(end, file_size - 1)
+
+
+def http_date(value: datetime) -> str:
+    """Format a datetime as an RFC 7231 HTTP-date"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    """Parse an HTTP-date header value; None when absent or malformed"""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def content_etag(content_hash: Optional[str], encoding: Optional[str] = None) -> Optional[str]:
+    """
+    Strong ETag for stored content, from its hash (content never changes under
+    a file id). A content-coded representation gets its own tag.
+    """
+    if not content_hash:
+        return None
+    return f'"{content_hash}-{encoding}"' if encoding else f'"{content_hash}"'
+
+
+def is_not_modified(
+    if_none_match: Optional[str],
+    if_modified_since: Optional[str],
+    etag: Optional[str] = None,
+    last_modified: Optional[datetime] = None
+) -> bool:
+    """
+    True when a GET can be answered with 304 Not Modified (RFC 7232 section 6):
+    If-None-Match wins when present (weak comparison, "*" matches anything);
+    otherwise If-Modified-Since is compared at one-second precision.
+    """
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        if etag is None:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return any(tag.removeprefix("W/") == etag.removeprefix("W/") for tag in candidates)
+
+    since = parse_http_date(if_modified_since)
+    if since is None or last_modified is None:
+        return False
+    if last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def if_range_matches(if_range: Optional[str], etag: Optional[str] = None, last_modified: Optional[str] = None) -> bool:
+    """True when there is no If-Range header or it still matches the current representation"""
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith("W/"):
+        # Weak validators never match for range requests
+        return False
+    return if_range in (etag, last_modified)
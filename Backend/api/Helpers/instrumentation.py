@@ -0,0 +1,128 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from Helpers.metrics import histogram
+
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_seconds",
+    "API request latency until the response body is sent",
+    labels=("method", "route", "status")
+)
+HTTP_REQUEST_DB_QUERIES = histogram(
+    "http_request_db_queries",
+    "Database queries run by one API request",
+    labels=("route",),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+)
+HTTP_REQUEST_DB_SECONDS = histogram(
+    "http_request_db_seconds",
+    "Time one API request spent waiting on database queries",
+    labels=("route",)
+)
+DB_QUERY_SECONDS = histogram(
+    "db_query_seconds",
+    "Database query latency by statement type",
+    labels=("statement",)
+)
+
+# [queries, seconds] of the request being handled; shared (not copied) with the threads it hands work to
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+
+def _statement_type(statement: str) -> str:
+    # The leading keyword only, so the label can't take unbounded values
+    keyword = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else ""
+    return keyword if keyword in ("select", "insert", "update", "delete", "with") else "other"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_started"].pop()
+    DB_QUERY_SECONDS.observe(seconds, statement=_statement_type(statement))
+    totals = _request_db.get()
+    if totals is not None:
+        totals[0] += 1
+        totals[1] += seconds
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: Engine):
+    """
+    Time every statement of an engine (for an AsyncEngine, pass its
+    sync_engine) into DB_QUERY_SECONDS and the current request's totals
+    """
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _route_template(scope) -> str:
+    """The matched route's path template, e.g. /api/files/{file_id}/download"""
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    # Routes of an included router may report their path without the prefix
+    # they were included under; the template matches the request path's tail,
+    # so the leading segments it doesn't cover are that (literal) prefix
+    segments = scope["path"].rstrip("/").split("/")
+    extra = len(segments) - len(template.rstrip("/").split("/"))
+    if extra > 0 and ":path}" not in template:
+        template = "/".join(segments[:1 + extra]) + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    Times each HTTP request into HTTP_REQUEST_SECONDS and records how many
+    database queries it ran and how long they took. Requests are labelled
+    by their route template (e.g. /api/files/{file_id}/download), not the
+    raw path, so the number of series stays bounded. A plain ASGI
+    middleware: it adds a few perf_counter calls and dict updates per
+    request, and doesn't buffer or wrap the body.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        totals = [0, 0.0]
+        token = _request_db.set(totals)
+        response_status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                response_status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _request_db.reset(token)
+            route = _route_template(scope)
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=route,
+                status=str(response_status[0])
+            )
+            HTTP_REQUEST_DB_QUERIES.observe(totals[0], route=route)
+            HTTP_REQUEST_DB_SECONDS.observe(totals[1], route=route)
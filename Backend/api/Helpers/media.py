@@ -0,0 +1,156 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+PLAYLIST_CONTENT_TYPE = "application/vnd.apple.mpegurl"
+SEGMENT_CONTENT_TYPE = "video/mp2t"
+
+# Video types the pipeline processes (a subset of StorageManager.allowed_extensions)
+VIDEO_EXTENSIONS = {"mp4", "avi"}
+VIDEO_SOURCE_TYPES = {"video/mp4", "video/x-msvideo", "video/avi", "video/msvideo"}
+
+# Codecs HLS players take as is, so the segments can be cut without re-encoding
+HLS_VIDEO_CODECS = {"h264"}
+HLS_AUDIO_CODECS = {"aac", "mp3"}
+
+
+class MediaError(ValueError):
+    """Raised when a file can't be probed or segmented"""
+
+
+def is_video(file_name: str, content_type: Optional[str] = None) -> bool:
+    extension = file_name.split(".")[-1].lower() if "." in file_name else ""
+    return extension in VIDEO_EXTENSIONS or content_type in VIDEO_SOURCE_TYPES
+
+
+async def _run(args: Sequence[str]) -> Tuple[int, bytes, bytes]:
+    """Run a command without blocking the event loop; it is killed if the caller is cancelled"""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        raise MediaError(f"{args[0]} is not installed")
+    try:
+        stdout, stderr = await process.communicate()
+    except BaseException:
+        process.kill()
+        await process.wait()
+        raise
+    return process.returncode, stdout, stderr
+
+
+def _last_line(stderr: bytes) -> str:
+    # ffmpeg's final line says what went wrong; earlier ones are context
+    lines = [line for line in stderr.decode(errors="replace").splitlines() if line.strip()]
+    return lines[-1].strip()[:300] if lines else "unknown error"
+
+
+def _int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def probe(path: Path, ffprobe: str = "ffprobe") -> Dict:
+    """Duration, resolution, codecs and bit rate of a video file"""
+    returncode, stdout, stderr = await _run([
+        ffprobe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", str(path)
+    ])
+    if returncode != 0:
+        raise MediaError(f"Could not read video: {_last_line(stderr)}")
+    try:
+        info = json.loads(stdout)
+    except ValueError:
+        raise MediaError("Could not read video: unexpected ffprobe output")
+
+    streams = info.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video" and not s.get("disposition", {}).get("attached_pic")), None)
+    if video is None:
+        raise MediaError("File has no video stream")
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    container = info.get("format", {})
+    return {
+        "duration": _float(container.get("duration")) or _float(video.get("duration")),
+        "width": _int(video.get("width")),
+        "height": _int(video.get("height")),
+        "video_codec": video.get("codec_name"),
+        "audio_codec": audio.get("codec_name") if audio else None,
+        "bit_rate": _int(container.get("bit_rate")),
+        "format_name": container.get("format_name")
+    }
+
+
+def _read_playlist(playlist: Path) -> List[Tuple[float, Path]]:
+    """(duration, segment file) for each #EXTINF entry of an ffmpeg VOD playlist"""
+    segments = []
+    duration = None
+    for line in playlist.read_text().splitlines():
+        line = line.strip()
+        if line.startswith("#EXTINF:"):
+            duration = float(line[len("#EXTINF:"):].split(",")[0])
+        elif line and not line.startswith("#") and duration is not None:
+            segments.append((duration, playlist.parent / line))
+            duration = None
+    return segments
+
+
+async def segment_hls(
+    source: Path,
+    output_dir: Path,
+    probed: Dict,
+    segment_seconds: int = 6,
+    max_height: int = 720,
+    ffmpeg: str = "ffmpeg"
+) -> List[Tuple[float, Path]]:
+    """
+    Cut a video into MPEG-TS segments of about segment_seconds for HLS and
+    return (duration, path) per segment, in order. H.264 with AAC/MP3 audio
+    within max_height is only remuxed (segments then break at the source's
+    keyframes); anything else is encoded to H.264/AAC, scaled down to
+    max_height, with a keyframe at every segment boundary.
+    """
+    remux = (
+        probed["video_codec"] in HLS_VIDEO_CODECS
+        and probed["audio_codec"] in HLS_AUDIO_CODECS | {None}
+        and (probed["height"] or 0) <= max_height
+    )
+    args = [ffmpeg, "-nostdin", "-v", "error", "-y", "-i", str(source), "-map", "0:v:0", "-map", "0:a:0?", "-sn", "-dn"]
+    if remux:
+        args += ["-c", "copy"]
+    else:
+        args += [
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+            "-vf", f"scale=-2:min(ih\\,{max_height})",
+            "-force_key_frames", f"expr:gte(t,n_forced*{segment_seconds})",
+            "-c:a", "aac", "-b:a", "128k", "-ac", "2"
+        ]
+    playlist = output_dir / "index.m3u8"
+    args += [
+        "-f", "hls",
+        "-hls_time", str(segment_seconds),
+        "-hls_playlist_type", "vod",
+        "-hls_segment_type", "mpegts",
+        "-hls_segment_filename", str(output_dir / "%05d.ts"),
+        str(playlist)
+    ]
+
+    returncode, _, stderr = await _run(args)
+    if returncode != 0:
+        raise MediaError(f"Could not segment video: {_last_line(stderr)}")
+    segments = await asyncio.to_thread(_read_playlist, playlist)
+    if not segments:
+        raise MediaError("Could not segment video: no segments written")
+    return segments
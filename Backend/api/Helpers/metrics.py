@@ -0,0 +1,282 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds, from a local disk hit to a slow remote transfer
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Content type of render()'s output, the Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Metric:
+    """A named metric with a fixed set of label names; values live in this process only"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def samples(self) -> Iterable[Tuple[str, Dict[str, str], float]]:
+        """(sample name, labels, value) for the exposition format"""
+        return []
+
+
+class Counter(Metric):
+    """A value per label set that only goes up (requests, bytes)"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [(self.name, dict(zip(self.labels, key)), value) for key, value in values]
+
+
+class Gauge(Counter):
+    """A value per label set that goes up and down (work in progress)"""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the with block as in progress while it runs"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class CallbackMetric(Metric):
+    """
+    A counter or gauge read from elsewhere when the metrics are rendered,
+    for state that is counted anyway (e.g. cache stats), so the hot path
+    pays nothing. read() returns (labels, value) pairs.
+    """
+
+    def __init__(self, name: str, description: str, kind: str, read: Callable[[], Iterable[Tuple[Dict[str, str], float]]]):
+        super().__init__(name, description)
+        self.kind = kind
+        self.read = read
+
+    def samples(self):
+        return [(self.name, labels, value) for labels, value in self.read()]
+
+
+class Histogram(Metric):
+    """
+    Bucketed distribution of observed values (latencies, in seconds) per
+    label set, Prometheus-style: cumulative bucket counts plus a count and
+    sum. Observing is O(log buckets) under a lock, cheap enough for every
+    request.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), count, sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the with block took"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def collect(self) -> List[Tuple[Dict[str, str], List[int], int, float]]:
+        """(labels, cumulative bucket counts ending with +Inf, count, sum) per series"""
+        with self._lock:
+            series = [(key, list(counts), count, total) for key, (counts, count, total) in self._series.items()]
+        result = []
+        for key, counts, count, total in sorted(series):
+            cumulative, running = [], 0
+            for bucket_count in counts:
+                running += bucket_count
+                cumulative.append(running)
+            result.append((dict(zip(self.labels, key)), cumulative, count, total))
+        return result
+
+    def quantile(self, q: float, cumulative: List[int]) -> Optional[float]:
+        """Estimate a quantile from cumulative bucket counts by interpolating inside its bucket"""
+        count = cumulative[-1] if cumulative else 0
+        if not count:
+            return None
+        rank = q * count
+        for index, running in enumerate(cumulative):
+            if running >= rank:
+                if index >= len(self.buckets):
+                    return self.buckets[-1]  # In +Inf: the best bound there is
+                lower = self.buckets[index - 1] if index else 0.0
+                previous = cumulative[index - 1] if index else 0
+                in_bucket = running - previous
+                return lower + (self.buckets[index] - lower) * ((rank - previous) / in_bucket if in_bucket else 1)
+        return self.buckets[-1]
+
+    def summary(self) -> List[Dict]:
+        """Count, mean and estimated p50/p90/p99 per series, for status endpoints"""
+        rows = []
+        for labels, cumulative, count, total in self.collect():
+            rows.append({
+                **labels,
+                "count": count,
+                "mean_seconds": round(total / count, 6) if count else None,
+                **{
+                    f"p{int(q * 100)}_seconds": round(value, 6) if value is not None else None
+                    for q in (0.5, 0.9, 0.99)
+                    for value in [self.quantile(q, cumulative)]
+                }
+            })
+        return rows
+
+    def samples(self):
+        result = []
+        for labels, cumulative, count, total in self.collect():
+            for bound, running in zip(self.buckets + (float("inf"),), cumulative):
+                result.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, running))
+            result.append((f"{self.name}_sum", labels, total))
+            result.append((f"{self.name}_count", labels, count))
+        return result
+
+
+# Every metric of the process, by name
+_registry: Dict[str, Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(name: str, create: Callable[[], Metric]) -> Metric:
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = create()
+        return metric
+
+
+def histogram(name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """The histogram registered under name, created on first use"""
+    return _register(name, lambda: Histogram(name, description, labels, buckets))
+
+
+def counter(name: str, description: str, labels: Sequence[str] = ()) -> Counter:
+    """The counter registered under name, created on first use"""
+    return _register(name, lambda: Counter(name, description, labels))
+
+
+def gauge(name: str, description: str, labels: Sequence[str] = ()) -> Gauge:
+    """The gauge registered under name, created on first use"""
+    return _register(name, lambda: Gauge(name, description, labels))
+
+
+def callback(name: str, description: str, kind: str, read: Callable[[], Iterable[Tuple[Dict[str, str], float]]]) -> CallbackMetric:
+    """Register a counter or gauge whose values read() supplies at render time"""
+    return _register(name, lambda: CallbackMetric(name, description, kind, read))
+
+
+def registered() -> List[Metric]:
+    with _registry_lock:
+        return list(_registry.values())
+
+
+# Storage backend failures, counted where they happen instead of printed
+STORAGE_ERRORS = counter("storage_errors_total", "Storage backend operations that failed", labels=("backend", "operation"))
+STORAGE_RETRIES = counter("storage_retries_total", "Storage backend calls retried after a transient failure", labels=("backend", "operation"))
+
+
+# Caches reporting hits/misses/evictions through stats(), by name
+_caches: Dict[str, object] = {}
+
+
+def register_cache(name: str, cache):
+    """Export a cache's own stats() counters as cache_*{cache=name}"""
+    _caches[name] = cache
+
+
+def _cache_stat(stat: str, *fallbacks: str):
+    def read():
+        for name, cache in sorted(_caches.items()):
+            stats = cache.stats()
+            for key in (stat, *fallbacks):
+                if key in stats:
+                    yield {"cache": name}, stats[key]
+                    break
+    return read
+
+
+callback("cache_hits_total", "Lookups answered by the cache", "counter", _cache_stat("hits"))
+callback("cache_misses_total", "Lookups the cache could not answer", "counter", _cache_stat("misses"))
+callback("cache_evictions_total", "Entries dropped to stay within the cache's bounds", "counter", _cache_stat("evictions"))
+callback("cache_entries", "Entries currently cached", "gauge", _cache_stat("entries", "size"))
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in sorted(registered(), key=lambda metric: metric.name):
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            if labels:
+                rendered = ",".join(f'{label}="{_escape(label_value)}"' for label, label_value in labels.items())
+                lines.append(f"{name}{{{rendered}}} {_format_value(value)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
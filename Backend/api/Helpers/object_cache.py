@@ -0,0 +1,229 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator, Callable, Optional
+from starlette.concurrency import run_in_threadpool
+from Helpers.coalesce import SingleFlight
+from Helpers.disk_cache import DiskLRUCache
+from Helpers.metrics import register_cache
+
+# Fetches an object (or the inclusive byte window start..end of it) from the origin
+Fetch = Callable[..., AsyncIterator[bytes]]
+
+
+class MemoryLRUCache:
+    """Byte-bounded in-memory LRU of whole small objects"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            content = self._entries.get(key)
+            if content is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return content
+
+    def put(self, key: str, content: bytes):
+        with self._lock:
+            self._total -= len(self._entries.pop(key, b""))
+            self._entries[key] = content
+            self._total += len(content)
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._total -= len(evicted)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._total -= len(self._entries.pop(key, b""))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+async def _iter_path(path: Path, start: int, end: Optional[int], chunk_size: int) -> AsyncIterator[bytes]:
+    f = await run_in_threadpool(open, path, "rb")
+    try:
+        await run_in_threadpool(f.seek, start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            chunk = await run_in_threadpool(f.read, chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        await run_in_threadpool(f.close)
+
+
+class ObjectCache:
+    """
+    Read-through cache of remote storage objects, in two tiers: small
+    objects in memory, larger ones on local disk, each with its own byte
+    budget. Objects are keyed on their storage path, which for blobs is
+    content-addressed and never rewritten, so entries only go stale when a
+    path is deleted or moved (see invalidate). Concurrent misses for one
+    object share a single fetch from the origin.
+    """
+
+    def __init__(
+        self,
+        memory: Optional[MemoryLRUCache],
+        memory_max_object: int,
+        disk: Optional[DiskLRUCache],
+        disk_max_object: int
+    ):
+        self.memory = memory
+        self.memory_max_object = memory_max_object if memory else 0
+        self.disk = disk
+        self.disk_max_object = disk_max_object if disk else 0
+        self._loads = SingleFlight()
+        self.loads = 0
+
+    def _key(self, file_path: str) -> str:
+        return hashlib.sha256(file_path.encode()).hexdigest()
+
+    def accepts(self, size: int) -> bool:
+        return size <= max(self.memory_max_object, self.disk_max_object)
+
+    async def _lookup(self, key: str, size: int):
+        if size <= self.memory_max_object:
+            return self.memory.get(key)
+        if size <= self.disk_max_object:
+            return await run_in_threadpool(self.disk.get, key)
+        return None
+
+    async def _load(self, key: str, size: int, fetch: Fetch):
+        self.loads += 1
+        if size <= self.memory_max_object:
+            self.memory.put(key, b"".join([chunk async for chunk in fetch()]))
+            return
+
+        tmp_path = await run_in_threadpool(self.disk.temp_path, key)
+        f = await run_in_threadpool(open, tmp_path, "wb")
+        try:
+            async for chunk in fetch():
+                await run_in_threadpool(f.write, chunk)
+        except BaseException:
+            await run_in_threadpool(f.close)
+            await run_in_threadpool(tmp_path.unlink, True)
+            raise
+        await run_in_threadpool(f.close)
+        await run_in_threadpool(self.disk.put_file, key, tmp_path)
+
+    async def iter_range(
+        self,
+        file_path: str,
+        size: int,
+        fetch: Fetch,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = 64 * 1024
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield start..end (inclusive) of an object of the given size, loading
+        the whole object into the cache first on a miss
+        """
+        key = self._key(file_path)
+        cached = await self._lookup(key, size)
+        if cached is None:
+            await self._loads.run(key, lambda: self._load(key, size, fetch))
+            cached = await self._lookup(key, size)
+
+        if isinstance(cached, bytes):
+            window = cached[start:None if end is None else end + 1]
+            for offset in range(0, len(window), chunk_size):
+                yield window[offset:offset + chunk_size]
+        elif cached is not None:
+            async for chunk in _iter_path(cached, start, end, chunk_size):
+                yield chunk
+        else:
+            # Evicted again before we got to it: go to the origin
+            async for chunk in fetch(start=start, end=end):
+                yield chunk
+
+    async def get(self, file_path: str) -> Optional[bytes]:
+        """A whole cached object, from either tier"""
+        key = self._key(file_path)
+        if self.memory:
+            content = self.memory.get(key)
+            if content is not None:
+                return content
+        if self.disk:
+            path = await run_in_threadpool(self.disk.get, key)
+            if path is not None:
+                return await run_in_threadpool(path.read_bytes)
+        return None
+
+    async def put(self, file_path: str, content: bytes):
+        """Cache an object that was read whole anyway"""
+        key = self._key(file_path)
+        if len(content) <= self.memory_max_object:
+            self.memory.put(key, content)
+        elif len(content) <= self.disk_max_object:
+            await run_in_threadpool(self.disk.put, key, content)
+
+    async def invalidate(self, file_path: str):
+        key = self._key(file_path)
+        if self.memory:
+            self.memory.delete(key)
+        if self.disk:
+            await run_in_threadpool(self.disk.delete, key)
+
+    def stats(self) -> dict:
+        return {
+            "memory": self.memory.stats() if self.memory else None,
+            "disk": self.disk.stats() if self.disk else None,
+            "loads": self.loads
+        }
+
+
+# Singleton instance
+_object_cache = None
+
+def get_object_cache() -> Optional[ObjectCache]:
+    """The configured cache, or None when both tiers are disabled"""
+    global _object_cache
+    if _object_cache is None:
+        from Auth.config import settings
+        memory = disk = None
+        if settings.OBJECT_CACHE_MEMORY_MB > 0:
+            memory = MemoryLRUCache(max_bytes=settings.OBJECT_CACHE_MEMORY_MB * 1024 * 1024)
+        if settings.OBJECT_CACHE_DISK_MB > 0:
+            disk = DiskLRUCache(
+                root=settings.OBJECT_CACHE_PATH,
+                max_bytes=settings.OBJECT_CACHE_DISK_MB * 1024 * 1024
+            )
+        if memory is None and disk is None:
+            return None
+        if memory is not None:
+            register_cache("object_memory", memory)
+        if disk is not None:
+            register_cache("object_disk", disk)
+        _object_cache = ObjectCache(
+            memory=memory,
+            memory_max_object=settings.OBJECT_CACHE_MEMORY_MAX_OBJECT_KB * 1024,
+            disk=disk,
+            disk_max_object=settings.OBJECT_CACHE_DISK_MAX_OBJECT_MB * 1024 * 1024
+        )
+    return _object_cache
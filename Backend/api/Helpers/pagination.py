@@ -0,0 +1,83 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Optional, Tuple
+from sqlalchemy import func, select, tuple_
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor can't be decoded or belongs to another sort"""
+
+
+def encode_cursor(sort: str, value: Any, row_id: int) -> str:
+    """Opaque cursor pointing just past (value, row_id) in the given sort order"""
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    payload = json.dumps([sort, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["dt"])
+        row_id = int(row_id)
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor("Invalid cursor")
+    if cursor_sort != sort:
+        raise InvalidCursor("Cursor was issued for a different sort")
+    return value, row_id
+
+
+async def paginate(db, query, sort: str, sort_column, id_column, descending: bool = False,
+                   cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE, entities: bool = False):
+    """
+    Keyset pagination of a select() over (sort_column, id_column). Seeks
+    straight to the cursor through a composite index instead of using OFFSET,
+    so every page costs the same however deep it is. sort_column must be NOT
+    NULL: the tuple comparison never matches a NULL, so such rows would be
+    skipped. Set entities=True when
+    the query selects a single ORM entity to get objects instead of rows.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    key = tuple_(sort_column, id_column)
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort)
+        # Seek from the cursor row's stored value so it compares exactly as the
+        # database stores it; the encoded value is only used if that row is gone
+        table = sort_column.table.alias()
+        stored = select(table.c[sort_column.key]).where(table.c[id_column.key] == row_id).scalar_subquery()
+        boundary = tuple_(func.coalesce(stored, value), row_id)
+        query = query.filter(key < boundary if descending else key > boundary)
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    # One extra row tells us whether there is a next page
+    result = await db.execute(query.limit(limit + 1))
+    rows = result.scalars().all() if entities else result.all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, sort_column.key), getattr(last, id_column.key))
+    return rows, next_cursor
+
+
+def stream_json_array(items: Iterable[str]) -> Iterator[bytes]:
+    """Yield an already-encoded sequence of JSON values as one JSON array"""
+    yield b"["
+    first = True
+    for item in items:
+        if not first:
+            yield b","
+        first = False
+        yield item.encode()
+    yield b"]"
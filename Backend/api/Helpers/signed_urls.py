@@ -0,0 +1,109 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+class InvalidSignedURL(ValueError):
+    """Raised for a share token that is malformed, tampered with or expired"""
+
+
+@dataclass(frozen=True)
+class SignedObject:
+    """Everything needed to serve a shared file, carried in the token itself"""
+    file_id: int
+    file_path: str
+    content_type: Optional[str]
+    file_name: str
+    file_size: int
+    sha256_hash: Optional[str]
+    created_at: Optional[int]  # Unix seconds, for Last-Modified
+    is_public: bool  # Public file in a public bucket: shared caches may keep it
+    expires_at: int
+    stored_size: Optional[int] = None  # Size in storage, when compressed at rest
+    compression: Optional[str] = None
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signing_key(secret: str, purpose: str) -> bytes:
+    # Derived, so share links, other signed links and JWTs never share a key even with one SECRET_KEY
+    return hashlib.sha256(f"{purpose}:".encode() + secret.encode()).digest()
+
+
+def sign_claims(claims: Dict, secret: str, purpose: str = "signed-url") -> str:
+    """Encode claims (which carry their expiry as "e") as "<payload>.<signature>", both base64url"""
+    payload = json.dumps(claims, separators=(",", ":")).encode()
+    signature = hmac.new(_signing_key(secret, purpose), payload, hashlib.sha256).digest()
+    return f"{_b64encode(payload)}.{_b64encode(signature)}"
+
+
+def verify_claims(token: str, secret: str, purpose: str = "signed-url", now: Optional[float] = None) -> Dict:
+    """Check the signature and expiry of a token, in memory only, and return its claims"""
+    try:
+        payload_text, signature_text = token.split(".")
+        payload = _b64decode(payload_text)
+        signature = _b64decode(signature_text)
+    except ValueError:
+        raise InvalidSignedURL("Malformed link")
+
+    expected = hmac.new(_signing_key(secret, purpose), payload, hashlib.sha256).digest()
+    if not hmac.compare_digest(signature, expected):
+        raise InvalidSignedURL("Invalid signature")
+
+    try:
+        claims = json.loads(payload)
+        expires_at = float(claims["e"])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidSignedURL("Malformed link")
+
+    if expires_at <= (now if now is not None else time.time()):
+        raise InvalidSignedURL("Link expired")
+    return claims
+
+
+def sign(obj: SignedObject, secret: str) -> str:
+    """Encode obj as a share token"""
+    return sign_claims({
+        "f": obj.file_id,
+        "p": obj.file_path,
+        "t": obj.content_type,
+        "n": obj.file_name,
+        "s": obj.file_size,
+        "h": obj.sha256_hash,
+        "m": obj.created_at,
+        "u": obj.is_public,
+        "e": obj.expires_at,
+        "z": obj.stored_size,
+        "c": obj.compression
+    }, secret)
+
+
+def verify(token: str, secret: str, now: Optional[float] = None) -> SignedObject:
+    """Check the signature and expiry of a share token, in memory only"""
+    data = verify_claims(token, secret, now=now)
+    try:
+        return SignedObject(
+            file_id=data["f"],
+            file_path=data["p"],
+            content_type=data["t"],
+            file_name=data["n"],
+            file_size=data["s"],
+            sha256_hash=data["h"],
+            created_at=data["m"],
+            is_public=data["u"],
+            expires_at=data["e"],
+            stored_size=data.get("z"),
+            compression=data.get("c")
+        )
+    except (ValueError, KeyError, TypeError):
+        raise InvalidSignedURL("Malformed link")
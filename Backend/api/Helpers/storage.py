@@ -1,14 +1,16 @@
 from pathlib import Path
-import hashlib
 import uuid
 import shutil
 import os
-from typing import List, Dict
+import io
+from typing import BinaryIO, List, Dict
 from datetime import datetime
 from model.File import File
 from model.Bucket import Bucket
 from sqlalchemy import func
 from sqlalchemy.orm import Session
+from Helpers.cloud_storage import CHUNK_SIZE, FileTooLargeError
+from Helpers.hashing import StreamHasher, digest_bytes
 
 class StorageManager:
 
@@ -64,10 +66,7 @@ class StorageManager:
         return bucket_dir
 
     def _calculate_hashes(self, content: bytes) -> Dict[str, str]:
-        return {
-            "md5": hashlib.md5(content).hexdigest(),
-            "sha256": hashlib.sha256(content).hexdigest()
-        }
+        return digest_bytes(content)
 
     # MAIN FUNCTION
 
@@ -79,10 +78,27 @@ class StorageManager:
         file_content_type: str
     ) -> Dict:
 
-        file_name = self._sanitize_filename(file_name)
-        file_size = len(content)
+        return self.save_file_stream(
+            file_name=file_name,
+            stream=io.BytesIO(content),
+            bucket_id=bucket_id,
+            file_content_type=file_content_type
+        )
 
-        self._validate_file_size(file_size)
+    def save_file_stream(
+        self,
+        file_name: str,
+        stream: BinaryIO,
+        bucket_id: int,
+        file_content_type: str,
+        chunk_size: int = CHUNK_SIZE
+    ) -> Dict:
+        """
+        Write a file-like object to disk chunk by chunk, hashing and enforcing
+        max_file_size as the bytes arrive instead of buffering the whole file.
+        """
+
+        file_name = self._sanitize_filename(file_name)
         extension = self._validate_extension(file_name)
 
         file_id = self._generate_file_id()
@@ -91,17 +107,39 @@ class StorageManager:
         stored_filename = f"{file_id}.{extension}"
         file_path = bucket_dir / stored_filename
 
-        # Try to save file (will fail on Vercel)
+        hasher = StreamHasher()
+        file_size = 0
+
+        # Try to open the target file (will fail on Vercel)
         try:
-            with open(file_path, "wb") as f:
-                f.write(content)
+            out = open(file_path, "wb")
         except (OSError, PermissionError):
             # On Vercel: Use cloud storage instead (S3, Azure, etc.)
             # For now, just store metadata
-            pass
+            out = None
+
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                file_size += len(chunk)
+                if file_size > self.max_file_size:
+                    raise FileTooLargeError("File size exceeded the limit")
+                hasher.update_blocking(chunk)
+                if out:
+                    out.write(chunk)
+        except Exception:
+            if out:
+                out.close()
+                file_path.unlink(missing_ok=True)
+            raise
+
+        if out:
+            out.close()
 
-        hashes = self._calculate_hashes(content)
         upload_date = datetime.utcnow()
+        digests = hasher.hexdigests_blocking()
 
         return {
             "file_id": file_id,
@@ -111,8 +149,8 @@ class StorageManager:
             "file_size": file_size,
             "content_type": file_content_type,
             "file_path": str(file_path),
-            "md5_hash": hashes["md5"],
-            "sha256_hash": hashes["sha256"],
+            "md5_hash": digests["md5"],
+            "sha256_hash": digests["sha256"],
             "uploaded_at": upload_date.isoformat()
         }
 
@@ -145,7 +183,8 @@ class StorageManager:
         return total or 0
 
     def check_storage_Quota(self, file: dict, bucket: Bucket, db: Session):
-        current_used = self.get_current_used_storage(bucket_id=bucket.id, db=db)
+        # O(1): the bucket keeps a running counter, see QuotaService
+        current_used = bucket.used_Storage or 0
     
         # Calculate total after upload
         total_after_upload = current_used + file["file_size"]
@@ -0,0 +1,507 @@
+import asyncio
+import os
+import random
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, NamedTuple, Optional
+
+import httpx
+
+from Auth.config import settings
+from Helpers.metrics import STORAGE_ERRORS, STORAGE_RETRIES, histogram
+
+# Objects are read and written in pieces of this size
+CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Responses worth another try: the backend or something in front of it was briefly unavailable
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Time to response headers of each blob API call (each attempt, retries included)
+BLOB_REQUEST_SECONDS = histogram(
+    "blob_request_seconds",
+    "Blob backend request latency to response headers, per attempt",
+    labels=("operation", "outcome")
+)
+
+
+class StoredObject(NamedTuple):
+    """One entry of StorageBackend.list_objects()"""
+    key: str
+    file_path: str  # As returned by write(), i.e. what the DB stores
+    size: int
+    modified: float  # Unix timestamp
+
+
+class StorageBackend(ABC):
+    """
+    Async byte storage used by CloudStorageManager. Objects are addressed by a
+    key on write (e.g. "bucket_1/<uuid>.png"); every write returns the
+    file_path to store in the DB, which the other operations accept back.
+    """
+
+    # Label of the backend in metrics
+    name = "storage"
+
+    @abstractmethod
+    async def write(
+        self,
+        key: str,
+        chunks: AsyncIterator[bytes],
+        content_type: Optional[str] = None,
+        overwrite: bool = False
+    ) -> Dict:
+        """Store the chunks under key and return {"file_path", "file_url"}"""
+
+    @abstractmethod
+    def iter_range(
+        self,
+        file_path: str,
+        start: int = 0,
+        end: Optional[int] = None,
+        chunk_size: int = CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Yield bytes start..end (inclusive) of a stored object"""
+
+    @abstractmethod
+    async def delete(self, file_path: str) -> bool:
+        """Delete an object, returning False when it could not be removed"""
+
+    @abstractmethod
+    async def exists(self, file_path: str) -> bool:
+        """Check whether an object exists"""
+
+    @abstractmethod
+    def list_objects(self) -> AsyncIterator[StoredObject]:
+        """Yield every stored object in ascending key order, without holding the whole listing"""
+
+    @abstractmethod
+    def object_key(self, file_path: str) -> Optional[str]:
+        """The key of a file_path, or None when it doesn't belong to this backend"""
+
+    def local_path(self, file_path: str) -> Optional[Path]:
+        """On-disk path of an object when the backend is the local filesystem"""
+        return None
+
+    async def close(self):
+        """Release pooled resources"""
+
+
+class LocalStorageBackend(StorageBackend):
+    """Filesystem storage; blocking file I/O runs on a dedicated thread pool"""
+
+    name = "local"
+
+    def __init__(self, root: str = "./.storage", io_threads: int = 16):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="storage-io")
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _result(self, path: Path) -> Dict:
+        key = path.relative_to(self.root).as_posix()
+        return {
+            "file_path": str(path),
+            "file_url": f"http://localhost:8000/files/{key}"
+        }
+
+    async def write(self, key, chunks, content_type=None, overwrite=False):
+        path = self.root / key
+        # Written next to the target and renamed into place once complete, so
+        # a failed or concurrent write never truncates what's already there
+        temp = path.with_name(f".{path.name}.{uuid.uuid4().hex}.partial")
+        await self._run(lambda: path.parent.mkdir(parents=True, exist_ok=True))
+        f = await self._run(open, temp, "wb")
+        try:
+            async for chunk in chunks:
+                await self._run(f.write, chunk)
+            await self._run(f.close)
+            if overwrite:
+                await self._run(os.replace, temp, path)
+            else:
+                # Fails with FileExistsError instead of replacing
+                await self._run(os.link, temp, path)
+        except BaseException:
+            # Don't leave a partial file behind
+            await self._run(f.close)
+            await self._run(lambda: temp.unlink(missing_ok=True))
+            raise
+        await self._run(lambda: temp.unlink(missing_ok=True))
+        return self._result(path)
+
+    async def iter_range(self, file_path, start=0, end=None, chunk_size=CHUNK_SIZE):
+        path = Path(file_path)
+        if not await self._run(path.exists):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        remaining = None if end is None else end - start + 1
+        f = await self._run(open, path, "rb")
+        try:
+            await self._run(f.seek, start)
+            while remaining is None or remaining > 0:
+                chunk = await self._run(f.read, chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+        finally:
+            await self._run(f.close)
+
+    async def delete(self, file_path):
+        path = Path(file_path)
+
+        def _unlink():
+            if not path.exists():
+                return False
+            try:
+                path.unlink()
+                return True
+            except OSError:
+                STORAGE_ERRORS.inc(backend=self.name, operation="delete")
+                return False
+
+        return await self._run(_unlink)
+
+    async def exists(self, file_path):
+        return await self._run(Path(file_path).exists)
+
+    async def list_objects(self):
+        def scan(directory: Path):
+            entries = []
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            # Sort "a/" after "a-b", as the full keys compare
+                            entries.append((entry.name + "/", entry.path, None))
+                        elif entry.is_file(follow_symlinks=False):
+                            entries.append((entry.name, entry.path, entry.stat()))
+            except FileNotFoundError:
+                pass
+            entries.sort(key=lambda e: e[0])
+            return entries
+
+        # Depth-first, one directory listing per level in memory
+        stack = [iter(await self._run(scan, self.root))]
+        prefixes = [""]
+        while stack:
+            entry = next(stack[-1], None)
+            if entry is None:
+                stack.pop()
+                prefixes.pop()
+                continue
+            name, path, stat = entry
+            if stat is None:
+                stack.append(iter(await self._run(scan, Path(path))))
+                prefixes.append(prefixes[-1] + name)
+                continue
+            key = prefixes[-1] + name
+            yield StoredObject(key, str(self.root / key), stat.st_size, stat.st_mtime)
+
+    def object_key(self, file_path):
+        try:
+            return Path(file_path).relative_to(self.root).as_posix()
+        except ValueError:
+            return None
+
+    def local_path(self, file_path):
+        path = Path(file_path)
+        if not path.exists():
+            raise FileNotFoundError(f"File not found: {file_path}")
+        return path
+
+    async def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class _Retry(Exception):
+    """A retryable response, raised inside iter_range's stream"""
+
+    def __init__(self, response: httpx.Response):
+        self.response = response
+
+
+class BlobStorageBackend(StorageBackend):
+    """
+    Vercel Blob REST storage over one pooled keep-alive httpx.AsyncClient, so
+    many transfers can be in flight from a single worker without blocking it
+    and repeat requests skip the TCP and TLS handshakes.
+
+    Idempotent calls (reads, HEAD, deletes, listings, and writes whose body
+    fits in memory) are retried on transport errors and RETRY_STATUSES with
+    exponential backoff and jitter; an interrupted read resumes where it
+    stopped with a Range request. Larger writes stream their body once, so
+    only failed connection attempts are retried. Every attempt is timed
+    into BLOB_REQUEST_SECONDS.
+    """
+
+    name = "blob"
+
+    def __init__(
+        self,
+        token: str,
+        base_url: str = "https://blob.vercel-storage.com",
+        max_connections: int = 100,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        keepalive_seconds: float = 30.0,
+        max_retries: int = 3,
+        retry_base_seconds: float = 0.1,
+        retry_max_seconds: float = 2.0,
+        replayable_bytes: int = 8 * 1024 * 1024
+    ):
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.replayable_bytes = replayable_bytes
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_seconds
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            # Connection failures happen before any of the body is sent, so every method can retry them
+            transport=httpx.AsyncHTTPTransport(retries=max_retries),
+            follow_redirects=True
+        )
+
+    def _auth(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def _key(self, file_path: str) -> str:
+        # Extract blob path from URL if needed
+        if file_path.startswith("http"):
+            return httpx.URL(file_path).path.lstrip("/")
+        return file_path
+
+    def _url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def _observe(self, operation: str, started: float, outcome: str):
+        BLOB_REQUEST_SECONDS.observe(time.perf_counter() - started, operation=operation, outcome=outcome)
+
+    def _delay(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Backoff before retry number attempt + 1: Retry-After if the backend sent one, else doubling with jitter"""
+        if response is not None:
+            try:
+                return min(float(response.headers["Retry-After"]), self.retry_max_seconds)
+            except (KeyError, ValueError):
+                pass
+        ceiling = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt)
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    async def _request(self, operation: str, method: str, url: str, retry_headers: Optional[Dict] = None, **kwargs) -> httpx.Response:
+        """
+        Send an idempotent request, retrying transport errors and
+        RETRY_STATUSES. retry_headers replace the headers from the second
+        attempt on.
+        """
+        attempt = 0
+        while True:
+            if attempt and retry_headers is not None:
+                kwargs["headers"] = retry_headers
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError:
+                self._observe(operation, started, "error")
+                if attempt >= self.max_retries:
+                    raise
+                STORAGE_RETRIES.inc(backend=self.name, operation=operation)
+                await asyncio.sleep(self._delay(attempt))
+            else:
+                self._observe(operation, started, f"{response.status_code // 100}xx")
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                STORAGE_RETRIES.inc(backend=self.name, operation=operation)
+                await asyncio.sleep(self._delay(attempt, response))
+            attempt += 1
+
+    async def _buffer(self, chunks: AsyncIterator[bytes]):
+        """
+        Read chunks up to replayable_bytes. Returns (body, None) when that
+        was all of them, else (chunks read so far, the unread iterator).
+        """
+        buffered, size = [], 0
+        iterator = chunks.__aiter__()
+        async for chunk in iterator:
+            buffered.append(chunk)
+            size += len(chunk)
+            if size > self.replayable_bytes:
+                return buffered, iterator
+        return b"".join(buffered), None
+
+    async def write(self, key, chunks, content_type=None, overwrite=False):
+        headers = {
+            **self._auth(),
+            "Content-Type": content_type or "application/octet-stream",
+            "x-vercel-blob-add-random-suffix": "0"
+        }
+        if overwrite:
+            headers["x-allow-overwrite"] = "1"
+
+        body, rest = await self._buffer(chunks)
+        if rest is None:
+            # In memory, so the PUT can be sent again. An earlier attempt may
+            # have landed before failing, and must not make the retry conflict
+            response = await self._request(
+                "write", "PUT", self._url(key),
+                headers=headers,
+                retry_headers={**headers, "x-allow-overwrite": "1"},
+                content=body
+            )
+        else:
+            async def stream():
+                for chunk in body:
+                    yield chunk
+                async for chunk in rest:
+                    yield chunk
+
+            # An async iterator body goes out with chunked transfer encoding, once
+            started = time.perf_counter()
+            try:
+                response = await self.client.put(self._url(key), headers=headers, content=stream())
+            except httpx.TransportError:
+                self._observe("write", started, "error")
+                raise
+            self._observe("write", started, f"{response.status_code // 100}xx")
+        response.raise_for_status()
+        file_url = response.json().get("url", self._url(key))
+        return {"file_path": file_url, "file_url": file_url}
+
+    async def iter_range(self, file_path, start=0, end=None, chunk_size=CHUNK_SIZE):
+        if file_path.startswith("http"):
+            # Stored URLs are directly readable
+            url, auth = file_path, {}
+        else:
+            url, auth = self._url(file_path), self._auth()
+
+        position = start
+        attempt = 0
+        while True:
+            headers = dict(auth)
+            if position or end is not None:
+                headers["Range"] = f"bytes={position}-{'' if end is None else end}"
+            started = time.perf_counter()
+            try:
+                async with self.client.stream("GET", url, headers=headers) as response:
+                    self._observe("read", started, f"{response.status_code // 100}xx")
+                    if response.status_code == 404:
+                        raise FileNotFoundError(f"File not found: {file_path}")
+                    if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                        raise _Retry(response)
+                    response.raise_for_status()
+                    # A server that ignores Range sends everything from byte 0
+                    skip = position if response.status_code == 200 else 0
+                    async for chunk in response.aiter_bytes(chunk_size):
+                        if skip:
+                            if len(chunk) <= skip:
+                                skip -= len(chunk)
+                                continue
+                            chunk, skip = chunk[skip:], 0
+                        if end is not None and position + len(chunk) > end + 1:
+                            chunk = chunk[:end + 1 - position]
+                        if chunk:
+                            position += len(chunk)
+                            yield chunk
+                        if end is not None and position > end:
+                            return
+                    return
+            except _Retry as retry:
+                STORAGE_RETRIES.inc(backend=self.name, operation="read")
+                await asyncio.sleep(self._delay(attempt, retry.response))
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+                # Picks up after the bytes already yielded
+                STORAGE_RETRIES.inc(backend=self.name, operation="read")
+                await asyncio.sleep(self._delay(attempt))
+            attempt += 1
+
+    async def delete(self, file_path):
+        try:
+            response = await self._request("delete", "DELETE", self._url(self._key(file_path)), headers=self._auth())
+            return response.status_code in [200, 204]
+        except httpx.HTTPError:
+            STORAGE_ERRORS.inc(backend=self.name, operation="delete")
+            return False
+
+    async def exists(self, file_path):
+        try:
+            response = await self._request("exists", "HEAD", self._url(self._key(file_path)), headers=self._auth())
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    async def list_objects(self, page_size: int = 1000):
+        cursor = None
+        while True:
+            params = {"limit": page_size}
+            if cursor:
+                params["cursor"] = cursor
+            response = await self._request("list", "GET", self.base_url, params=params, headers=self._auth())
+            response.raise_for_status()
+            page = response.json()
+            for item in page.get("blobs", []):
+                modified = datetime.fromisoformat(item["uploadedAt"].replace("Z", "+00:00")).timestamp()
+                yield StoredObject(item["pathname"], item["url"], item["size"], modified)
+            cursor = page.get("cursor")
+            if not page.get("hasMore") or not cursor:
+                return
+
+    def object_key(self, file_path):
+        return self._key(file_path)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+# Singleton instance
+_storage_backend = None
+
+def get_storage_backend() -> StorageBackend:
+    """
+    Build the configured backend once per process. STORAGE_BACKEND selects
+    "local" or "blob"; when unset, blob is used if a blob token is present.
+    """
+    global _storage_backend
+    if _storage_backend is None:
+        backend = settings.STORAGE_BACKEND or ("blob" if settings.BLOB_READ_WRITE_TOKEN else "local")
+        if backend == "blob":
+            _storage_backend = BlobStorageBackend(
+                token=settings.BLOB_READ_WRITE_TOKEN,
+                base_url=settings.BLOB_BASE_URL,
+                max_connections=settings.BLOB_MAX_CONNECTIONS,
+                timeout=settings.BLOB_TIMEOUT_SECONDS,
+                connect_timeout=settings.BLOB_CONNECT_TIMEOUT_SECONDS,
+                keepalive_seconds=settings.BLOB_KEEPALIVE_SECONDS,
+                max_retries=settings.BLOB_MAX_RETRIES,
+                retry_base_seconds=settings.BLOB_RETRY_BASE_SECONDS,
+                retry_max_seconds=settings.BLOB_RETRY_MAX_SECONDS,
+                replayable_bytes=settings.BLOB_RETRY_BUFFER_MB * 1024 * 1024
+            )
+        elif backend == "local":
+            _storage_backend = LocalStorageBackend(
+                root=settings.LOCAL_STORAGE_PATH,
+                io_threads=settings.STORAGE_IO_THREADS
+            )
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+    return _storage_backend
+
+
+async def close_storage_backend():
+    """Close the configured backend's pooled resources (on app shutdown)"""
+    global _storage_backend
+    if _storage_backend is not None:
+        await _storage_backend.close()
+        _storage_backend = None
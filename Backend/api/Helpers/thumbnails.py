@@ -0,0 +1,140 @@
+import asyncio
+import io
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Sequence
+from PIL import Image, ImageOps, UnidentifiedImageError
+from starlette.concurrency import run_in_threadpool
+
+THUMBNAIL_CONTENT_TYPE = "image/webp"
+
+# Output formats of the transform endpoint: format -> (Pillow format, content type)
+TRANSFORM_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png")
+}
+
+# Image types the pipeline can decode (a subset of StorageManager.allowed_extensions)
+THUMBNAIL_EXTENSIONS = {"jpg", "jpeg", "png", "gif"}
+THUMBNAIL_SOURCE_TYPES = {"image/jpeg", "image/png", "image/gif"}
+
+
+class ThumbnailError(ValueError):
+    """Raised when an image can't be decoded or resized"""
+
+
+def is_thumbnailable(file_name: str, content_type: Optional[str] = None) -> bool:
+    extension = file_name.split(".")[-1].lower() if "." in file_name else ""
+    return extension in THUMBNAIL_EXTENSIONS or content_type in THUMBNAIL_SOURCE_TYPES
+
+
+def _open_image(content: bytes, draft_size: Optional[int] = None) -> Image.Image:
+    """Decode content upright, as RGB or RGBA"""
+    image = Image.open(io.BytesIO(content))
+    if draft_size:
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale, far cheaper than a full decode
+        image.draft("RGB", (draft_size, draft_size))
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    return image.convert("RGBA" if has_alpha else "RGB")
+
+
+def render_thumbnails(content: bytes, sizes: Sequence[int], quality: int = 80) -> List[Dict]:
+    """
+    Resize an image to fit each of sizes (longest edge, never upscaled) and
+    encode the results as WebP. Runs in a worker process, so it only takes
+    and returns plain picklable values.
+    """
+    try:
+        image = _open_image(content, draft_size=max(sizes))
+        rendered = []
+        # Largest first, each size resized from the previous one
+        for size in sorted(set(sizes), reverse=True):
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, format="WEBP", quality=quality, method=4)
+            rendered.append({
+                "size": size,
+                "content": output.getvalue(),
+                "width": image.width,
+                "height": image.height
+            })
+        return rendered
+    except UnidentifiedImageError:
+        raise ThumbnailError("File is not a readable image")
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ThumbnailError(f"Could not render thumbnail: {e}")
+
+
+def render_transform(
+    content: bytes,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    fit: str = "contain",
+    fmt: str = "webp",
+    quality: int = 80
+) -> bytes:
+    """
+    Resize and re-encode an image. "contain" fits it inside width x height
+    keeping its aspect ratio (never upscaling); "cover" fills exactly width x
+    height, cropping around the centre. Runs in a worker process.
+    """
+    try:
+        image = _open_image(content, draft_size=max(width or 0, height or 0) or None)
+        if fit == "cover" and width and height:
+            image = ImageOps.fit(image, (width, height), Image.Resampling.LANCZOS)
+        elif width or height:
+            image.thumbnail((width or image.width, height or image.height), Image.Resampling.LANCZOS)
+
+        pil_format, _ = TRANSFORM_FORMATS[fmt]
+        if pil_format == "JPEG" and image.mode == "RGBA":
+            # JPEG has no alpha: flatten onto white
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+
+        output = io.BytesIO()
+        if pil_format == "PNG":
+            image.save(output, format=pil_format, optimize=True)
+        else:
+            image.save(output, format=pil_format, quality=quality)
+        return output.getvalue()
+    except UnidentifiedImageError:
+        raise ThumbnailError("File is not a readable image")
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ThumbnailError(f"Could not transform image: {e}")
+
+
+# Singleton instance
+_thumbnail_pool = None
+
+def get_thumbnail_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Worker processes for thumbnails and transforms, so CPU-bound image work
+    never blocks the event loop or holds the GIL. THUMBNAIL_WORKERS=0 falls
+    back to threads.
+    """
+    global _thumbnail_pool
+    if _thumbnail_pool is None:
+        from Auth.config import settings
+        if settings.THUMBNAIL_WORKERS > 0:
+            _thumbnail_pool = ProcessPoolExecutor(max_workers=settings.THUMBNAIL_WORKERS)
+    return _thumbnail_pool
+
+
+async def run_image_job(func, *args, **kwargs):
+    """Run one of the render functions above in the worker pool"""
+    pool = get_thumbnail_pool()
+    if pool is None:
+        return await run_in_threadpool(func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pool, partial(func, *args, **kwargs))
+
+
+def shutdown_thumbnail_pool():
+    """Stop the worker processes (on app shutdown)"""
+    global _thumbnail_pool
+    if _thumbnail_pool is not None:
+        _thumbnail_pool.shutdown(wait=False, cancel_futures=True)
+        _thumbnail_pool = None
@@ -0,0 +1,16 @@
+from Helpers.disk_cache import DiskLRUCache
+from Helpers.metrics import register_cache
+
+# Singleton instance
+_transform_cache = None
+
+def get_transform_cache() -> DiskLRUCache:
+    global _transform_cache
+    if _transform_cache is None:
+        from Auth.config import settings
+        _transform_cache = DiskLRUCache(
+            root=settings.TRANSFORM_CACHE_PATH,
+            max_bytes=settings.TRANSFORM_CACHE_MAX_MB * 1024 * 1024
+        )
+        register_cache("transform", _transform_cache)
+    return _transform_cache
@@ -2,42 +2,46 @@
 
 # this is file_Services.py
 from fastapi import UploadFile, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from model.User import User
 from api.database import get_db
 from Services.Storage_services import StorageService
 
 
-def upload_file_Service(user: User, bucket_id: int, file: UploadFile, db: Session = Depends(get_db)):
+async def upload_file_Service(user: User, bucket_id: int, file: UploadFile, db: AsyncSession = Depends(get_db)):
     storage_service = StorageService(db=db)
-    content = file.file.read()
     file_data = {
         "name": file.filename,
-        "content": content,
+        "stream": file,
         "content_type": file.content_type,
-        "file_size": len(content)
+        "file_size": file.size
     }
     
-    result = storage_service.upload_file(user=user, bucket_id=bucket_id, file=file_data)
+    result = await storage_service.upload_file(user=user, bucket_id=bucket_id, file=file_data)
     
     return result
 
 
-def delete_file_service(user: User, file_id: int, db: Session = Depends(get_db)):
+async def delete_file_service(user: User, file_id: int, db: AsyncSession = Depends(get_db)):
     storage_service = StorageService(db=db)
-    return storage_service.delete_file(user=user, file_id=file_id)
+    return await storage_service.delete_file(user=user, file_id=file_id)
 
 
-def download_file_service(user: User, file_id: int, db: Session = Depends(get_db)):
+async def restore_file_service(user: User, file_id: int, db: AsyncSession = Depends(get_db)):
     storage_service = StorageService(db=db)
-    return storage_service.download_file(user=user, file_id=file_id)
+    return await storage_service.restore_file(user=user, file_id=file_id)
 
 
-def move_file_service(user: User, file_id: int, target_bucket_id: int, db: Session = Depends(get_db)):
+async def download_file_service(user: User, file_id: int, db: AsyncSession = Depends(get_db)):
     storage_service = StorageService(db=db)
-    return storage_service.move_file(user=user, file_id=file_id, target_bucket_id=target_bucket_id)
+    return await storage_service.download_file(user=user, file_id=file_id)
 
 
-def list_files_service(user: User, bucket_id: int, db: Session = Depends(get_db)):
+async def move_file_service(user: User, file_id: int, target_bucket_id: int, db: AsyncSession = Depends(get_db)):
     storage_service = StorageService(db=db)
-    return storage_service.list_files(user=user, bucket_id=bucket_id)
\ No newline at end of file
+    return await storage_service.move_file(user=user, file_id=file_id, target_bucket_id=target_bucket_id)
+
+
+async def list_files_service(user: User, bucket_id: int, db: AsyncSession = Depends(get_db), **filters):
+    storage_service = StorageService(db=db)
+    return await storage_service.list_files(user=user, bucket_id=bucket_id, **filters)
\ No newline at end of file
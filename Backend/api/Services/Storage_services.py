@@ -1,30 +1,85 @@
 
 #This is storage services.py
-from Helpers.cloud_storage import get_cloud_storage_manager
+from Helpers.cloud_storage import get_cloud_storage_manager, FileTooLargeError
 from api.database import get_db
 from model.User import User
 from model.File import File
 from model.Bucket import Bucket
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from schemas.File import File_Response_Schema
+from Services.blob_service import BlobService
+from Services.quota_service import QuotaService, charged_size
+from Services.file_repository import FileRepository, LIVE_FILES, TRASHED_FILES
+from Services.background_jobs import enqueue_delete, enqueue_post_upload
+from Services.job_queue import notify_workers
+from Helpers.pagination import DEFAULT_PAGE_SIZE, InvalidCursor, paginate
+from datetime import datetime
+
+# Sortable columns for file listings; each has a (bucket_id, column, id) index
+# and must be NOT NULL, or paginate() would skip the rows without a value
+FILE_SORT_COLUMNS = {
+    "created_at": File.created_at,
+    "file_name": File.file_name,
+    "file_size": File.file_size
+}
+
+def filter_files(
+    query,
+    content_type: str | None = None,
+    name_prefix: str | None = None,
+    min_size: int | None = None,
+    max_size: int | None = None,
+    created_after: datetime | None = None,
+    created_before: datetime | None = None
+):
+    """
+    Apply the listing filters to a File query. content_type matches exactly,
+    or by family when it ends in "/*" (e.g. "image/*").
+    """
+    if content_type:
+        if content_type.endswith("/*"):
+            query = query.filter(File.file_content_type.startswith(content_type[:-1], autoescape=True))
+        else:
+            query = query.filter(File.file_content_type == content_type)
+    if name_prefix:
+        query = query.filter(File.file_name.startswith(name_prefix, autoescape=True))
+    if min_size is not None:
+        query = query.filter(File.file_size >= min_size)
+    if max_size is not None:
+        query = query.filter(File.file_size <= max_size)
+    if created_after:
+        query = query.filter(File.created_at >= created_after)
+    if created_before:
+        query = query.filter(File.created_at < created_before)
+    return query
+
 
 class StorageService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.storage_manager = get_cloud_storage_manager()
+        self.blob_service = BlobService(db=db, storage_manager=self.storage_manager)
+        self.quota_service = QuotaService(db=db)
+        self.files = FileRepository(db=db)
 
-    def upload_file(self, user: User, bucket_id: int, file: dict):
+    async def upload_file(self, user: User, bucket_id: int, file: dict):
         """
         Handles uploading a file to a bucket:
         1. Check bucket exists
         2. Check if user owns bucket
-        3. Check storage quota
-        4. Save file to disk through StorageManager
-        5. Save metadata to DB
+        3. Check storage quota (O(1), against the bucket's usage counter)
+        4. Stream file to storage through the storage manager, compressed
+           when the bucket asks for it and the type is compressible
+        5. Save metadata to DB and reserve quota in one transaction
+        Everything else (thumbnails, checks, cleanup) is queued as background jobs.
+
+        file["stream"] is a file-like object read in chunks; file["file_size"] is the
+        declared size (may be None) and file["max_size"] an optional upload limit.
         """
         # Get bucket
-        bucket = self.db.query(Bucket).filter(Bucket.id == bucket_id).first()
+        bucket = await self.db.get(Bucket, bucket_id)
         if not bucket:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bucket not found")
 
@@ -32,51 +87,142 @@ class StorageService:
         if bucket.user_id != user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not own this bucket")
 
-        # Check storage quota
+        # Check storage quota against the declared size before reading any bytes
         try:
-            self.storage_manager.check_storage_Quota(file=file, bucket=bucket, db=self.db)
+            self.storage_manager.check_storage_Quota(
+                file={"file_size": file.get("file_size") or 0}, bucket=bucket, db=self.db
+            )
         except ValueError as e:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-        # Save file to disk
-        metadata = self.storage_manager.save_file(
-            file_name=file["name"],
-            content=file["content"],
-            bucket_id=bucket.id,
-            file_content_type=file["content_type"]
-        )
-
-        # Save metadata to DB
-        new_file = File(
+        # Content the user already stored elsewhere is linked, not written again
+        if file.get("sha256_hash"):
+            blob = await self.blob_service.find_for_user(user_id=user.id, sha256_hash=file["sha256_hash"].lower())
+            linked = await self.link_blob(
+                bucket=bucket,
+                blob=blob,
+                file_name=file["name"],
+                content_type=file["content_type"],
+                max_size=file.get("max_size")
+            ) if blob else None
+            if linked:
+                return linked
+
+        # Stream file to storage
+        try:
+            metadata = await self.storage_manager.save_file_stream(
+                file_name=file["name"],
+                stream=file["stream"],
+                bucket_id=bucket.id,
+                file_content_type=file["content_type"],
+                max_size=file.get("max_size"),
+                compression=bucket.compression
+            )
+        except FileTooLargeError as e:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+        # The stored size is charged atomically together with the File insert
+        return await self.save_metadata(bucket=bucket, metadata=metadata)
+
+    async def save_metadata(self, bucket: Bucket, metadata: dict):
+        """
+        Record freshly written content in the DB and charge its stored size
+        to the bucket, all in one transaction. If the same content is already
+        stored, the new copy is dropped and the file shares the existing blob
+        (and is charged that blob's stored size).
+        """
+        blob = await self.blob_service.acquire(metadata)
+        try:
+            await self.quota_service.reserve(bucket.id, self.blob_stored_size(blob))
+        except HTTPException:
+            await self.db.rollback()
+            await self.storage_manager.delete_file(metadata["file_path"])
+            raise
+
+        # Duplicate content: the copy we just wrote is dropped in the background
+        new_content = blob.blob_path == metadata["file_path"]
+        if not new_content:
+            enqueue_delete(self.db, [metadata["file_path"]])
+
+        return await self._create_file(
+            bucket=bucket,
+            blob=blob,
             file_name=metadata["original_name"],
-            file_size=metadata["file_size"],
-            bucket_id=bucket.id,
-            file_content_type=metadata["content_type"],
-            file_path=metadata["file_path"],
-            file_url=metadata.get("file_url")  # Add cloud storage URL
+            content_type=metadata["content_type"],
+            file_url=metadata.get("file_url") if new_content else None,
+            new_content=new_content
         )
+
+    async def link_blob(self, bucket: Bucket, blob, file_name: str, content_type: str, max_size: int | None = None):
+        """
+        Create a file for content that is already stored, without any storage
+        I/O. Returns None when the blob was collected since it was looked up;
+        nothing has been written then, and the caller stores the content itself.
+        """
+        if max_size is not None and blob.blob_size > max_size:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"File size exceeded the limit of {max_size} bytes")
+
+        # Referenced first: once it holds a reference the blob can't be collected
+        referenced = await self.blob_service.reference(blob)
+        if referenced is None:
+            return None
+
+        try:
+            await self.quota_service.reserve(bucket.id, self.blob_stored_size(referenced))
+        except HTTPException:
+            await self.db.rollback()
+            raise
+
+        return await self._create_file(bucket=bucket, blob=referenced, file_name=file_name, content_type=content_type, new_content=False)
+
+    async def _create_file(
+        self,
+        bucket: Bucket,
+        blob,
+        file_name: str,
+        content_type: str,
+        file_url: str | None = None,
+        new_content: bool = True
+    ):
+        # Save metadata to DB; commits together with the quota reservation and the file's jobs
+        new_file = self.build_file(bucket=bucket, blob=blob, file_name=file_name, content_type=content_type, file_url=file_url)
         self.db.add(new_file)
-        self.db.commit()
-        self.db.refresh(new_file)
+        await self.db.flush()
+        enqueue_post_upload(self.db, new_file, user_id=bucket.user_id, new_content=new_content)
+        await self.db.commit()
+        await self.db.refresh(new_file)
 
-        # Update bucket usage
-        bucket.used_Storage += metadata["file_size"]
-        self.db.commit()
+        # Previews and checks run in the background, off the request path
+        notify_workers()
 
         return new_file
 
-    def download_file(self, user: User, file_id: int):
-        file = self.db.query(File).filter(File.id == file_id).first()
-        if not file:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
-
-        bucket = self.db.query(Bucket).filter(Bucket.id == file.bucket_id).first()
+    @staticmethod
+    def blob_stored_size(blob) -> int:
+        """Bytes a blob takes in storage (blobs from before compression have no stored_size)"""
+        return blob.stored_size if blob.stored_size is not None else blob.blob_size
+
+    def build_file(self, bucket: Bucket, blob, file_name: str, content_type: str, file_url: str | None = None) -> File:
+        """A File row for a blob, not yet added to the session"""
+        return File(
+            file_name=file_name,
+            file_size=blob.blob_size,
+            stored_size=self.blob_stored_size(blob),
+            compression=blob.compression,
+            bucket_id=bucket.id,
+            file_content_type=content_type,
+            file_path=blob.blob_path,
+            file_url=file_url,  # Add cloud storage URL
+            sha256_hash=blob.sha256_hash,
+            md5_hash=blob.md5_hash,
+            blob_id=blob.id
+        )
 
-        if bucket.user_id != user.id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You cannot access this bucket")
+    async def download_file(self, user: User, file_id: int):
+        file = await self.files.get_owned_file(user_id=user.id, file_id=file_id)
 
-        content = self.storage_manager.read_file(file.file_path)
-        if content is None:
+        exists = await self.storage_manager.file_exists(file.file_path)
+        if not exists:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="File not found on storage")
 
         return File_Response_Schema(
@@ -87,109 +233,133 @@ class StorageService:
             media_type=file.file_content_type
         )
 
-    def delete_file(self, user: User, file_id: int):
-        print(f"[DELETE_FILE] Attempting to delete file ID: {file_id}")
-        file = self.db.query(File).filter(File.id == file_id).first()
-        if not file:
-            print(f"[DELETE_FILE] ERROR: File ID {file_id} not found in database")
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"File with ID {file_id} not found in database")
-
-        print(f"[DELETE_FILE] File found: {file.file_name}, path: {file.file_path}, bucket_id: {file.bucket_id}")
-        bucket = self.db.query(Bucket).filter(Bucket.id == file.bucket_id).first()
-        if bucket.user_id != user.id:
-            print(f"[DELETE_FILE] ERROR: User {user.id} doesn't own bucket {bucket.id}")
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You cannot access this bucket")
-
-        # Check if file exists on disk
-        file_exists = self.storage_manager.file_exists(file.file_path)
-        print(f"[DELETE_FILE] File exists check: {file_exists} for path: {file.file_path}")
-        
-        if not file_exists:
-            print(f"[DELETE_FILE] WARNING: File not found on storage, deleting DB record anyway")
-            # Delete from database anyway to clean up orphaned records
-            self.db.delete(file)
-            self.db.commit()
-            # Update bucket usage
-            if bucket.used_Storage:
-                bucket.used_Storage = max(bucket.used_Storage - file.file_size, 0)
-            self.db.commit()
-            return {"detail": f"File metadata deleted (file not found in storage)"}
-
-        # Delete from disk
-        success = self.storage_manager.delete_file(file_path=file.file_path)
-        print(f"[DELETE_FILE] Storage deletion result: {success}")
-        if not success:
-            print(f"[DELETE_FILE] ERROR: Failed to delete file from storage")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="File could not be deleted from storage")
-
-        # Delete from database
-        self.db.delete(file)
-        self.db.commit()
-        print(f"[DELETE_FILE] DB record deleted")
-
-        # Update bucket usage
-        if bucket.used_Storage:
-            bucket.used_Storage = max(bucket.used_Storage - file.file_size, 0)
-        self.db.commit()
-        print(f"[DELETE_FILE] Bucket storage updated")
+    async def delete_file(self, user: User, file_id: int):
+        """
+        Move a file to the trash: one conditional UPDATE plus the quota
+        release, with no storage calls. Its content stays restorable until
+        the purge removes it (see BatchFileService.purge_deleted).
+        """
+        # Owner-checked and conditional, so concurrent deletes release the quota once
+        deleted = (await self.db.execute(
+            update(File)
+            .where(
+                File.id == file_id,
+                LIVE_FILES,
+                File.bucket_id.in_(select(Bucket.id).where(Bucket.user_id == user.id))
+            )
+            .values(is_deleted=True, deleted_at=func.now())
+            .returning(File.bucket_id, File.stored_size, File.file_size)
+            .execution_options(synchronize_session=False)
+        )).first()
+        if deleted is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
 
+        await self.quota_service.release(deleted.bucket_id, charged_size(deleted))
+        await self.db.commit()
         return {"detail": "File deleted successfully"}
 
-    def list_files(self, user: User, bucket_id: int):
-        bucket = self.db.query(Bucket).filter(Bucket.id == bucket_id).first()
+    async def restore_file(self, user: User, file_id: int):
+        """Take a file back out of the trash, charging its bucket again"""
+        file = await self.files.get_owned_file(user_id=user.id, file_id=file_id, deleted=True)
+        file_name = file.file_name
+        await self.quota_service.reserve(file.bucket_id, charged_size(file))
+        restored = await self.db.execute(
+            update(File)
+            .where(File.id == file.id, TRASHED_FILES)
+            .values(is_deleted=False, deleted_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        if restored.rowcount == 0:
+            # Purged or restored meanwhile
+            await self.db.rollback()
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+        await self.db.commit()
+        return {"detail": f"File '{file_name}' restored"}
+
+    async def list_files(
+        self,
+        user: User,
+        bucket_id: int,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        sort: str = "created_at",
+        order: str = "asc",
+        content_type: str | None = None,
+        name_prefix: str | None = None,
+        min_size: int | None = None,
+        max_size: int | None = None,
+        created_after: datetime | None = None,
+        created_before: datetime | None = None,
+        deleted: bool = False
+    ):
+        """
+        One page of a bucket's files (or, with deleted, of its trash), filtered
+        and sorted in the database. Returns (rows, next_cursor); pass
+        next_cursor back to get the next page.
+        """
+        bucket = await self.db.get(Bucket, bucket_id)
         if not bucket:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bucket not found")
 
         if bucket.user_id != user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You cannot access this bucket")
 
-        files = self.db.query(File).filter(File.bucket_id == bucket.id).all()
-        return [
-            {
-                "id": f.id,
-                "file_name": f.file_name,
-                "file_size": f.file_size,
-                "content_type": f.file_content_type,
-                "created_at": f.created_at.isoformat()
-            }
-            for f in files
-        ]
-
-    def move_file(self, user: User, file_id: int, target_bucket_id: int):
-        # Fetch file
-        file = self.db.query(File).filter(File.id == file_id).first()
-        if not file:
-            raise HTTPException(status_code=404, detail="File not found")
-
-        # Fetch source and target buckets
-        source_bucket = self.db.query(Bucket).filter(Bucket.id == file.bucket_id).first()
-        target_bucket = self.db.query(Bucket).filter(Bucket.id == target_bucket_id).first()
-        if not source_bucket or not target_bucket:
-            raise HTTPException(status_code=404, detail="Bucket not found")
+        if sort not in FILE_SORT_COLUMNS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"sort must be one of {', '.join(FILE_SORT_COLUMNS)}")
+
+        # Only the listed columns, not full ORM objects
+        query = select(
+            File.id, File.file_name, File.file_size, File.file_content_type, File.created_at, File.deleted_at
+        ).where(File.bucket_id == bucket.id, TRASHED_FILES if deleted else LIVE_FILES)
+
+        query = filter_files(
+            query,
+            content_type=content_type,
+            name_prefix=name_prefix,
+            min_size=min_size,
+            max_size=max_size,
+            created_after=created_after,
+            created_before=created_before
+        )
 
-        # Check ownership
-        if source_bucket.user_id != user.id or target_bucket.user_id != user.id:
-            raise HTTPException(status_code=403, detail="You do not own one of the buckets")
+        try:
+            return await paginate(
+                self.db,
+                query,
+                sort=sort,
+                sort_column=FILE_SORT_COLUMNS[sort],
+                id_column=File.id,
+                descending=order == "desc",
+                cursor=cursor,
+                limit=limit
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
-        # Check target quota
-        if target_bucket.storage_limit and target_bucket.used_Storage + file.file_size > target_bucket.storage_limit:
+    async def move_file(self, user: User, file_id: int, target_bucket_id: int):
+        # Fetch file with its source bucket, and the target bucket; both owner-checked in SQL
+        file = await self.files.get_owned_file(user_id=user.id, file_id=file_id)
+        source_bucket = file.bucket
+        target_bucket = await self.files.get_owned_bucket(user_id=user.id, bucket_id=target_bucket_id)
+
+        # Cheap pre-check; the conditional reservation below is authoritative
+        file_size = charged_size(file)
+        if target_bucket.storage_limit and (target_bucket.used_Storage or 0) + file_size > target_bucket.storage_limit:
             raise HTTPException(status_code=400, detail="Not enough space in target bucket")
 
-        # Move file on disk/cloud
-        new_file_path = self.storage_manager.move_file(
-            old_path=file.file_path,
-            new_bucket_id=target_bucket.id,
-            filename=file.file_name
-        )
+        # A move is metadata only: the stored object stays where it is. Blob
+        # keys don't depend on the bucket, and older per-bucket paths are only
+        # ever read through file_path, so no bytes are copied
+        file_name = file.file_name
 
-        # Update DB
+        # Update DB and storage usage in one transaction
+        try:
+            await self.quota_service.reserve(target_bucket.id, file_size)
+        except HTTPException:
+            await self.db.rollback()
+            raise HTTPException(status_code=400, detail="Not enough space in target bucket")
+        await self.quota_service.release(source_bucket.id, file_size)
         file.bucket_id = target_bucket.id
-        file.file_path = new_file_path
-        self.db.commit()
-
-        # Update storage usage
-        source_bucket.used_Storage = max(source_bucket.used_Storage - file.file_size, 0)
-        target_bucket.used_Storage += file.file_size
-        self.db.commit()
+        await self.db.commit()
 
-        return {"detail": f"File '{file.file_name}' moved to bucket {target_bucket.id}"}
\ No newline at end of file
+        return {"detail": f"File '{file_name}' moved to bucket {target_bucket.id}"}
\ No newline at end of file
@@ -0,0 +1,163 @@
+import asyncio
+import shlex
+from typing import List
+from sqlalchemy import select, union
+from sqlalchemy.ext.asyncio import AsyncSession
+from Auth.config import settings
+from model.Blob import Blob
+from model.File import File
+from model.Thumbnail import Thumbnail
+from model.Upload import UploadPart
+from model.Video import VideoSegment
+from Helpers.cloud_storage import get_cloud_storage_manager
+from Helpers.media import MediaError, is_video
+from Helpers.thumbnails import ThumbnailError, is_thumbnailable
+from Services.integrity_service import verify_object
+from Services.job_queue import PermanentJobError, enqueue, job_handler
+from Services.thumbnail_service import THUMBNAIL_SIZES, generate_thumbnails
+from Services.video_service import process_video
+
+# Deferred work run by the job workers (see Services.job_queue), so an upload
+# only has to get its bytes stored and its row committed.
+
+
+def enqueue_post_upload(db: AsyncSession, file: File, user_id: int, new_content: bool = True):
+    """
+    Queue a new file's follow-up work in the caller's transaction. Content
+    that was already stored (new_content=False) was verified and scanned
+    when it first arrived.
+    """
+    if not file.blob_id:
+        return
+    payload = {"blob_id": file.blob_id}
+    if THUMBNAIL_SIZES and is_thumbnailable(file.file_name, file.file_content_type):
+        enqueue(db, "thumbnails", payload, user_id=user_id, file_id=file.id)
+    if new_content and settings.VIDEO_PIPELINE and is_video(file.file_name, file.file_content_type):
+        enqueue(db, "video", payload, user_id=user_id, file_id=file.id)
+    if new_content and settings.JOB_VERIFY_UPLOADS:
+        enqueue(db, "verify_content", payload, user_id=user_id, file_id=file.id)
+    if new_content and settings.VIRUS_SCAN_COMMAND:
+        enqueue(db, "virus_scan", payload, user_id=user_id, file_id=file.id)
+
+
+def enqueue_delete(db: AsyncSession, paths: List[str]):
+    """Queue storage objects nothing points at any more for deletion, retried until it succeeds"""
+    if paths:
+        enqueue(db, "delete_objects", {"paths": list(paths)})
+
+
+async def _get_blob(blob_id: int):
+    from api.database import async_session_Local
+    async with async_session_Local() as db:
+        return await db.get(Blob, blob_id)
+
+
+@job_handler("thumbnails")
+async def thumbnails_job(payload: dict):
+    try:
+        await generate_thumbnails(payload["blob_id"])
+    except ThumbnailError as e:
+        raise PermanentJobError(str(e))
+
+
+@job_handler("video", timeout=settings.VIDEO_JOB_TIMEOUT_SECONDS)
+async def video_job(payload: dict):
+    try:
+        await process_video(payload["blob_id"])
+    except MediaError as e:
+        raise PermanentJobError(str(e))
+
+
+@job_handler("verify_content")
+async def verify_content_job(payload: dict):
+    """Re-read a stored blob and check it against the size and digests taken on upload"""
+    blob = await _get_blob(payload["blob_id"])
+    if blob is None:
+        return  # Collected since
+    result = await verify_object(
+        get_cloud_storage_manager(),
+        blob.blob_path,
+        size=blob.blob_size,
+        sha256_hash=blob.sha256_hash,
+        md5_hash=blob.md5_hash,
+        compression=blob.compression
+    )
+    if result["status"] == "missing":
+        if await _get_blob(blob.id) is None:
+            return
+        raise PermanentJobError(f"Blob {blob.id} is missing from storage")
+    if result["status"] == "corrupt":
+        print(f"[JOBS] ERROR: blob {blob.id} is corrupt in storage ({'; '.join(result['problems'])})")
+        raise PermanentJobError(f"Stored content doesn't match: {'; '.join(result['problems'])}")
+
+
+@job_handler("virus_scan")
+async def virus_scan_job(payload: dict):
+    """
+    Pipe a blob's content into VIRUS_SCAN_COMMAND (e.g. "clamdscan --no-summary -").
+    Exit status 0 is clean and 1 infected (a permanent failure, visible on the
+    job); anything else is an error worth retrying.
+    """
+    command = settings.VIRUS_SCAN_COMMAND
+    blob = await _get_blob(payload["blob_id"])
+    if not command or blob is None:
+        return
+
+    process = await asyncio.create_subprocess_exec(
+        *shlex.split(command),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT
+    )
+
+    async def feed():
+        try:
+            async for chunk in get_cloud_storage_manager().iter_content(blob.blob_path, compression=blob.compression):
+                process.stdin.write(chunk)
+                await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The scanner stopped reading, e.g. it already found something
+        finally:
+            process.stdin.close()
+
+    try:
+        _, output = await asyncio.gather(feed(), process.stdout.read())
+    except BaseException:
+        process.kill()
+        raise
+    returncode = await process.wait()
+    output = output.decode(errors="replace").strip()[-500:]
+    if returncode == 1:
+        print(f"[JOBS] WARNING: blob {blob.id} flagged by virus scan: {output}")
+        raise PermanentJobError(f"Infected: {output}")
+    if returncode != 0:
+        raise RuntimeError(f"Scanner exited with {returncode}: {output}")
+
+
+async def referenced_paths(paths: List[str]) -> set:
+    """Which of paths the DB points at again, e.g. a thumbnail or segment key regenerated since"""
+    from api.database import async_session_Local
+    async with async_session_Local() as db:
+        result = await db.execute(union(
+            select(Blob.blob_path).where(Blob.blob_path.in_(paths)),
+            select(Thumbnail.thumbnail_path).where(Thumbnail.thumbnail_path.in_(paths)),
+            select(VideoSegment.segment_path).where(VideoSegment.segment_path.in_(paths)),
+            select(File.file_path).where(File.file_path.in_(paths)),
+            select(UploadPart.part_path).where(UploadPart.part_path.in_(paths))
+        ))
+        return set(result.scalars().all())
+
+
+@job_handler("delete_objects")
+async def delete_objects_job(payload: dict):
+    storage = get_cloud_storage_manager()
+    referenced = await referenced_paths(payload["paths"])
+    remaining = []
+    for path in payload["paths"]:
+        if path in referenced:
+            continue
+        # Already gone counts as done, so retries are harmless
+        if not await storage.delete_file(path) and await storage.file_exists(path):
+            remaining.append(path)
+    if remaining:
+        raise RuntimeError(f"Could not delete {len(remaining)} object(s), e.g. {remaining[0]}")
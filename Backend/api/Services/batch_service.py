@@ -0,0 +1,377 @@
+import argparse
+import asyncio
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Iterable, List, Optional
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from model.User import User
+from model.Bucket import Bucket
+from model.File import File
+from model.Upload import UploadSession
+from Auth.config import settings
+from Helpers.cloud_storage import FileTooLargeError
+from Services.Storage_services import StorageService, filter_files
+from Services.quota_service import charged_size
+from Services.file_repository import LIVE_FILES, TRASHED_FILES
+from Services.background_jobs import enqueue_delete, enqueue_post_upload
+from Services.job_queue import notify_workers
+from Services.upload_service import expire_sessions
+
+# Storage calls in flight per batch request
+BATCH_CONCURRENCY = 8
+MAX_BATCH_SIZE = 1000
+MAX_BATCH_UPLOAD_FILES = 100
+
+
+async def gather_bounded(items: Iterable, func: Callable[..., Awaitable], limit: int = BATCH_CONCURRENCY) -> List:
+    """
+    Run func over items with at most limit calls in flight. Results come back
+    in input order; exceptions are returned in place of results, not raised.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
+
+
+def _summary(results: list, has_more: bool = False) -> dict:
+    succeeded = sum(1 for item in results if item["status_code"] < 400)
+    return {
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "has_more": has_more,
+        "results": results
+    }
+
+
+class BatchFileService:
+    """
+    Multi-file upload, delete and move. Each batch loads its rows in one
+    query, runs storage calls concurrently (bounded by BATCH_CONCURRENCY),
+    charges quotas once per bucket and commits once. Per-item failures are
+    reported in the results instead of failing the whole batch.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.storage_service = StorageService(db=db)
+        self.storage_manager = self.storage_service.storage_manager
+        self.blob_service = self.storage_service.blob_service
+        self.quota_service = self.storage_service.quota_service
+
+    async def _get_owned_bucket(self, user: User, bucket_id: int) -> Bucket:
+        bucket = await self.db.get(Bucket, bucket_id)
+        if not bucket:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bucket not found")
+        if bucket.user_id != user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not own this bucket")
+        return bucket
+
+    def _check_ids(self, file_ids: List[int]) -> List[int]:
+        file_ids = list(dict.fromkeys(file_ids))
+        if not file_ids:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No file ids given")
+        if len(file_ids) > MAX_BATCH_SIZE:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_BATCH_SIZE} files per batch")
+        return file_ids
+
+    async def _delete_objects(self, paths: List[str], retry: bool = True):
+        """Delete storage objects; failures are queued for a background retry"""
+        outcomes = await gather_bounded(paths, self.storage_manager.delete_file)
+        failed = []
+        for path, outcome in zip(paths, outcomes):
+            if outcome is not True:
+                print(f"[BATCH] WARNING: could not delete {path} from storage: {outcome}")
+                failed.append(path)
+        if failed and retry:
+            enqueue_delete(self.db, failed)
+            await self.db.commit()
+
+    async def upload_files(self, user: User, bucket_id: int, files: List[dict]):
+        """
+        files are dicts like StorageService.upload_file takes. All bodies are
+        streamed to storage concurrently, then every File row is inserted in
+        one transaction.
+        """
+        bucket = await self._get_owned_bucket(user, bucket_id)
+        if not files:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No files given")
+        if len(files) > MAX_BATCH_UPLOAD_FILES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {MAX_BATCH_UPLOAD_FILES} files per upload batch")
+
+        async def write(file: dict):
+            max_size = file.get("max_size")
+            if max_size is not None and file.get("file_size") is not None and file["file_size"] > max_size:
+                raise FileTooLargeError(f"File size exceeded the limit of {max_size} bytes")
+            return await self.storage_manager.save_file_stream(
+                file_name=file["name"],
+                stream=file["stream"],
+                bucket_id=bucket.id,
+                file_content_type=file["content_type"],
+                max_size=max_size,
+                compression=bucket.compression
+            )
+
+        outcomes = await gather_bounded(files, write)
+
+        results = [None] * len(files)
+        written = []
+        for index, outcome in enumerate(outcomes):
+            if isinstance(outcome, FileTooLargeError):
+                results[index] = {"file_name": files[index]["name"], "status_code": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "detail": str(outcome)}
+            elif isinstance(outcome, Exception):
+                print(f"[BATCH] ERROR uploading {files[index]['name']}: {outcome}")
+                results[index] = {"file_name": files[index]["name"], "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR, "detail": "Upload failed"}
+            else:
+                written.append((index, outcome))
+
+        # Charge the whole batch at once (stored sizes); file by file only if it doesn't fit
+        leftovers = []
+        accepted = written
+        try:
+            await self.quota_service.reserve(bucket.id, sum(metadata["stored_size"] for _, metadata in written))
+        except HTTPException:
+            accepted = []
+            for index, metadata in written:
+                try:
+                    await self.quota_service.reserve(bucket.id, metadata["stored_size"])
+                    accepted.append((index, metadata))
+                except HTTPException as e:
+                    results[index] = {"file_name": files[index]["name"], "status_code": e.status_code, "detail": e.detail}
+                    leftovers.append(metadata["file_path"])
+
+        try:
+            new_files = []
+            for index, metadata in accepted:
+                blob = await self.blob_service.acquire(metadata)
+                new_content = blob.blob_path == metadata["file_path"]
+                if not new_content:
+                    # Duplicate content: drop the copy we just wrote
+                    leftovers.append(metadata["file_path"])
+                new_file = self.storage_service.build_file(
+                    bucket=bucket,
+                    blob=blob,
+                    file_name=files[index]["name"],
+                    content_type=files[index]["content_type"],
+                    file_url=metadata.get("file_url") if blob.blob_path == metadata["file_path"] else None
+                )
+                # Charged what was written, even if the content ends up shared with a blob stored differently
+                new_file.stored_size = metadata["stored_size"]
+                self.db.add(new_file)
+                new_files.append((index, new_file, new_content))
+
+            # Ids are assigned on flush; read everything before commit expires it
+            await self.db.flush()
+            # Follow-up work and the cleanup of unused copies commit with the rows
+            for _, new_file, new_content in new_files:
+                enqueue_post_upload(self.db, new_file, user_id=bucket.user_id, new_content=new_content)
+            enqueue_delete(self.db, leftovers)
+            for index, new_file, _ in new_files:
+                results[index] = {
+                    "file_id": new_file.id,
+                    "file_name": new_file.file_name,
+                    "file_size": new_file.file_size,
+                    "sha256_hash": new_file.sha256_hash,
+                    "status_code": status.HTTP_201_CREATED
+                }
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            await self._delete_objects([metadata["file_path"] for _, metadata in written], retry=False)
+            raise
+
+        notify_workers()
+        return _summary(results)
+
+    async def delete_files(
+        self,
+        user: User,
+        file_ids: List[int] | None = None,
+        bucket_id: int | None = None,
+        filters: dict | None = None
+    ):
+        """
+        Move files to the trash by id, or every file in a bucket matching
+        filters (at most MAX_BATCH_SIZE per call; has_more tells the caller to
+        repeat). One UPDATE and one quota release per bucket; the content is
+        removed later by purge_deleted().
+        """
+        has_more = False
+        if file_ids is not None:
+            file_ids = self._check_ids(file_ids)
+        elif bucket_id is not None:
+            bucket = await self._get_owned_bucket(user, bucket_id)
+            query = filter_files(select(File.id).where(File.bucket_id == bucket.id, LIVE_FILES), **(filters or {}))
+            file_ids = list((await self.db.execute(query.order_by(File.id).limit(MAX_BATCH_SIZE + 1))).scalars().all())
+            has_more = len(file_ids) > MAX_BATCH_SIZE
+            file_ids = file_ids[:MAX_BATCH_SIZE]
+        else:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Give file_ids or a bucket_id")
+
+        # Only rows this UPDATE flipped are released, so concurrent deletes can't double-count
+        found = {}
+        if file_ids:
+            rows = (await self.db.execute(
+                update(File)
+                .where(
+                    File.id.in_(file_ids),
+                    LIVE_FILES,
+                    File.bucket_id.in_(select(Bucket.id).where(Bucket.user_id == user.id))
+                )
+                .values(is_deleted=True, deleted_at=func.now())
+                .returning(File.id, File.file_name, File.bucket_id, File.stored_size, File.file_size)
+                .execution_options(synchronize_session=False)
+            )).all()
+            found = {row.id: row for row in rows}
+            freed = defaultdict(int)
+            for row in rows:
+                freed[row.bucket_id] += charged_size(row)
+            for freed_bucket_id, size in freed.items():
+                await self.quota_service.release(freed_bucket_id, size)
+            await self.db.commit()
+
+        results = [
+            {"file_id": file_id, "file_name": found[file_id].file_name, "status_code": status.HTTP_204_NO_CONTENT}
+            if file_id in found else
+            {"file_id": file_id, "status_code": status.HTTP_404_NOT_FOUND, "detail": "File not found"}
+            for file_id in file_ids
+        ]
+        return _summary(results, has_more=has_more)
+
+    async def purge_deleted(
+        self,
+        deleted_before: Optional[datetime] = None,
+        bucket_id: Optional[int] = None,
+        batch_size: int = MAX_BATCH_SIZE
+    ) -> int:
+        """
+        Permanently remove trashed files (deleted before deleted_before, or
+        all of them), batch_size rows per transaction: their rows go, blob
+        references are dropped in bulk and storage objects nothing points at
+        any more are deleted. Returns how many files were purged.
+        """
+        purged = 0
+        while True:
+            query = select(File.id).where(TRASHED_FILES)
+            if deleted_before is not None:
+                query = query.where(File.deleted_at < deleted_before)
+            if bucket_id is not None:
+                query = query.where(File.bucket_id == bucket_id)
+            file_ids = list((await self.db.execute(
+                query.order_by(File.deleted_at, File.id).limit(batch_size)
+            )).scalars().all())
+            if not file_ids:
+                return purged
+
+            # Completed upload sessions point at their file
+            await self.db.execute(
+                update(UploadSession).where(UploadSession.file_id.in_(file_ids)).values(file_id=None)
+            )
+            # Conditional, so a file restored meanwhile stays
+            rows = (await self.db.execute(
+                delete(File)
+                .where(File.id.in_(file_ids), TRASHED_FILES)
+                .returning(File.blob_id, File.file_path)
+                .execution_options(synchronize_session=False)
+            )).all()
+            blob_counts = Counter(row.blob_id for row in rows if row.blob_id)
+            paths = [row.file_path for row in rows if not row.blob_id]
+            await self.blob_service.release_many(blob_counts)
+            await self.db.commit()
+
+            # Storage objects go only once nothing in the DB points at them
+            if blob_counts:
+                paths = paths + await self.blob_service.collect_many(blob_counts.keys())
+            await self._delete_objects(paths)
+            purged += len(rows)
+
+    async def move_files(self, user: User, file_ids: List[int], target_bucket_id: int):
+        file_ids = self._check_ids(file_ids)
+        target_bucket = await self._get_owned_bucket(user, target_bucket_id)
+
+        result = await self.db.execute(self.storage_service.files.owned_files(user.id).where(File.id.in_(file_ids)))
+        found = {file.id: file for file in result.scalars().all()}
+
+        results = {}
+        # Greedily fit files into the target's free space, in request order
+        available = None
+        if target_bucket.storage_limit:
+            available = target_bucket.storage_limit - (target_bucket.used_Storage or 0)
+        accepted = []
+        for file_id in file_ids:
+            file = found.get(file_id)
+            if not file:
+                results[file_id] = {"file_id": file_id, "status_code": status.HTTP_404_NOT_FOUND, "detail": "File not found"}
+            elif file.bucket_id == target_bucket.id:
+                results[file_id] = {"file_id": file_id, "file_name": file.file_name, "status_code": status.HTTP_200_OK}
+            elif available is not None and charged_size(file) > available:
+                results[file_id] = {"file_id": file_id, "file_name": file.file_name, "status_code": status.HTTP_400_BAD_REQUEST, "detail": "Not enough space in target bucket"}
+            else:
+                if available is not None:
+                    available -= charged_size(file)
+                accepted.append(file)
+
+        # Metadata only, like StorageService.move_file: stored objects stay where
+        # they are. Quotas once per bucket, in the same transaction as the rows
+        freed = defaultdict(int)
+        for file in accepted:
+            freed[file.bucket_id] += charged_size(file)
+        try:
+            await self.quota_service.reserve(target_bucket.id, sum(freed.values()))
+        except HTTPException:
+            # Usage changed underneath us; let the caller retry
+            await self.db.rollback()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Not enough space in target bucket")
+
+        for source_bucket_id, size in freed.items():
+            await self.quota_service.release(source_bucket_id, size)
+        for file in accepted:
+            results[file.id] = {"file_id": file.id, "file_name": file.file_name, "status_code": status.HTTP_200_OK}
+            file.bucket_id = target_bucket.id
+        await self.db.commit()
+
+        return _summary([results[file_id] for file_id in file_ids])
+
+
+async def purge_expired(batch_size: int = MAX_BATCH_SIZE) -> int:
+    """Purge the files whose FILE_RESTORE_WINDOW_HOURS has passed"""
+    from api.database import async_session_Local
+    deleted_before = datetime.now(timezone.utc) - timedelta(hours=settings.FILE_RESTORE_WINDOW_HOURS)
+    async with async_session_Local() as db:
+        return await BatchFileService(db=db).purge_deleted(deleted_before=deleted_before, batch_size=batch_size)
+
+
+async def run_purge_loop(interval_seconds: float):
+    """Background job: purge expired trash and upload sessions every interval_seconds"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            purged = await purge_expired()
+            if purged:
+                print(f"[PURGE] Purged {purged} deleted file(s)")
+            expired = await expire_sessions()
+            if expired:
+                print(f"[PURGE] Aborted {expired} expired upload session(s)")
+        except Exception as e:
+            print(f"[PURGE] ERROR: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Permanently remove deleted files whose restore window has passed and abort expired upload sessions")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_SIZE, help="Files per transaction")
+    args = parser.parse_args()
+
+    async def _main():
+        from Helpers.storage_backend import close_storage_backend
+        try:
+            return await purge_expired(batch_size=args.batch_size), await expire_sessions(batch_size=args.batch_size)
+        finally:
+            await close_storage_backend()
+
+    purged, expired = asyncio.run(_main())
+    print(f"Purged {purged} deleted file(s), aborted {expired} expired upload session(s)")
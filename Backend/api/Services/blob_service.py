@@ -0,0 +1,186 @@
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import update, delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from model.Blob import Blob
+from model.Bucket import Bucket
+from model.File import File
+from Helpers.cloud_storage import CloudStorageManager
+from Services.thumbnail_service import delete_thumbnails, thumbnail_paths
+from Services.video_service import delete_video, video_paths
+from Services.background_jobs import enqueue_delete
+
+
+class BlobService:
+    """
+    Content-addressed blob store: every distinct SHA-256 is stored once and
+    shared by all File rows with that content through a reference count.
+    Counts are only changed with single UPDATE statements so concurrent
+    uploads and deletes of the same content can't lose updates.
+    """
+
+    def __init__(self, db: AsyncSession, storage_manager: CloudStorageManager):
+        self.db = db
+        self.storage_manager = storage_manager
+
+    async def _increment(self, sha256_hash: str) -> Optional[Blob]:
+        result = await self.db.execute(
+            update(Blob)
+            .where(Blob.sha256_hash == sha256_hash)
+            .values(ref_count=Blob.ref_count + 1)
+        )
+        if result.rowcount == 0:
+            return None
+        result = await self.db.execute(
+            select(Blob)
+            .where(Blob.sha256_hash == sha256_hash)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalars().first()
+
+    async def find_for_user(self, user_id: int, sha256_hash: str) -> Optional[Blob]:
+        """
+        A blob the user already has a file for. Only content the caller has
+        proven to own may be reused without reading the upload body.
+        """
+        result = await self.db.execute(
+            select(Blob)
+            .join(File, File.blob_id == Blob.id)
+            .join(Bucket, Bucket.id == File.bucket_id)
+            .where(Blob.sha256_hash == sha256_hash, Bucket.user_id == user_id)
+            .limit(1)
+        )
+        return result.scalars().first()
+
+    async def reference(self, blob: Blob) -> Blob:
+        """Add a reference to a known blob without writing anything"""
+        return await self._increment(blob.sha256_hash)
+
+    async def acquire(self, metadata: dict) -> Blob:
+        """
+        Take a reference to the blob for freshly written content, inside the
+        caller's transaction. When the content was already stored the
+        existing blob is returned; its blob_path then differs from
+        metadata["file_path"] and the caller deletes the new copy once the
+        transaction has committed.
+        """
+        sha256_hash = metadata["sha256_hash"]
+
+        blob = await self._increment(sha256_hash)
+        if blob is not None:
+            return blob
+
+        blob = Blob(
+            sha256_hash=sha256_hash,
+            md5_hash=metadata.get("md5_hash"),
+            blob_size=metadata["file_size"],
+            stored_size=metadata.get("stored_size", metadata["file_size"]),
+            compression=metadata.get("compression"),
+            blob_path=metadata["file_path"],
+            ref_count=1
+        )
+        try:
+            # Savepoint, so losing the race doesn't roll back the caller's work
+            async with self.db.begin_nested():
+                self.db.add(blob)
+            return blob
+        except IntegrityError:
+            # Someone stored the same content concurrently
+            blob = await self._increment(sha256_hash)
+            if blob is None:
+                raise
+            return blob
+
+    async def release(self, blob_id: int) -> bool:
+        """
+        Drop one reference; the stored object is garbage-collected when the
+        last reference goes. Returns True when the object was removed.
+        """
+        # Pending File deletes must hit the DB before the blob row can go
+        await self.db.flush()
+        await self.db.execute(
+            update(Blob)
+            .where(Blob.id == blob_id)
+            .values(ref_count=Blob.ref_count - 1)
+        )
+        return await self._collect(blob_id)
+
+    async def release_many(self, blob_counts: Dict[int, int]):
+        """
+        Drop several references per blob in the caller's transaction. After
+        committing, pass the same ids to collect_many() to remove the blobs
+        that are no longer referenced.
+        """
+        await self.db.flush()
+        for blob_id, count in blob_counts.items():
+            await self.db.execute(
+                update(Blob)
+                .where(Blob.id == blob_id)
+                .values(ref_count=Blob.ref_count - count)
+            )
+
+    async def collect_many(self, blob_ids: Iterable[int]) -> List[str]:
+        """
+        Delete the rows of unreferenced blobs among blob_ids (and of their
+        thumbnails and videos) in one transaction. Returns the storage paths the caller
+        should now delete.
+        """
+        candidates = (await self.db.execute(
+            select(Blob.id, Blob.blob_path)
+            .where(Blob.id.in_(list(blob_ids)), Blob.ref_count <= 0)
+        )).all()
+        paths = []
+        for blob_id, blob_path in candidates:
+            # Read before the delete, which cascades to the derived rows
+            derived = await thumbnail_paths(self.db, blob_id) + await video_paths(self.db, blob_id)
+            # Conditional delete, so a concurrent upload that just re-referenced it wins
+            result = await self.db.execute(
+                delete(Blob).where(Blob.id == blob_id, Blob.ref_count <= 0)
+            )
+            if result.rowcount:
+                paths.append(blob_path)
+                await delete_thumbnails(self.db, blob_id)
+                await delete_video(self.db, blob_id)
+                paths.extend(derived)
+        await self.db.commit()
+        return paths
+
+    async def _collect(self, blob_id: int) -> bool:
+        blob = await self.db.get(Blob, blob_id, populate_existing=True)
+        if not blob or blob.ref_count > 0:
+            return False
+
+        blob_path = blob.blob_path
+        # Read before the delete, which cascades to the derived rows
+        derived = await thumbnail_paths(self.db, blob_id) + await video_paths(self.db, blob_id)
+        # Conditional delete, so a concurrent upload that just re-referenced it wins
+        result = await self.db.execute(
+            delete(Blob).where(Blob.id == blob_id, Blob.ref_count <= 0)
+        )
+        if result.rowcount == 0:
+            await self.db.commit()
+            return False
+        await delete_thumbnails(self.db, blob_id)
+        await delete_video(self.db, blob_id)
+        await self.db.commit()
+
+        failed = []
+        for path in [blob_path, *derived]:
+            if not await self.storage_manager.delete_file(path):
+                print(f"[BLOB_GC] WARNING: could not delete {path} from storage, retrying in the background")
+                failed.append(path)
+        if failed:
+            enqueue_delete(self.db, failed)
+            await self.db.commit()
+        return True
+
+    async def collect_garbage(self) -> int:
+        """Remove every unreferenced blob, returning how many were collected"""
+        blob_ids = (await self.db.execute(
+            select(Blob.id).where(Blob.ref_count <= 0)
+        )).scalars().all()
+        collected = 0
+        for blob_id in blob_ids:
+            if await self._collect(blob_id):
+                collected += 1
+        return collected
@@ -1,28 +1,45 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from model.Bucket import Bucket
 from model.File import File
 from model.User import User
+from Helpers.pagination import DEFAULT_PAGE_SIZE, InvalidCursor, paginate
+from Helpers.compression import compression_available
+from Services.file_repository import LIVE_FILES
+
+# Sortable columns for bucket listings; each has a (user_id, column, id) index
+# and must be NOT NULL, or paginate() would skip the rows without a value
+BUCKET_SORT_COLUMNS = {
+    "created_at": Bucket.created_at,
+    "name": Bucket.name
+}
 
 class BucketService:
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
+    def _check_compression(self, compression: str | None):
+        if compression and not compression_available(compression):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Compression '{compression}' is not available on this server"
+            )
+
     #  Creating bucket
-    def create_bucket(self, user: User, name: str, storage_limit: int):
+    async def create_bucket(self, user: User, name: str, storage_limit: int, is_public: bool = True, compression: str | None = None):
         if storage_limit and storage_limit <= 0:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Storage limit must be greater than 0"
             )
+        self._check_compression(compression)
 
         # Check duplicate bucket name for user
-        existing = (
-            self.db.query(Bucket)
-            .filter(Bucket.user_id == user.id, Bucket.name == name)
-            .first()
-        )
+        existing = (await self.db.execute(
+            select(Bucket).where(Bucket.user_id == user.id, Bucket.name == name).limit(1)
+        )).scalars().first()
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -33,30 +50,56 @@ class BucketService:
             name=name,
             user_id=user.id,
             storage_limit=storage_limit,
-            used_Storage=0
+            is_public=True if is_public is None else is_public,
+            used_Storage=0,
+            compression=compression
         )
 
         self.db.add(bucket)
-        self.db.commit()
-        self.db.refresh(bucket)
+        await self.db.commit()
+        await self.db.refresh(bucket)
 
         return bucket
 
     #  List buckets
-    def list_buckets(self, user: User):
-        return (
-            self.db.query(Bucket)
-            .filter(Bucket.user_id == user.id)
-            .all()
-        )
+    async def list_buckets(
+        self,
+        user: User,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        sort: str = "created_at",
+        order: str = "asc",
+        name_prefix: str | None = None
+    ):
+        """One page of the user's buckets, returned as (buckets, next_cursor)"""
+        if sort not in BUCKET_SORT_COLUMNS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"sort must be one of {', '.join(BUCKET_SORT_COLUMNS)}"
+            )
+
+        query = select(Bucket).where(Bucket.user_id == user.id)
+        if name_prefix:
+            query = query.where(Bucket.name.startswith(name_prefix, autoescape=True))
+
+        try:
+            return await paginate(
+                self.db,
+                query,
+                sort=sort,
+                sort_column=BUCKET_SORT_COLUMNS[sort],
+                id_column=Bucket.id,
+                descending=order == "desc",
+                cursor=cursor,
+                limit=limit,
+                entities=True
+            )
+        except InvalidCursor as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
     #  Get single bucket
-    def get_bucket(self, user: User, bucket_id: int):
-        bucket = (
-            self.db.query(Bucket)
-            .filter(Bucket.id == bucket_id)
-            .first()
-        )
+    async def get_bucket(self, user: User, bucket_id: int):
+        bucket = await self.db.get(Bucket, bucket_id)
 
         if not bucket:
             raise HTTPException(status_code=404, detail="Bucket not found")
@@ -67,40 +110,54 @@ class BucketService:
         return bucket
 
     #  Delete bucket
-    def delete_bucket(self, user: User, bucket_id: int):
-        bucket = self.get_bucket(user, bucket_id)
+    async def delete_bucket(self, user: User, bucket_id: int):
+        bucket = await self.get_bucket(user, bucket_id)
 
         # Check if bucket is empty
-        file_count = (
-            self.db.query(File)
-            .filter(File.bucket_id == bucket.id)
-            .count()
-        )
+        has_files = (await self.db.execute(
+            select(File.id).where(File.bucket_id == bucket.id, LIVE_FILES).limit(1)
+        )).first()
 
-        if file_count > 0:
+        if has_files:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Bucket is not empty"
             )
 
-        self.db.delete(bucket)
-        self.db.commit()
+        # Its trash can't be restored into a deleted bucket, so empty it now
+        from Services.batch_service import BatchFileService
+        await BatchFileService(db=self.db).purge_deleted(bucket_id=bucket.id)
+
+        await self.db.delete(bucket)
+        await self.db.commit()
 
         return {"detail": "Bucket deleted successfully"}
 
     #  Update bucket
-    def update_bucket(
+    async def update_bucket(
         self,
         user: User,
         bucket_id: int,
         name: str | None = None,
-        storage_limit: int | None = None
+        storage_limit: int | None = None,
+        is_public: bool | None = None,
+        compression: str | None = None
     ):
-        bucket = self.get_bucket(user, bucket_id)
+        bucket = await self.get_bucket(user, bucket_id)
 
         if name:
             bucket.name = name
 
+        # Also decides whether downloads may be kept by shared caches
+        if is_public is not None:
+            bucket.is_public = is_public
+
+        # Only affects new uploads; stored files keep the encoding they were written with
+        if compression is not None:
+            compression = None if compression == "none" else compression
+            self._check_compression(compression)
+            bucket.compression = compression
+
         if storage_limit is not None:
             if storage_limit < bucket.used_Storage:
                 raise HTTPException(
@@ -109,7 +166,7 @@ class BucketService:
                 )
             bucket.storage_limit = storage_limit
 
-        self.db.commit()
-        self.db.refresh(bucket)
+        await self.db.commit()
+        await self.db.refresh(bucket)
 
         return bucket
@@ -0,0 +1,46 @@
+from sqlalchemy import select, true, false
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from model.Bucket import Bucket
+from model.File import File
+
+# Files not in the trash; spelled like the partial listing indexes' predicate
+LIVE_FILES = File.is_deleted == false()
+TRASHED_FILES = File.is_deleted == true()
+
+
+class FileRepository:
+    """
+    File lookups scoped to their owner. The ownership filter is part of the
+    SQL, so a file and its bucket come back from one joined query and a file
+    the caller doesn't own looks exactly like a missing one (404).
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def owned_files(self, user_id: int, deleted: bool = False):
+        """select() of the user's live (or, with deleted, trashed) files with File.bucket already loaded"""
+        return (
+            select(File)
+            .join(File.bucket)
+            .options(contains_eager(File.bucket))
+            .where(Bucket.user_id == user_id, TRASHED_FILES if deleted else LIVE_FILES)
+        )
+
+    async def get_owned_file(self, user_id: int, file_id: int, deleted: bool = False) -> File:
+        result = await self.db.execute(self.owned_files(user_id, deleted=deleted).where(File.id == file_id))
+        file = result.scalars().first()
+        if not file:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+        return file
+
+    async def get_owned_bucket(self, user_id: int, bucket_id: int) -> Bucket:
+        result = await self.db.execute(
+            select(Bucket).where(Bucket.id == bucket_id, Bucket.user_id == user_id)
+        )
+        bucket = result.scalars().first()
+        if not bucket:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bucket not found")
+        return bucket
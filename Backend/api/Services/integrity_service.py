@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional
+from sqlalchemy import select, update, exists, func
+from Auth.config import settings
+from model.Blob import Blob
+from model.File import File
+from Helpers.cloud_storage import CloudStorageManager, get_cloud_storage_manager
+from Helpers.hashing import DEFAULT_ALGORITHMS, StreamHasher
+
+# Examples kept per kind of problem in a report
+SAMPLE_SIZE = 20
+
+MB = 1024 * 1024
+
+
+def mb_per_second(size: int, seconds: float) -> float:
+    return round(size / MB / seconds, 2) if seconds > 0 else 0.0
+
+
+async def verify_object(
+    storage_manager: CloudStorageManager,
+    file_path: str,
+    size: Optional[int],
+    sha256_hash: Optional[str],
+    md5_hash: Optional[str] = None,
+    compression: Optional[str] = None
+) -> Dict:
+    """
+    Re-read one stored object straight from the backend (never the cache),
+    digest it in a single pass and compare with what was recorded on
+    upload. status is "ok", "corrupt", "missing" or "unverified" (nothing
+    recorded to compare with); digests always holds what was read.
+    """
+    hasher = StreamHasher(DEFAULT_ALGORITHMS)
+    started = time.perf_counter()
+    try:
+        async for chunk in storage_manager.iter_content(file_path, compression=compression):
+            await hasher.update(chunk)
+        digests = await hasher.hexdigests()
+    except FileNotFoundError:
+        return {"status": "missing", "size": 0, "digests": {}, "problems": ["Object is missing from storage"], "seconds": 0.0}
+    seconds = time.perf_counter() - started
+
+    problems = []
+    if size is not None and hasher.size != size:
+        problems.append(f"size {hasher.size}, expected {size}")
+    for name, expected in (("sha256", sha256_hash), ("md5", md5_hash)):
+        if expected and digests[name] != expected.lower():
+            problems.append(f"{name} {digests[name]}, expected {expected}")
+    if problems:
+        result_status = "corrupt"
+    elif not sha256_hash:
+        result_status = "unverified"
+    else:
+        result_status = "ok"
+    return {"status": result_status, "size": hasher.size, "digests": digests, "problems": problems, "seconds": seconds}
+
+
+class IntegrityVerifier:
+    """
+    Re-reads every stored object (each blob once, however many files share
+    it, plus legacy files without a blob) and checks it against its
+    recorded size and digests. Objects are read concurrency at a time while
+    the next ones are listed, so the run is bound by storage throughput,
+    not by round trips. With backfill, digests that were never recorded
+    (old blobs without md5, legacy files without hashes) are stored once
+    the content has been read.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        storage_manager: CloudStorageManager,
+        concurrency: int = 8,
+        bucket_id: Optional[int] = None,
+        backfill: bool = True,
+        batch_size: int = 500
+    ):
+        self.session_factory = session_factory
+        self.storage_manager = storage_manager
+        self.concurrency = concurrency
+        self.bucket_id = bucket_id
+        self.backfill = backfill
+        self.batch_size = batch_size
+        self.report = {
+            "objects": 0,
+            "bytes": 0,
+            "ok": 0,
+            "corrupt": 0,
+            "missing": 0,
+            "unverified": 0,
+            "backfilled": 0,
+            "errors": 0,  # Could not be read, e.g. the backend failed
+            "seconds": 0.0,
+            "mb_per_s": 0.0,
+            "samples": {}
+        }
+
+    def _sample(self, kind: str, text: str):
+        samples = self.report["samples"].setdefault(kind, [])
+        if len(samples) < SAMPLE_SIZE:
+            samples.append(text)
+
+    async def _blobs(self, queue: asyncio.Queue):
+        last_id = 0
+        while True:
+            query = (
+                select(Blob.id, Blob.blob_path, Blob.blob_size, Blob.sha256_hash, Blob.md5_hash, Blob.compression)
+                .where(Blob.id > last_id)
+                .order_by(Blob.id)
+                .limit(self.batch_size)
+            )
+            if self.bucket_id is not None:
+                query = query.where(exists().where(File.blob_id == Blob.id, File.bucket_id == self.bucket_id))
+            async with self.session_factory() as db:
+                rows = (await db.execute(query)).all()
+            if not rows:
+                return
+            for row in rows:
+                await queue.put(("blob", *row))
+            last_id = rows[-1][0]
+
+    async def _legacy_files(self, queue: asyncio.Queue):
+        last_id = 0
+        while True:
+            query = (
+                select(File.id, File.file_path, File.file_size, File.sha256_hash, File.md5_hash, File.compression)
+                .where(File.blob_id.is_(None), File.id > last_id)
+                .order_by(File.id)
+                .limit(self.batch_size)
+            )
+            if self.bucket_id is not None:
+                query = query.where(File.bucket_id == self.bucket_id)
+            async with self.session_factory() as db:
+                rows = (await db.execute(query)).all()
+            if not rows:
+                return
+            for row in rows:
+                await queue.put(("file", *row))
+            last_id = rows[-1][0]
+
+    async def _check(self, kind: str, row_id: int, file_path: str, size, sha256_hash, md5_hash, compression):
+        result = await verify_object(self.storage_manager, file_path, size, sha256_hash, md5_hash, compression)
+        if result["problems"] and not await self._still_current(kind, row_id, file_path):
+            return  # Deleted or replaced while it was being read
+        self.report["objects"] += 1
+        self.report["bytes"] += result["size"]
+        self.report[result["status"]] += 1
+        if result["problems"]:
+            detail = "; ".join(result["problems"])
+            print(f"[INTEGRITY] ERROR: {kind} {row_id} ({file_path}) is {result['status']}: {detail}")
+            self._sample(result["status"], f"{kind} {row_id}: {detail}")
+            return
+        if self.backfill and (not md5_hash or not sha256_hash):
+            await self._backfill(kind, row_id, file_path, result["digests"])
+
+    async def _still_current(self, kind: str, row_id: int, file_path: str) -> bool:
+        async with self.session_factory() as db:
+            if kind == "blob":
+                query = select(Blob.id).where(Blob.id == row_id, Blob.blob_path == file_path)
+            else:
+                query = select(File.id).where(File.id == row_id, File.file_path == file_path, File.blob_id.is_(None))
+            return await db.scalar(query) is not None
+
+    async def _backfill(self, kind: str, row_id: int, file_path: str, digests: Dict[str, str]):
+        async with self.session_factory() as db:
+            if kind == "blob":
+                # Only where still unset, and still the same object
+                result = await db.execute(
+                    update(Blob)
+                    .where(Blob.id == row_id, Blob.blob_path == file_path, Blob.md5_hash.is_(None))
+                    .values(md5_hash=digests["md5"])
+                )
+                await db.execute(
+                    update(File)
+                    .where(File.blob_id == row_id, File.md5_hash.is_(None))
+                    .values(md5_hash=digests["md5"])
+                )
+            else:
+                result = await db.execute(
+                    update(File)
+                    .where(File.id == row_id, File.file_path == file_path, File.blob_id.is_(None))
+                    .values(
+                        md5_hash=digests["md5"],
+                        sha256_hash=func.coalesce(File.sha256_hash, digests["sha256"])
+                    )
+                )
+            await db.commit()
+        if result.rowcount:
+            self.report["backfilled"] += 1
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+                await self._check(*item)
+            except Exception as e:
+                self.report["errors"] += 1
+                self._sample("errors", f"{item[0]} {item[1]}: {e}")
+                print(f"[INTEGRITY] ERROR checking {item[0]} {item[1]}: {e}")
+            finally:
+                queue.task_done()
+
+    async def run(self) -> Dict:
+        started = time.perf_counter()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.concurrency)]
+        try:
+            await self._blobs(queue)
+            await self._legacy_files(queue)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        self.report["seconds"] = round(time.perf_counter() - started, 3)
+        self.report["mb_per_s"] = mb_per_second(self.report["bytes"], self.report["seconds"])
+        return self.report
+
+
+def format_report(report: Dict) -> List[str]:
+    lines = [
+        f"verified {report['objects']} object(s), {report['bytes'] / MB:.1f} MB in {report['seconds']:.1f}s "
+        f"({report['mb_per_s']} MB/s)",
+        f"ok {report['ok']}, corrupt {report['corrupt']}, missing {report['missing']}, "
+        f"no recorded digest {report['unverified']}, digests backfilled {report['backfilled']}"
+    ]
+    if report["errors"]:
+        lines.append(f"{report['errors']} object(s) could not be read")
+    return lines
+
+
+async def verify_storage(concurrency: Optional[int] = None, bucket_id: Optional[int] = None, backfill: bool = True) -> Dict:
+    """Run an IntegrityVerifier over the configured backend"""
+    from api.database import async_session_Local
+    verifier = IntegrityVerifier(
+        async_session_Local,
+        get_cloud_storage_manager(),
+        concurrency=concurrency or settings.VERIFY_CONCURRENCY,
+        bucket_id=bucket_id,
+        backfill=backfill
+    )
+    return await verifier.run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-read stored objects and check them against their recorded digests")
+    parser.add_argument("--concurrency", type=int, default=settings.VERIFY_CONCURRENCY, help="Objects read at once")
+    parser.add_argument("--bucket-id", type=int, default=None, help="Only the content of this bucket")
+    parser.add_argument("--no-backfill", action="store_true", help="Don't record digests that are missing")
+    parser.add_argument("--samples", action="store_true", help="List examples of each problem found")
+    args = parser.parse_args()
+
+    async def _main():
+        from Helpers.storage_backend import close_storage_backend
+        try:
+            return await verify_storage(concurrency=args.concurrency, bucket_id=args.bucket_id, backfill=not args.no_backfill)
+        finally:
+            await close_storage_backend()
+
+    report = asyncio.run(_main())
+    for line in format_report(report):
+        print(line)
+    if args.samples:
+        for kind, samples in sorted(report["samples"].items()):
+            print(f"{kind}:")
+            for sample in samples:
+                print(f"  {sample}")
+    if report["corrupt"] or report["missing"] or report["errors"]:
+        raise SystemExit(1)
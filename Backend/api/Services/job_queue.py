@@ -0,0 +1,373 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from Auth.config import settings
+from model.Job import Job
+
+# kind -> async handler taking the job's payload
+_handlers: Dict[str, Callable[[dict], Awaitable]] = {}
+# kind -> timeout in seconds, for kinds that don't use JOB_TIMEOUT_SECONDS
+_timeouts: Dict[str, float] = {}
+
+# Workers running in this process, woken by notify_workers()
+_workers: List["JobWorker"] = []
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler for a failure that retrying won't fix"""
+
+
+def job_handler(kind: str, timeout: Optional[float] = None):
+    """Register the decorated coroutine function as the handler for kind"""
+    def register(func):
+        _handlers[kind] = func
+        if timeout is not None:
+            _timeouts[kind] = timeout
+        return func
+    return register
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive UTC
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def kind_limits() -> Dict[str, int]:
+    """JOB_KIND_CONCURRENCY ("thumbnails=2,virus_scan=1") as a dict"""
+    limits = {}
+    for item in settings.JOB_KIND_CONCURRENCY.split(","):
+        kind, _, limit = item.partition("=")
+        if kind.strip() and limit.strip():
+            limits[kind.strip()] = int(limit)
+    return limits
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: half the delay is fixed, half random"""
+    ceiling = min(settings.JOB_RETRY_MAX_SECONDS, settings.JOB_RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0))
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def enqueue(
+    db: AsyncSession,
+    kind: str,
+    payload: dict,
+    user_id: Optional[int] = None,
+    file_id: Optional[int] = None,
+    delay: float = 0,
+    max_attempts: Optional[int] = None
+) -> Job:
+    """
+    Add a job in the caller's transaction, so it exists exactly when the
+    caller's changes do. Workers see it once the caller commits; call
+    notify_workers() after the commit to skip the poll interval.
+    """
+    job = Job(
+        kind=kind,
+        payload=payload,
+        status="queued",
+        attempts=0,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_after=_now() + timedelta(seconds=delay),
+        user_id=user_id,
+        file_id=file_id
+    )
+    db.add(job)
+    return job
+
+
+def notify_workers():
+    """Wake the workers of this process to look for new jobs now"""
+    for worker in _workers:
+        worker.wakeup.set()
+
+
+async def queue_stats(db: AsyncSession, user_id: Optional[int] = None) -> dict:
+    """
+    Job counts per kind and status, and how long the oldest due job has been
+    waiting; of the whole queue, or only of user_id's jobs when given
+    """
+    owner = [Job.user_id == user_id] if user_id is not None else []
+    rows = (await db.execute(
+        select(Job.kind, Job.status, func.count()).where(*owner).group_by(Job.kind, Job.status)
+    )).all()
+    kinds: Dict[str, Dict[str, int]] = {}
+    totals = Counter()
+    for kind, job_status, count in rows:
+        kinds.setdefault(kind, {})[job_status] = count
+        totals[job_status] += count
+
+    now = _now()
+    oldest_due = _aware(await db.scalar(
+        select(func.min(Job.run_after)).where(Job.status == "queued", Job.run_after <= now, *owner)
+    ))
+    return {
+        "totals": dict(totals),
+        "kinds": kinds,
+        "oldest_due_seconds": (now - oldest_due).total_seconds() if oldest_due else 0
+    }
+
+
+class JobWorker:
+    """
+    Runs jobs from the jobs table, with no broker involved. A job is claimed
+    by a conditional UPDATE from queued to running, so any number of
+    workers, in this process or others, can poll the same table without
+    running a job twice. At most concurrency jobs run at once, and per-kind
+    limits (JOB_KIND_CONCURRENCY) keep e.g. CPU-heavy kinds from taking
+    every slot. Failures are retried with exponential backoff up to the
+    job's max_attempts. Workers refresh the locks of their running jobs,
+    so a job whose worker died is requeued once its lock is older than
+    JOB_LOCK_TIMEOUT_SECONDS, however long the job itself may run.
+    """
+
+    def __init__(self, session_factory, concurrency: int = 4, limits: Optional[Dict[str, int]] = None):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.limits = limits or {}
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.wakeup = asyncio.Event()
+        self._running: Dict[int, asyncio.Task] = {}
+        self._kinds = Counter()
+
+    async def _claim(self, slots: int) -> List[Job]:
+        kinds = Counter(self._kinds)
+        full = [kind for kind, limit in self.limits.items() if kinds[kind] >= limit]
+        now = _now()
+        async with self.session_factory() as db:
+            query = (
+                select(Job.id, Job.kind)
+                .where(Job.status == "queued", Job.run_after <= now)
+                .order_by(Job.run_after, Job.id)
+                .limit(slots * 4)
+            )
+            if full:
+                query = query.where(Job.kind.not_in(full))
+            claimed = []
+            for job_id, kind in (await db.execute(query)).all():
+                if len(claimed) >= slots:
+                    break
+                if kind in self.limits and kinds[kind] >= self.limits[kind]:
+                    continue
+                # Only one worker's UPDATE can see it still queued
+                result = await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, Job.status == "queued")
+                    .values(status="running", locked_by=self.worker_id, locked_at=now, attempts=Job.attempts + 1)
+                )
+                if result.rowcount:
+                    claimed.append(job_id)
+                    kinds[kind] += 1
+            await db.commit()
+            if not claimed:
+                return []
+            return list((await db.execute(select(Job).where(Job.id.in_(claimed)))).scalars().all())
+
+    async def _finish(self, job: Job, error: Optional[BaseException] = None, requeue: bool = False):
+        now = _now()
+        if error is None and not requeue:
+            values = {"status": "succeeded", "finished_at": now, "last_error": None}
+        elif requeue:
+            # Interrupted, not failed: give the attempt back
+            values = {"status": "queued", "attempts": Job.attempts - 1}
+        elif isinstance(error, PermanentJobError) or job.attempts >= job.max_attempts:
+            values = {"status": "failed", "finished_at": now, "last_error": str(error) or type(error).__name__}
+        else:
+            values = {
+                "status": "queued",
+                "run_after": now + timedelta(seconds=retry_delay(job.attempts)),
+                "last_error": str(error) or type(error).__name__
+            }
+        async with self.session_factory() as db:
+            # Unless the lock timed out and the job went to someone else meanwhile
+            await db.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.locked_by == self.worker_id)
+                .values(locked_by=None, locked_at=None, **values)
+            )
+            await db.commit()
+
+    async def _execute(self, job: Job):
+        handler = _handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler for job kind {job.kind}")
+            await asyncio.wait_for(handler(job.payload), timeout=_timeouts.get(job.kind, settings.JOB_TIMEOUT_SECONDS))
+        except asyncio.CancelledError:
+            await self._finish(job, requeue=True)
+            raise
+        except Exception as e:
+            print(f"[JOBS] {job.kind} job {job.id} attempt {job.attempts} failed: {e}")
+            await self._finish(job, error=e)
+        else:
+            await self._finish(job)
+
+    def _start(self, job: Job):
+        task = asyncio.create_task(self._execute(job))
+        self._running[job.id] = task
+        self._kinds[job.kind] += 1
+
+        def done(_):
+            del self._running[job.id]
+            self._kinds[job.kind] -= 1
+            self.wakeup.set()
+
+        task.add_done_callback(done)
+
+    async def heartbeat(self):
+        """Refresh the locks of the jobs running here, so maintain() doesn't take them as lost"""
+        if not self._running:
+            return
+        async with self.session_factory() as db:
+            await db.execute(
+                update(Job)
+                .where(Job.id.in_(list(self._running)), Job.locked_by == self.worker_id, Job.status == "running")
+                .values(locked_at=_now())
+            )
+            await db.commit()
+
+    async def maintain(self) -> dict:
+        """Requeue jobs whose worker went away and drop old finished jobs"""
+        now = _now()
+        stale = now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT_SECONDS)
+        async with self.session_factory() as db:
+            lost = {"locked_by": None, "locked_at": None, "last_error": "Worker lost"}
+            failed = await db.execute(
+                update(Job)
+                .where(Job.status == "running", Job.locked_at < stale, Job.attempts >= Job.max_attempts)
+                .values(status="failed", finished_at=now, **lost)
+            )
+            requeued = await db.execute(
+                update(Job)
+                .where(Job.status == "running", Job.locked_at < stale)
+                .values(status="queued", run_after=now, **lost)
+            )
+            pruned = await db.execute(
+                delete(Job).where(
+                    Job.status.in_(("succeeded", "failed")),
+                    Job.finished_at < now - timedelta(hours=settings.JOB_RETENTION_HOURS)
+                )
+            )
+            await db.commit()
+        return {"requeued": requeued.rowcount, "failed": failed.rowcount, "pruned": pruned.rowcount}
+
+    async def run(self):
+        """Poll and run jobs until cancelled; running jobs are requeued on the way out"""
+        # Registers the handlers
+        import Services.background_jobs  # noqa: F401
+
+        _workers.append(self)
+        next_maintenance = 0.0
+        loop = asyncio.get_running_loop()
+        next_heartbeat = loop.time()
+        try:
+            while True:
+                if loop.time() >= next_heartbeat:
+                    try:
+                        await self.heartbeat()
+                    except Exception as e:
+                        print(f"[JOBS] ERROR refreshing locks: {e}")
+                    next_heartbeat = loop.time() + settings.JOB_LOCK_TIMEOUT_SECONDS / 3
+                if loop.time() >= next_maintenance:
+                    try:
+                        report = await self.maintain()
+                        if report["requeued"] or report["failed"]:
+                            print(f"[JOBS] Recovered lost jobs: {report}")
+                    except Exception as e:
+                        print(f"[JOBS] ERROR during maintenance: {e}")
+                    next_maintenance = loop.time() + settings.JOB_MAINTENANCE_INTERVAL_SECONDS
+
+                self.wakeup.clear()
+                slots = self.concurrency - len(self._running)
+                if slots > 0:
+                    try:
+                        for job in await self._claim(slots):
+                            self._start(job)
+                    except Exception as e:
+                        print(f"[JOBS] ERROR claiming jobs: {e}")
+
+                # Until a job is queued here, a slot frees up or the poll interval passes
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=settings.JOB_POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            _workers.remove(self)
+            tasks = list(self._running.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_worker(concurrency: Optional[int] = None):
+    """Run one worker on the app's async engine until cancelled"""
+    from api.database import async_session_Local
+    worker = JobWorker(
+        async_session_Local,
+        concurrency=concurrency or settings.JOB_CONCURRENCY,
+        limits=kind_limits()
+    )
+    await worker.run()
+
+
+def _worker_process(concurrency: int):
+    try:
+        asyncio.run(run_worker(concurrency))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Background job workers and queue status")
+    commands = parser.add_subparsers(dest="command", required=True)
+    work = commands.add_parser("work", help="Run worker processes")
+    work.add_argument("--processes", type=int, default=1, help="Worker processes")
+    work.add_argument("--concurrency", type=int, default=settings.JOB_CONCURRENCY, help="Jobs in flight per process")
+    commands.add_parser("stats", help="Print job counts per kind and status")
+    args = parser.parse_args()
+
+    # Handlers register with the importable module, not with __main__
+    from Services import job_queue
+
+    if args.command == "stats":
+        async def _stats():
+            from api.database import async_session_Local
+            async with async_session_Local() as db:
+                return await job_queue.queue_stats(db)
+
+        stats = asyncio.run(_stats())
+        for kind, counts in sorted(stats["kinds"].items()):
+            print(f"{kind}: " + ", ".join(f"{name} {count}" for name, count in sorted(counts.items())))
+        print(f"oldest due job waiting {stats['oldest_due_seconds']:.0f}s")
+    elif args.processes <= 1:
+        job_queue._worker_process(args.concurrency)
+    else:
+        # Spawned, so no process inherits another's pooled DB connections
+        context = multiprocessing.get_context("spawn")
+        processes = [
+            context.Process(target=job_queue._worker_process, args=(args.concurrency,), name=f"job-worker-{index}")
+            for index in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.join()
@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+from typing import Dict, List
+from sqlalchemy import update, select, func, case, or_
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from model.Bucket import Bucket
+from model.File import File
+from Services.file_repository import LIVE_FILES
+
+# What a file counts against its bucket: its stored (possibly compressed) size.
+# Files from before compression have no stored_size and are charged file_size.
+# Files in the trash are not charged.
+CHARGED_SIZE = func.coalesce(File.stored_size, File.file_size, 0)
+
+
+def charged_size(file) -> int:
+    """CHARGED_SIZE of a loaded File row (or a row with the same columns)"""
+    if file.stored_size is not None:
+        return file.stored_size
+    return file.file_size or 0
+
+
+class QuotaService:
+    """
+    Bucket usage is kept in Bucket.used_Storage and only ever changed by
+    single conditional UPDATEs issued inside the caller's transaction, so the
+    quota check is O(1) and the counter moves atomically with the File rows.
+    Usage counts stored bytes (see charged_size). The caller commits.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def reserve(self, bucket_id: int, size: int):
+        """Charge size bytes to the bucket, or raise 400 if that would exceed its limit"""
+        used = func.coalesce(Bucket.used_Storage, 0)
+        result = await self.db.execute(
+            update(Bucket)
+            .where(
+                Bucket.id == bucket_id,
+                or_(Bucket.storage_limit.is_(None), used + size <= Bucket.storage_limit)
+            )
+            .values(used_Storage=used + size)
+            .execution_options(synchronize_session="fetch")
+        )
+        if result.rowcount == 0:
+            bucket = await self.db.get(Bucket, bucket_id, populate_existing=True)
+            if not bucket:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bucket not found")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Low storage: Bucket limit {bucket.storage_limit} bytes, "
+                       f"currently used {bucket.used_Storage or 0} bytes, "
+                       f"file size {size} bytes"
+            )
+
+    async def release(self, bucket_id: int, size: int):
+        """Give size bytes back to the bucket, never going below zero"""
+        used = func.coalesce(Bucket.used_Storage, 0)
+        await self.db.execute(
+            update(Bucket)
+            .where(Bucket.id == bucket_id)
+            .values(used_Storage=case((used - size < 0, 0), else_=used - size))
+            .execution_options(synchronize_session="fetch")
+        )
+
+
+def reconcile_bucket_usage(db: Session, fix: bool = False, batch_size: int = 500) -> List[Dict]:
+    """
+    Recompute every bucket's usage from its files and report the buckets whose
+    counter drifted. With fix=True the counter is corrected, but only if it
+    hasn't changed since it was read, so live uploads are never overwritten.
+    """
+    actual = (
+        select(func.coalesce(func.sum(CHARGED_SIZE), 0))
+        .where(File.bucket_id == Bucket.id, LIVE_FILES)
+        .scalar_subquery()
+    )
+    drifted = []
+    last_id = 0
+    while True:
+        # Counter and real usage come from one statement, i.e. one snapshot
+        rows = db.execute(
+            select(Bucket.id, Bucket.used_Storage, actual)
+            .where(Bucket.id > last_id)
+            .order_by(Bucket.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        for bucket_id, used, real in rows:
+            if (used or 0) == real:
+                continue
+            report = {"bucket_id": bucket_id, "used_Storage": used, "actual": real, "drift": (used or 0) - real, "fixed": False}
+            if fix:
+                result = db.execute(
+                    update(Bucket)
+                    .where(
+                        Bucket.id == bucket_id,
+                        Bucket.used_Storage.is_(None) if used is None else Bucket.used_Storage == used
+                    )
+                    .values(used_Storage=real)
+                    .execution_options(synchronize_session=False)
+                )
+                report["fixed"] = result.rowcount == 1
+            drifted.append(report)
+
+        db.commit()
+        last_id = rows[-1][0]
+
+    return drifted
+
+
+async def run_reconciliation_loop(interval_seconds: float, fix: bool = True):
+    """Background job: reconcile bucket counters every interval_seconds"""
+    from api.database import session_Local
+
+    def _run_once():
+        db = session_Local()
+        try:
+            return reconcile_bucket_usage(db, fix=fix)
+        finally:
+            db.close()
+
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            drifted = await asyncio.to_thread(_run_once)
+            for report in drifted:
+                print(f"[QUOTA_RECONCILE] bucket {report['bucket_id']}: counter {report['used_Storage']}, "
+                      f"actual {report['actual']}, drift {report['drift']}, fixed {report['fixed']}")
+        except Exception as e:
+            print(f"[QUOTA_RECONCILE] ERROR: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute bucket used_Storage counters and report drift")
+    parser.add_argument("--fix", action="store_true", help="Correct drifted counters")
+    args = parser.parse_args()
+
+    from api.database import session_Local
+    db = session_Local()
+    try:
+        drifted = reconcile_bucket_usage(db, fix=args.fix)
+    finally:
+        db.close()
+
+    for report in drifted:
+        print(f"bucket {report['bucket_id']}: counter {report['used_Storage']}, actual {report['actual']}, "
+              f"drift {report['drift']}{' (fixed)' if report['fixed'] else ''}")
+    print(f"{len(drifted)} bucket(s) drifted")
@@ -0,0 +1,376 @@
+import argparse
+import asyncio
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional
+from sqlalchemy import select, update, delete, func, literal, union_all
+from Auth.config import settings
+from model.Blob import Blob
+from model.File import File
+from model.Thumbnail import Thumbnail
+from model.Upload import UploadPart
+from model.Video import Video, VideoSegment
+from Helpers.cloud_storage import CloudStorageManager, get_cloud_storage_manager
+from Services.background_jobs import enqueue_delete, referenced_paths
+from Services.blob_service import BlobService
+from Services.quota_service import QuotaService, charged_size, reconcile_bucket_usage
+from Services.thumbnail_service import delete_thumbnails, thumbnail_paths
+from Services.video_service import delete_video, video_paths
+
+# Examples kept per kind of problem in a report
+SAMPLE_SIZE = 20
+
+
+class StoredRef(NamedTuple):
+    """A DB row pointing at a stored object"""
+    key: str
+    kind: str  # blob / thumbnail / video_segment / file / upload_part
+    row_id: int
+    file_path: str
+
+
+class StorageReconciler:
+    """
+    Compares what the storage backend holds with what the DB points at. Both
+    sides are streamed in key order and merged, so memory stays flat however
+    many objects and rows there are. It finds:
+
+    * orphan objects, referenced by no row (failed uploads, deletes whose
+      storage call failed). fix deletes those older than the grace period,
+      so uploads that haven't committed their row yet are left alone.
+    * dangling rows, whose object is gone. fix drops thumbnail rows and
+      video renditions missing a segment (they are regenerated); file
+      and blob rows are only dropped with drop_dangling, as their content
+      is lost.
+    * blob ref_counts that don't match their File rows, and bucket
+      used_Storage counters that don't match their files.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        storage_manager: CloudStorageManager,
+        fix: bool = False,
+        drop_dangling: bool = False,
+        grace_seconds: float = 3600,
+        batch_size: int = 500
+    ):
+        self.session_factory = session_factory
+        self.storage_manager = storage_manager
+        self.storage = storage_manager.backend
+        self.fix = fix
+        self.drop_dangling = drop_dangling
+        self.grace_seconds = grace_seconds
+        self.batch_size = batch_size
+        self.report = {
+            "objects": 0,
+            "object_bytes": 0,
+            "rows": 0,
+            "foreign_rows": 0,  # Paths that don't belong to the configured backend
+            "orphans": 0,
+            "orphan_bytes": 0,
+            "orphans_in_grace": 0,
+            "orphans_deleted": 0,
+            "dangling": Counter(),
+            "dangling_fixed": Counter(),
+            "ref_count_drift": 0,
+            "ref_counts_fixed": 0,
+            "objects_collected": 0,
+            "buckets": [],
+            "samples": {}
+        }
+        self._orphan_batch: List[str] = []
+        self._dangling_rows: List[StoredRef] = []
+        self._failed_deletes: List[str] = []
+
+    def _sample(self, kind: str, text: str):
+        samples = self.report["samples"].setdefault(kind, [])
+        if len(samples) < SAMPLE_SIZE:
+            samples.append(text)
+
+    async def _ordered(self, items: AsyncIterator, side: str) -> AsyncIterator:
+        # The merge is only right if both sides really are sorted the same way
+        last = None
+        async for item in items:
+            if last is not None and item.key < last:
+                raise RuntimeError(f"{side} is not in key order ({item.key!r} after {last!r})")
+            last = item.key
+            yield item
+
+    async def _refs(self, db, cutoff: datetime) -> AsyncIterator[StoredRef]:
+        """Every stored path the DB points at, in key order, streamed in batches"""
+        rows = union_all(
+            select(Blob.blob_path.label("path"), literal("blob").label("kind"), Blob.id.label("row_id"))
+            .where(Blob.created_at < cutoff),
+            select(Thumbnail.thumbnail_path, literal("thumbnail"), Thumbnail.id)
+            .where(Thumbnail.created_at < cutoff),
+            select(VideoSegment.segment_path, literal("video_segment"), VideoSegment.id)
+            .where(VideoSegment.created_at < cutoff),
+            # Files with a blob point at the blob's path
+            select(File.file_path, literal("file"), File.id)
+            .where(File.blob_id.is_(None), File.created_at < cutoff),
+            select(UploadPart.part_path, literal("upload_part"), UploadPart.id)
+            .where(UploadPart.created_at < cutoff)
+        ).subquery()
+        path = rows.c.path
+        if db.get_bind().dialect.name == "postgresql":
+            # Byte order, the way the keys compare in Python
+            path = path.collate("C")
+        result = await db.stream(
+            select(rows.c.path, rows.c.kind, rows.c.row_id)
+            .order_by(path)
+            .execution_options(yield_per=self.batch_size)
+        )
+        async for file_path, kind, row_id in result:
+            key = self.storage.object_key(file_path)
+            if key is None:
+                self.report["foreign_rows"] += 1
+                self._sample("foreign_rows", f"{kind} {row_id}: {file_path}")
+                continue
+            yield StoredRef(key, kind, row_id, file_path)
+
+    async def run(self) -> Dict:
+        started = time.time()
+        # Rows created from here on may point at objects the listing has passed already
+        cutoff = datetime.fromtimestamp(started, timezone.utc)
+        orphan_before = started - self.grace_seconds
+
+        objects = self._ordered(self.storage.list_objects(), "Storage listing")
+        async with self.session_factory() as db:
+            refs = self._ordered(self._refs(db, cutoff), "DB listing")
+            obj = await anext(objects, None)
+            ref = await anext(refs, None)
+            matched = False
+            while obj is not None or ref is not None:
+                if ref is None or (obj is not None and obj.key < ref.key):
+                    self.report["objects"] += 1
+                    self.report["object_bytes"] += obj.size
+                    if not matched:
+                        await self._orphan(obj, orphan_before)
+                    obj = await anext(objects, None)
+                    matched = False
+                elif obj is None or ref.key < obj.key:
+                    self.report["rows"] += 1
+                    self._dangling(ref)
+                    ref = await anext(refs, None)
+                else:
+                    # Several rows may share an object, so only the ref advances
+                    self.report["rows"] += 1
+                    matched = True
+                    ref = await anext(refs, None)
+        await self._delete_orphans()
+
+        # DB writes wait until the stream is closed (SQLite would be locked meanwhile)
+        await self._repair_dangling()
+        await self._check_ref_counts()
+        async with self.session_factory() as db:
+            self.report["buckets"] = await db.run_sync(reconcile_bucket_usage, self.fix)
+
+        if self._failed_deletes:
+            async with self.session_factory() as db:
+                for i in range(0, len(self._failed_deletes), self.batch_size):
+                    enqueue_delete(db, self._failed_deletes[i:i + self.batch_size])
+                await db.commit()
+        return self.report
+
+    async def _orphan(self, obj, orphan_before: float):
+        if obj.modified >= orphan_before:
+            self.report["orphans_in_grace"] += 1
+            return
+        self.report["orphans"] += 1
+        self.report["orphan_bytes"] += obj.size
+        self._sample("orphans", f"{obj.key} ({obj.size} bytes)")
+        if self.fix:
+            self._orphan_batch.append(obj.file_path)
+            if len(self._orphan_batch) >= self.batch_size:
+                await self._delete_orphans()
+
+    async def _delete_orphans(self):
+        paths, self._orphan_batch = self._orphan_batch, []
+        if not paths:
+            return
+        # A row may point at it by now
+        referenced = await referenced_paths(paths)
+        paths = [path for path in paths if path not in referenced]
+        results = await asyncio.gather(*(self.storage_manager.delete_file(path) for path in paths))
+        for path, deleted in zip(paths, results):
+            if deleted:
+                self.report["orphans_deleted"] += 1
+            elif await self.storage.exists(path):
+                self._failed_deletes.append(path)
+
+    def _dangling(self, ref: StoredRef):
+        self.report["dangling"][ref.kind] += 1
+        self._sample(f"dangling_{ref.kind}", f"{ref.kind} {ref.row_id}: {ref.file_path}")
+        if (self.fix and ref.kind in ("thumbnail", "video_segment")) or (self.drop_dangling and ref.kind in ("blob", "file")):
+            self._dangling_rows.append(ref)
+
+    async def _repair_dangling(self):
+        for ref in self._dangling_rows:
+            # Re-created or moved since it was listed
+            if await self.storage.exists(ref.file_path):
+                continue
+            async with self.session_factory() as db:
+                if ref.kind == "thumbnail":
+                    result = await db.execute(
+                        delete(Thumbnail).where(Thumbnail.id == ref.row_id, Thumbnail.thumbnail_path == ref.file_path)
+                    )
+                    fixed = result.rowcount > 0
+                elif ref.kind == "video_segment":
+                    fixed = await self._drop_video(db, ref)
+                elif ref.kind == "file":
+                    file = await db.get(File, ref.row_id)
+                    fixed = file is not None and file.blob_id is None and file.file_path == ref.file_path
+                    if fixed:
+                        await db.delete(file)
+                        if not file.is_deleted:
+                            await QuotaService(db).release(file.bucket_id, charged_size(file))
+                else:
+                    fixed = await self._drop_blob(db, ref)
+                await db.commit()
+            if fixed:
+                print(f"[STORAGE_GC] Dropped {ref.kind} {ref.row_id}, its object {ref.file_path} is gone")
+                self.report["dangling_fixed"][ref.kind] += 1
+
+    async def _drop_video(self, db, ref: StoredRef) -> bool:
+        """Delete the video rendition a lost segment belongs to, so it is generated again"""
+        segment = await db.get(VideoSegment, ref.row_id)
+        if segment is None or segment.segment_path != ref.file_path:
+            return False
+        video = await db.get(Video, segment.video_id)
+        # The other segments would be overwritten on regeneration, but may never be
+        self._failed_deletes.extend(path for path in await video_paths(db, video.blob_id) if path != ref.file_path)
+        await delete_video(db, video.blob_id)
+        return True
+
+    async def _drop_blob(self, db, ref: StoredRef) -> bool:
+        """Delete a lost blob with every file of it, in the caller's transaction"""
+        blob = await db.get(Blob, ref.row_id)
+        if blob is None or blob.blob_path != ref.file_path:
+            return False
+        files = (await db.execute(select(File).where(File.blob_id == blob.id))).scalars().all()
+        quota = QuotaService(db)
+        for file in files:
+            await db.delete(file)
+            if not file.is_deleted:
+                await quota.release(file.bucket_id, charged_size(file))
+        await db.flush()
+        # Their objects are stale now
+        self._failed_deletes.extend(await thumbnail_paths(db, blob.id))
+        self._failed_deletes.extend(await video_paths(db, blob.id))
+        await delete_thumbnails(db, blob.id)
+        await delete_video(db, blob.id)
+        await db.delete(blob)
+        return True
+
+    async def _check_ref_counts(self):
+        """Compare each blob's ref_count with its File rows, in id order"""
+        actual = select(func.count(File.id)).where(File.blob_id == Blob.id).scalar_subquery()
+        last_id = 0
+        while True:
+            async with self.session_factory() as db:
+                rows = (await db.execute(
+                    select(Blob.id, Blob.ref_count, actual)
+                    .where(Blob.id > last_id)
+                    .order_by(Blob.id)
+                    .limit(self.batch_size)
+                )).all()
+                if not rows:
+                    return
+
+                unreferenced = []
+                for blob_id, ref_count, real in rows:
+                    if ref_count != real:
+                        self.report["ref_count_drift"] += 1
+                        self._sample("ref_counts", f"blob {blob_id}: ref_count {ref_count}, files {real}")
+                        if not self.fix:
+                            continue
+                        # Unless an upload or delete changed it meanwhile
+                        result = await db.execute(
+                            update(Blob)
+                            .where(Blob.id == blob_id, Blob.ref_count == ref_count)
+                            .values(ref_count=real)
+                        )
+                        if not result.rowcount:
+                            continue
+                        self.report["ref_counts_fixed"] += 1
+                    if real == 0 and self.fix:
+                        unreferenced.append(blob_id)
+                await db.commit()
+
+                if unreferenced:
+                    paths = await BlobService(db, self.storage_manager).collect_many(unreferenced)
+                    for path in paths:
+                        if await self.storage_manager.delete_file(path):
+                            self.report["objects_collected"] += 1
+                        elif await self.storage.exists(path):
+                            self._failed_deletes.append(path)
+            last_id = rows[-1][0]
+
+
+def format_report(report: Dict) -> List[str]:
+    lines = [
+        f"{report['objects']} object(s), {report['object_bytes']} bytes in storage; {report['rows']} row(s) point at storage",
+        f"orphan objects: {report['orphans']} ({report['orphan_bytes']} bytes), {report['orphans_deleted']} deleted, "
+        f"{report['orphans_in_grace']} too recent to judge",
+        "dangling rows: " + (", ".join(
+            f"{kind} {count} ({report['dangling_fixed'][kind]} dropped)" for kind, count in sorted(report["dangling"].items())
+        ) or "none"),
+        f"blob ref_counts off: {report['ref_count_drift']}, {report['ref_counts_fixed']} fixed, "
+        f"{report['objects_collected']} unreferenced object(s) collected",
+        f"bucket counters off: {len(report['buckets'])}, {sum(1 for b in report['buckets'] if b['fixed'])} fixed"
+    ]
+    if report["foreign_rows"]:
+        lines.append(f"{report['foreign_rows']} row(s) point outside the configured storage backend")
+    return lines
+
+
+async def reconcile_storage(fix: bool = False, drop_dangling: bool = False, grace_seconds: Optional[float] = None) -> Dict:
+    """Run a StorageReconciler over the configured backend"""
+    from api.database import async_session_Local
+    reconciler = StorageReconciler(
+        async_session_Local,
+        get_cloud_storage_manager(),
+        fix=fix,
+        drop_dangling=drop_dangling,
+        grace_seconds=settings.STORAGE_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    )
+    return await reconciler.run()
+
+
+async def run_storage_gc_loop(interval_seconds: float):
+    """Background job: reconcile storage every interval_seconds, applying the safe repairs"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            report = await reconcile_storage(fix=True)
+            for line in format_report(report):
+                print(f"[STORAGE_GC] {line}")
+        except Exception as e:
+            print(f"[STORAGE_GC] ERROR: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff storage against the DB and report orphans, dangling rows and drifted counters")
+    parser.add_argument("--fix", action="store_true", help="Delete orphan objects, drop dangling thumbnails and videos, correct counters")
+    parser.add_argument("--drop-dangling", action="store_true", help="Also delete file and blob rows whose content is gone")
+    parser.add_argument("--grace-seconds", type=float, default=None, help="Leave objects younger than this alone")
+    parser.add_argument("--samples", action="store_true", help="List examples of each problem found")
+    args = parser.parse_args()
+
+    async def _main():
+        from Helpers.storage_backend import close_storage_backend
+        try:
+            return await reconcile_storage(fix=args.fix, drop_dangling=args.drop_dangling, grace_seconds=args.grace_seconds)
+        finally:
+            await close_storage_backend()
+
+    report = asyncio.run(_main())
+    for line in format_report(report):
+        print(line)
+    if args.samples:
+        for kind, samples in sorted(report["samples"].items()):
+            print(f"{kind}:")
+            for sample in samples:
+                print(f"  {sample}")
@@ -0,0 +1,149 @@
+from typing import List, Optional
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from Auth.config import settings
+from model.Blob import Blob
+from model.Thumbnail import Thumbnail
+from model.User import User
+from Helpers.cloud_storage import CloudStorageManager, get_cloud_storage_manager
+from Helpers.coalesce import SingleFlight
+from Helpers.thumbnails import THUMBNAIL_CONTENT_TYPE, ThumbnailError, is_thumbnailable, render_thumbnails, run_image_job
+from Services.file_repository import FileRepository
+
+# Longest-edge sizes generated for every image, smallest first
+THUMBNAIL_SIZES = sorted({int(size) for size in settings.THUMBNAIL_SIZES.split(",") if size.strip()})
+
+
+def pick_size(requested: Optional[int]) -> int:
+    """The smallest generated size covering requested (the largest if none does)"""
+    if requested is None:
+        return THUMBNAIL_SIZES[0]
+    for size in THUMBNAIL_SIZES:
+        if size >= requested:
+            return size
+    return THUMBNAIL_SIZES[-1]
+
+
+class ThumbnailService:
+    """
+    Resized WebP previews of image content. Thumbnails belong to the blob,
+    not the file, so every file sharing the content shares them, and they
+    are stored under keys derived from the content hash.
+    """
+
+    def __init__(self, db: AsyncSession, storage_manager: Optional[CloudStorageManager] = None):
+        self.db = db
+        self.storage_manager = storage_manager or get_cloud_storage_manager()
+        self.files = FileRepository(db=db)
+
+    async def _find(self, blob_id: int, size: int) -> Optional[Thumbnail]:
+        result = await self.db.execute(
+            select(Thumbnail).where(Thumbnail.blob_id == blob_id, Thumbnail.size == size)
+        )
+        return result.scalars().first()
+
+    async def generate(self, blob_id: int) -> List[Thumbnail]:
+        """
+        Render and store the configured sizes a blob doesn't have yet.
+        Decoding and resizing run in the thumbnail worker pool.
+        """
+        blob = await self.db.get(Blob, blob_id)
+        if not blob:
+            return []
+
+        existing = set((await self.db.execute(
+            select(Thumbnail.size).where(Thumbnail.blob_id == blob_id)
+        )).scalars().all())
+        missing = [size for size in THUMBNAIL_SIZES if size not in existing]
+        if not missing:
+            return []
+
+        if blob.blob_size > settings.THUMBNAIL_MAX_SOURCE_MB * 1024 * 1024:
+            raise ThumbnailError(f"Image larger than {settings.THUMBNAIL_MAX_SOURCE_MB}MB")
+
+        content = await self.storage_manager.read_file(blob.blob_path)
+        rendered = await run_image_job(render_thumbnails, content, missing, settings.THUMBNAIL_QUALITY)
+
+        thumbnails = []
+        for item in rendered:
+            written = await self.storage_manager.save_derivative(
+                key=f"thumbnails/{blob.sha256_hash}/{item['size']}.webp",
+                content=item["content"],
+                content_type=THUMBNAIL_CONTENT_TYPE
+            )
+            thumbnails.append(Thumbnail(
+                blob_id=blob.id,
+                size=item["size"],
+                content_type=THUMBNAIL_CONTENT_TYPE,
+                thumbnail_path=written["file_path"],
+                thumbnail_size=len(item["content"]),
+                width=item["width"],
+                height=item["height"]
+            ))
+
+        self.db.add_all(thumbnails)
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            # Generated concurrently elsewhere (same keys, same bytes), or the blob was just collected
+            await self.db.rollback()
+            if not await self.db.get(Blob, blob_id):
+                for thumbnail in thumbnails:
+                    await self.storage_manager.delete_file(thumbnail.thumbnail_path)
+            return []
+        print(f"[THUMBNAILS] Generated sizes {[t.size for t in thumbnails]} for blob {blob_id}")
+        return thumbnails
+
+    async def get_thumbnail(self, user: User, file_id: int, size: Optional[int] = None) -> Thumbnail:
+        """
+        The stored thumbnail of a file closest to size. Missing thumbnails
+        (e.g. for files uploaded before the pipeline existed) are generated
+        on first request.
+        """
+        file = await self.files.get_owned_file(user_id=user.id, file_id=file_id)
+        if not THUMBNAIL_SIZES or not file.blob_id or not is_thumbnailable(file.file_name, file.file_content_type):
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Thumbnails are only available for images")
+
+        size = pick_size(size)
+        blob_id = file.blob_id
+        thumbnail = await self._find(blob_id, size)
+        if thumbnail is None:
+            try:
+                await generate_thumbnails(blob_id)
+            except ThumbnailError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            thumbnail = await self._find(blob_id, size)
+            if thumbnail is None:
+                raise HTTPException(status_code=422, detail="Could not generate thumbnail")
+        return thumbnail
+
+
+async def thumbnail_paths(db: AsyncSession, blob_id: int) -> List[str]:
+    """Storage paths of a blob's thumbnails, to remove along with the blob"""
+    result = await db.execute(select(Thumbnail.thumbnail_path).where(Thumbnail.blob_id == blob_id))
+    return list(result.scalars().all())
+
+
+async def delete_thumbnails(db: AsyncSession, blob_id: int):
+    """Delete a blob's thumbnail rows in the caller's transaction (Postgres also cascades)"""
+    await db.execute(delete(Thumbnail).where(Thumbnail.blob_id == blob_id))
+
+
+# Generations running in this process, so concurrent requests for one blob share a single one
+_generations = SingleFlight()
+
+
+async def _generate(blob_id: int):
+    from api.database import async_session_Local
+    async with async_session_Local() as db:
+        await ThumbnailService(db=db).generate(blob_id)
+
+
+async def generate_thumbnails(blob_id: int):
+    """
+    Generate a blob's missing thumbnails in a session of its own. New uploads
+    get theirs from a background job, see Services.background_jobs.
+    """
+    await _generations.run(blob_id, lambda: _generate(blob_id))
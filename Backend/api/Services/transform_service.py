@@ -0,0 +1,94 @@
+import hashlib
+from pathlib import Path
+from typing import Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from Auth.config import settings
+from model.User import User
+from Helpers.cloud_storage import get_cloud_storage_manager
+from Helpers.coalesce import SingleFlight
+from Helpers.thumbnails import TRANSFORM_FORMATS, ThumbnailError, is_thumbnailable, render_transform, run_image_job
+from Helpers.transform_cache import get_transform_cache
+from Services.file_repository import FileRepository
+
+TRANSFORM_FITS = ("contain", "cover")
+
+# Transforms running in this process, keyed like the cache
+_transforms = SingleFlight()
+
+
+class TransformService:
+    """
+    Resized / cropped / re-encoded variants of stored images, computed on
+    request. Results are cached on disk keyed by the content hash and the
+    parameters, so every file with the same content shares them.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.storage_manager = get_cloud_storage_manager()
+        self.files = FileRepository(db=db)
+
+    def _check_params(self, width: Optional[int], height: Optional[int], fit: str, fmt: str, quality: int):
+        if fmt not in TRANSFORM_FORMATS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"fmt must be one of {', '.join(TRANSFORM_FORMATS)}")
+        if fit not in TRANSFORM_FITS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"fit must be one of {', '.join(TRANSFORM_FITS)}")
+        for value in (width, height):
+            if value is not None and not 1 <= value <= settings.TRANSFORM_MAX_DIMENSION:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"w and h must be between 1 and {settings.TRANSFORM_MAX_DIMENSION}")
+        if not 1 <= quality <= 100:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="q must be between 1 and 100")
+
+    async def transform(
+        self,
+        user: User,
+        file_id: int,
+        width: Optional[int] = None,
+        height: Optional[int] = None,
+        fit: str = "contain",
+        fmt: str = "webp",
+        quality: int = 80
+    ) -> Tuple[Path, str, bool]:
+        """
+        Returns (cached file path, content type, cache hit). Concurrent
+        identical requests wait on a single computation.
+        """
+        if fmt == "jpg":
+            fmt = "jpeg"
+        self._check_params(width, height, fit, fmt, quality)
+
+        file = await self.files.get_owned_file(user_id=user.id, file_id=file_id)
+        if not is_thumbnailable(file.file_name, file.file_content_type):
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Only images can be transformed")
+        if (file.file_size or 0) > settings.THUMBNAIL_MAX_SOURCE_MB * 1024 * 1024:
+            raise HTTPException(status_code=422, detail=f"Image larger than {settings.THUMBNAIL_MAX_SOURCE_MB}MB")
+
+        # Quality doesn't apply to lossless PNG, so it doesn't split the cache
+        params = f"{width or ''}x{height or ''}:{fit}:{fmt}:{quality if fmt != 'png' else ''}"
+        source = file.sha256_hash or file.file_path
+        key = hashlib.sha256(f"{source}:{params}".encode()).hexdigest()
+        content_type = TRANSFORM_FORMATS[fmt][1]
+
+        cache = await run_in_threadpool(get_transform_cache)
+        path = await run_in_threadpool(cache.get, key)
+        if path is not None:
+            return path, content_type, True
+
+        file_path = file.file_path
+
+        async def compute() -> Path:
+            content = await self.storage_manager.read_file(file_path)
+            output = await run_image_job(
+                render_transform, content, width=width, height=height, fit=fit, fmt=fmt, quality=quality
+            )
+            return await run_in_threadpool(cache.put, key, output)
+
+        try:
+            path = await _transforms.run(key, compute)
+        except ThumbnailError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except FileNotFoundError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found on storage")
+        return path, content_type, False
@@ -0,0 +1,338 @@
+import hashlib
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update, delete, func, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from fastapi import HTTPException, status
+from model.User import User
+from model.Bucket import Bucket
+from model.Upload import UploadSession, UploadPart
+from Auth.config import settings
+from Helpers.cloud_storage import FileTooLargeError
+from Services.Storage_services import StorageService
+from Services.background_jobs import enqueue_delete
+
+# Each part is one request body, so keep it under the serverless body limit
+MAX_PART_SIZE = 4 * 1024 * 1024  # 4MB
+MAX_PARTS = 10000
+
+
+class UploadSessionService:
+    """
+    Resumable multipart uploads: a session is initiated for a bucket, parts are
+    uploaded independently (in any order, in parallel, and re-sent on failure),
+    then the session is completed into a regular File or aborted.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.storage_service = StorageService(db=db)
+        self.storage_manager = self.storage_service.storage_manager
+
+    async def _get_owned_bucket(self, user: User, bucket_id: int) -> Bucket:
+        bucket = await self.db.get(Bucket, bucket_id)
+        if not bucket:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bucket not found")
+        if bucket.user_id != user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="You do not own this bucket")
+        return bucket
+
+    def _check_quota(self, bucket: Bucket, size: int):
+        try:
+            self.storage_manager.check_storage_Quota(file={"file_size": size}, bucket=bucket, db=self.db)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    async def get_session(self, user: User, upload_id: str, pending: bool = False) -> UploadSession:
+        result = await self.db.execute(
+            select(UploadSession)
+            .where(UploadSession.id == upload_id, UploadSession.user_id == user.id)
+        )
+        session = result.scalars().first()
+        if not session:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found")
+        if pending and session.status != "pending":
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Upload session is {session.status}")
+        return session
+
+    async def initiate(
+        self,
+        user: User,
+        bucket_id: int,
+        file_name: str,
+        content_type: str | None = None,
+        total_size: int | None = None,
+        sha256_hash: str | None = None
+    ):
+        bucket = await self._get_owned_bucket(user, bucket_id)
+
+        if total_size is not None:
+            if total_size < 0:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="total_size must not be negative")
+            self._check_quota(bucket, total_size)
+
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            user_id=user.id,
+            bucket_id=bucket.id,
+            file_name=file_name,
+            file_content_type=content_type,
+            total_size=total_size,
+            sha256_hash=sha256_hash.lower() if sha256_hash else None,
+            status="pending"
+        )
+
+        # Content the user already stored is linked right away, no parts needed
+        blob = await self.storage_service.blob_service.find_for_user(user_id=user.id, sha256_hash=session.sha256_hash) if session.sha256_hash else None
+        new_file = await self.storage_service.link_blob(
+            bucket=bucket, blob=blob, file_name=file_name, content_type=content_type
+        ) if blob else None
+        # Otherwise (or if the blob was collected meanwhile) the parts are uploaded as usual
+        if new_file:
+            session.status = "completed"
+            session.total_size = new_file.file_size
+            session.file_id = new_file.id
+
+        self.db.add(session)
+        await self.db.commit()
+        await self.db.refresh(session)
+
+        return session
+
+    async def upload_part(self, user: User, upload_id: str, part_number: int, stream):
+        if part_number < 1 or part_number > MAX_PARTS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"part_number must be between 1 and {MAX_PARTS}")
+
+        session = await self.get_session(user, upload_id, pending=True)
+
+        try:
+            stored = await self.storage_manager.save_part(
+                upload_id=session.id,
+                part_number=part_number,
+                stream=stream,
+                max_size=MAX_PART_SIZE
+            )
+        except FileTooLargeError as e:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+        values = {
+            "part_size": stored["file_size"],
+            "md5_hash": stored["md5_hash"],
+            "sha256_hash": stored["sha256_hash"],
+            "part_path": stored["file_path"]
+        }
+
+        # The part row is only written while the session is still pending, in
+        # the same transaction that re-checks it, so a complete or abort that
+        # claimed the session meanwhile never sees its parts change
+        session_id = session.id
+        try:
+            part = await self._store_part(session_id, part_number, values)
+        except BaseException:
+            await self.storage_manager.delete_file(values["part_path"])
+            raise
+
+        await self.db.refresh(part)
+        return part
+
+    async def _store_part(self, session_id: str, part_number: int, values: dict) -> UploadPart:
+        """Point the part's row at a freshly written attempt; the attempt it replaces is queued for deletion"""
+        for retry in (False, True):
+            if not await self._touch_pending(session_id):
+                await self.db.rollback()
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload session is no longer pending")
+
+            # Re-sent parts replace the previous attempt
+            part = await self._get_part(session_id, part_number)
+            if part:
+                enqueue_delete(self.db, [part.part_path])
+                for key, value in values.items():
+                    setattr(part, key, value)
+                # Dated like the object it now points at, for the storage GC's cutoff
+                part.created_at = func.now()
+            else:
+                part = UploadPart(session_id=session_id, part_number=part_number, **values)
+                self.db.add(part)
+            try:
+                await self.db.commit()
+                return part
+            except IntegrityError:
+                # The same part was inserted concurrently; replace it with this attempt
+                await self.db.rollback()
+                if retry:
+                    raise
+
+    async def _touch_pending(self, session_id: str) -> bool:
+        """Bump a pending session (locking its row until commit); False if it is no longer pending"""
+        result = await self.db.execute(
+            update(UploadSession)
+            .where(UploadSession.id == session_id, UploadSession.status == "pending")
+            .values(updated_at=func.now())
+        )
+        return result.rowcount == 1
+
+    async def _claim(self, session_id: str, from_status: str, to_status: str) -> bool:
+        """Move a session between states only if it is still in from_status"""
+        result = await self.db.execute(
+            update(UploadSession)
+            .where(UploadSession.id == session_id, UploadSession.status == from_status)
+            .values(status=to_status, updated_at=func.now())
+        )
+        await self.db.commit()
+        return result.rowcount == 1
+
+    async def _get_part(self, session_id: str, part_number: int):
+        result = await self.db.execute(
+            select(UploadPart)
+            .where(UploadPart.session_id == session_id, UploadPart.part_number == part_number)
+        )
+        return result.scalars().first()
+
+    async def complete(self, user: User, upload_id: str):
+        session = await self.get_session(user, upload_id, pending=True)
+        session_id = session.id
+
+        # Claim the session first: a second complete, an abort or a late part
+        # upload can't act on it while its parts are being composed
+        if not await self._claim(session_id, "pending", "completing"):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload session is no longer pending")
+
+        try:
+            return await self._complete(user, session)
+        except BaseException:
+            # Hand the session back so the client can fix its parts and retry
+            await self.db.rollback()
+            await self._claim(session_id, "completing", "pending")
+            raise
+
+    async def _complete(self, user: User, session: UploadSession):
+        # Parts as of the claim; none can be added or replaced after it
+        await self.db.refresh(session, attribute_names=["parts"])
+        parts = list(session.parts)
+
+        if not parts:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No parts uploaded")
+
+        # Parts must be contiguous from 1
+        for expected, part in enumerate(parts, start=1):
+            if part.part_number != expected:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Missing part {expected}")
+
+        total_size = sum(part.part_size for part in parts)
+        if session.total_size is not None and session.total_size != total_size:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Uploaded {total_size} bytes, expected {session.total_size}"
+            )
+
+        bucket = await self._get_owned_bucket(user, session.bucket_id)
+        self._check_quota(bucket, total_size)
+
+        metadata = await self.storage_manager.compose_parts(
+            part_paths=[part.part_path for part in parts],
+            file_name=session.file_name,
+            bucket_id=bucket.id,
+            file_content_type=session.file_content_type,
+            compression=bucket.compression
+        )
+        metadata["original_name"] = session.file_name
+
+        if session.sha256_hash and metadata["sha256_hash"] != session.sha256_hash:
+            await self.storage_manager.delete_file(metadata["file_path"])
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Uploaded content has sha256 {metadata['sha256_hash']}, expected {session.sha256_hash}"
+            )
+
+        # Finish the claim in the transaction that creates the file, so an
+        # expiry that took the session meanwhile wins and no file is created
+        result = await self.db.execute(
+            update(UploadSession)
+            .where(UploadSession.id == session.id, UploadSession.status == "completing")
+            .values(status="completed")
+        )
+        if result.rowcount == 0:
+            await self.db.rollback()
+            await self.storage_manager.delete_file(metadata["file_path"])
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload session expired while completing")
+
+        new_file = await self.storage_service.save_metadata(bucket=bucket, metadata=metadata)
+
+        # S3-style composite checksum: md5 over the part digests, suffixed with the part count
+        part_digests = b"".join(bytes.fromhex(part.md5_hash) for part in parts)
+        multipart_checksum = f"{hashlib.md5(part_digests).hexdigest()}-{len(parts)}"
+
+        self._delete_parts(session)
+        session.file_id = new_file.id
+        await self.db.commit()
+
+        return {
+            "upload_id": session.id,
+            "id": new_file.id,
+            "file_name": new_file.file_name,
+            "file_size": new_file.file_size,
+            "bucket_id": new_file.bucket_id,
+            "sha256_hash": metadata["sha256_hash"],
+            "md5_hash": metadata["md5_hash"],
+            "multipart_checksum": multipart_checksum,
+            "created_at": new_file.created_at.isoformat() if new_file.created_at else None
+        }
+
+    async def abort(self, user: User, upload_id: str):
+        session = await self.get_session(user, upload_id, pending=True)
+        if not await self._claim(session.id, "pending", "aborted"):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload session is no longer pending")
+        await self.db.refresh(session, attribute_names=["parts"])
+        self._delete_parts(session)
+        await self.db.commit()
+        return {"detail": "Upload aborted"}
+
+    def _delete_parts(self, session: UploadSession):
+        """Drop the part rows and queue their objects for deletion, committed with the caller's transaction"""
+        enqueue_delete(self.db, [part.part_path for part in session.parts])
+        session.parts.clear()
+
+
+async def expire_sessions(batch_size: int = 1000) -> int:
+    """
+    Abort the sessions started more than UPLOAD_SESSION_TTL_HOURS ago that
+    never completed, dropping their parts. A session being completed is
+    judged by when it was claimed instead, so only one whose complete
+    crashed long ago is taken. Returns how many were aborted.
+    """
+    if settings.UPLOAD_SESSION_TTL_HOURS <= 0:
+        return 0
+    from api.database import async_session_Local
+    before = datetime.now(timezone.utc) - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    expired_sessions = or_(
+        and_(UploadSession.status == "pending", UploadSession.created_at < before),
+        and_(UploadSession.status == "completing", UploadSession.updated_at < before)
+    )
+    expired = 0
+    async with async_session_Local() as db:
+        while True:
+            result = await db.execute(
+                select(UploadSession.id).where(expired_sessions).limit(batch_size)
+            )
+            session_ids = result.scalars().all()
+            if not session_ids:
+                return expired
+
+            # Conditional like any other claim; a part upload that commits
+            # after this gets a 409 and drops its own object
+            result = await db.execute(
+                update(UploadSession)
+                .where(UploadSession.id.in_(session_ids), expired_sessions)
+                .values(status="aborted")
+            )
+            expired += result.rowcount
+
+            # Sessions that completed meanwhile have no parts left
+            parts = (await db.execute(
+                select(UploadPart.id, UploadPart.part_path).where(UploadPart.session_id.in_(session_ids))
+            )).all()
+            enqueue_delete(db, [part_path for _, part_path in parts])
+            if parts:
+                await db.execute(delete(UploadPart).where(UploadPart.id.in_([part_id for part_id, _ in parts])))
+            await db.commit()
@@ -0,0 +1,231 @@
+import asyncio
+import tempfile
+from pathlib import Path
+from typing import List, Optional, Tuple
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+from Auth.config import settings
+from model.Blob import Blob
+from model.File import File
+from model.Job import Job
+from model.User import User
+from model.Video import Video, VideoSegment
+from Helpers.cloud_storage import CloudStorageManager, get_cloud_storage_manager
+from Helpers.coalesce import SingleFlight
+from Helpers.media import SEGMENT_CONTENT_TYPE, MediaError, is_video, probe, segment_hls
+from Services.file_repository import FileRepository
+from Services.job_queue import enqueue, notify_workers
+
+
+class VideoService:
+    """
+    Metadata and an HLS rendition of video content. Like thumbnails they
+    belong to the blob, so every file sharing the content shares them, and
+    segments are stored under keys derived from the content hash. The
+    playlist itself isn't stored: it is written from the segment rows when
+    requested, see Endpoints.file_endpoints.
+    """
+
+    def __init__(self, db: AsyncSession, storage_manager: Optional[CloudStorageManager] = None):
+        self.db = db
+        self.storage_manager = storage_manager or get_cloud_storage_manager()
+        self.files = FileRepository(db=db)
+
+    async def find(self, blob_id: int) -> Optional[Video]:
+        result = await self.db.execute(select(Video).where(Video.blob_id == blob_id))
+        return result.scalars().first()
+
+    async def _source(self, blob: Blob, workdir: Path) -> Path:
+        """A local file with the blob's content: the stored file itself when possible"""
+        if not blob.compression:
+            local_path = self.storage_manager.local_path(blob.blob_path)
+            if local_path is not None:
+                return local_path
+        source = workdir / "source"
+        f = await asyncio.to_thread(open, source, "wb")
+        try:
+            async for chunk in self.storage_manager.iter_content(blob.blob_path, compression=blob.compression):
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        return source
+
+    async def _store_metadata(self, blob: Blob, probed: dict) -> Optional[Video]:
+        video = Video(blob_id=blob.id, **probed)
+        self.db.add(video)
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            # Probed concurrently elsewhere, or the blob was just collected
+            await self.db.rollback()
+            return await self.find(blob.id)
+        return video
+
+    async def process(self, blob_id: int) -> Optional[Video]:
+        """
+        Probe a video blob and store its HLS segments, unless that was
+        done already. ffprobe and ffmpeg run as subprocesses in a temporary
+        directory, so nothing here blocks the event loop.
+        """
+        blob = await self.db.get(Blob, blob_id)
+        if not blob:
+            return None
+        video = await self.find(blob_id)
+        if video is not None and video.segment_count is not None:
+            return video
+
+        if blob.blob_size > settings.VIDEO_MAX_SOURCE_MB * 1024 * 1024:
+            raise MediaError(f"Video larger than {settings.VIDEO_MAX_SOURCE_MB}MB")
+
+        with tempfile.TemporaryDirectory(prefix="video-") as workdir:
+            workdir = Path(workdir)
+            source = await self._source(blob, workdir)
+            if video is None:
+                video = await self._store_metadata(blob, await probe(source, ffprobe=settings.FFPROBE_PATH))
+                if video is None:
+                    return None
+            probed = {"video_codec": video.video_codec, "audio_codec": video.audio_codec, "height": video.height}
+            output_dir = workdir / "hls"
+            output_dir.mkdir()
+            cut = await segment_hls(
+                source,
+                output_dir,
+                probed,
+                segment_seconds=settings.VIDEO_SEGMENT_SECONDS,
+                max_height=settings.VIDEO_MAX_HEIGHT,
+                ffmpeg=settings.FFMPEG_PATH
+            )
+
+            segments = []
+            for sequence, (duration, segment_file) in enumerate(cut):
+                content = await asyncio.to_thread(segment_file.read_bytes)
+                written = await self.storage_manager.save_derivative(
+                    key=f"videos/{blob.sha256_hash}/{sequence:05d}.ts",
+                    content=content,
+                    content_type=SEGMENT_CONTENT_TYPE
+                )
+                segments.append(VideoSegment(
+                    video_id=video.id,
+                    sequence=sequence,
+                    duration=duration,
+                    segment_path=written["file_path"],
+                    segment_size=len(content)
+                ))
+
+        video_id = video.id
+        video.segment_count = len(segments)
+        video.hls_size = sum(segment.segment_size for segment in segments)
+        self.db.add_all(segments)
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            # Segmented concurrently elsewhere (same keys, same bytes), or the blob was just collected
+            await self.db.rollback()
+            if not await self.db.get(Video, video_id):
+                for segment in segments:
+                    await self.storage_manager.delete_file(segment.segment_path)
+            return await self.find(blob_id)
+        print(f"[VIDEO] Stored {len(segments)} HLS segment(s) for blob {blob_id}")
+        return video
+
+    async def get_file_video(self, user: User, file_id: int) -> Tuple[File, Optional[Video], Optional[str]]:
+        """
+        A video file, its Video row (None until probed) and the error of its
+        failed processing job, if any. A file without an HLS rendition and
+        without a pending job (e.g. uploaded before the pipeline was turned
+        on) gets one queued.
+        """
+        file = await self.files.get_owned_file(user_id=user.id, file_id=file_id)
+        if not file.blob_id or not is_video(file.file_name, file.file_content_type):
+            raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Only mp4 and avi videos can be streamed")
+        if not settings.VIDEO_PIPELINE:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Video processing is not enabled")
+
+        video = await self.find(file.blob_id)
+        if video is not None and video.segment_count is not None:
+            return file, video, None
+
+        job = (await self.db.execute(
+            select(Job)
+            .where(Job.file_id == file.id, Job.kind == "video")
+            .order_by(Job.id.desc())
+            .limit(1)
+        )).scalars().first()
+        if job is not None and job.status == "failed":
+            return file, video, job.last_error
+        if job is None or job.status == "succeeded":
+            enqueue(self.db, "video", {"blob_id": file.blob_id}, user_id=user.id, file_id=file.id)
+            await self.db.commit()
+            notify_workers()
+        return file, video, None
+
+    async def get_segment(self, blob_id: int, sequence: int) -> Optional[VideoSegment]:
+        result = await self.db.execute(
+            select(VideoSegment)
+            .join(Video, Video.id == VideoSegment.video_id)
+            .where(Video.blob_id == blob_id, VideoSegment.sequence == sequence)
+        )
+        return result.scalars().first()
+
+    async def get_segments(self, blob_id: int) -> List[VideoSegment]:
+        result = await self.db.execute(
+            select(VideoSegment)
+            .join(Video, Video.id == VideoSegment.video_id)
+            .where(Video.blob_id == blob_id, Video.segment_count.is_not(None))
+            .order_by(VideoSegment.sequence)
+        )
+        return list(result.scalars().all())
+
+
+def render_playlist(segments: List[VideoSegment]) -> str:
+    """A VOD media playlist with segment URIs relative to the playlist's own URL"""
+    target = max((segment.duration for segment in segments), default=0)
+    lines = [
+        "#EXTM3U",
+        "#EXT-X-VERSION:3",
+        f"#EXT-X-TARGETDURATION:{int(target) + (target % 1 > 0)}",
+        "#EXT-X-MEDIA-SEQUENCE:0",
+        "#EXT-X-PLAYLIST-TYPE:VOD"
+    ]
+    for segment in segments:
+        lines.append(f"#EXTINF:{segment.duration:.6f},")
+        lines.append(f"segments/{segment.sequence}.ts")
+    lines.append("#EXT-X-ENDLIST")
+    return "\n".join(lines) + "\n"
+
+
+async def video_paths(db: AsyncSession, blob_id: int) -> List[str]:
+    """Storage paths of a blob's video segments, to remove along with the blob"""
+    result = await db.execute(
+        select(VideoSegment.segment_path)
+        .join(Video, Video.id == VideoSegment.video_id)
+        .where(Video.blob_id == blob_id)
+    )
+    return list(result.scalars().all())
+
+
+async def delete_video(db: AsyncSession, blob_id: int):
+    """Delete a blob's video rows in the caller's transaction (Postgres also cascades)"""
+    video_ids = select(Video.id).where(Video.blob_id == blob_id).scalar_subquery()
+    await db.execute(delete(VideoSegment).where(VideoSegment.video_id.in_(video_ids)))
+    await db.execute(delete(Video).where(Video.blob_id == blob_id))
+
+
+# Processing running in this process, so concurrent requests for one blob share a single run
+_processing = SingleFlight()
+
+
+async def _process(blob_id: int):
+    from api.database import async_session_Local
+    async with async_session_Local() as db:
+        await VideoService(db=db).process(blob_id)
+
+
+async def process_video(blob_id: int):
+    """
+    Probe and segment a blob in a session of its own. Runs from the "video"
+    background job, see Services.background_jobs.
+    """
+    await _processing.run(blob_id, lambda: _process(blob_id))
@@ -1,5 +1,7 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -9,20 +11,66 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
+# Pool and timeout settings, shared by the sync and async engines
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))  # 0 = no limit
+
 Base = declarative_base()
 
-# Create engine for PostgreSQL
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using them
-    pool_recycle=3600,   # Recycle connections every hour
-)
+
+def _async_url(url: str):
+    """The async driver URL for DATABASE_URL: asyncpg for Postgres, aiosqlite for SQLite"""
+    url = make_url(url.replace("postgres://", "postgresql://", 1))
+    if url.get_backend_name() == "postgresql":
+        # asyncpg spells libpq's sslmode as ssl and has no channel_binding
+        query = dict(url.query)
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode:
+            query["ssl"] = sslmode
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+def _engine_options(url, async_driver: bool) -> dict:
+    options = {
+        "pool_pre_ping": True,  # Verify connections before using them
+        "pool_recycle": 3600,   # Recycle connections every hour
+    }
+    if url.get_backend_name() == "sqlite":
+        return options
+
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT_SECONDS
+    )
+    if DB_STATEMENT_TIMEOUT_MS and url.get_backend_name() == "postgresql":
+        if async_driver:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+# Sync engine for migrations, CLIs and background jobs running in threads
+_sync_url = make_url(DATABASE_URL.replace("postgres://", "postgresql://", 1))
+engine = create_engine(_sync_url, **_engine_options(_sync_url, async_driver=False))
 
 session_Local = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
-def get_db():
-    db = session_Local()
-    try:
+# Async engine for the API, so requests don't queue for threadpool threads
+_async_database_url = _async_url(DATABASE_URL)
+async_engine = create_async_engine(_async_database_url, **_engine_options(_async_database_url, async_driver=True))
+
+# expire_on_commit=False: objects stay readable after commit without implicit (blocking) reloads
+async_session_Local = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_db():
+    async with async_session_Local() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
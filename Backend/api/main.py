@@ -3,10 +3,54 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from Auth.config import settings
 
-app = FastAPI(title="File Storage API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Optional background job that corrects drifted bucket usage counters
+    reconcile_task = None
+    if settings.QUOTA_RECONCILE_INTERVAL_SECONDS > 0:
+        from Services.quota_service import run_reconciliation_loop
+        reconcile_task = asyncio.create_task(run_reconciliation_loop(settings.QUOTA_RECONCILE_INTERVAL_SECONDS))
+    # Background job that empties the trash once the restore window has passed
+    purge_task = None
+    if settings.FILE_PURGE_INTERVAL_SECONDS > 0:
+        from Services.batch_service import run_purge_loop
+        purge_task = asyncio.create_task(run_purge_loop(settings.FILE_PURGE_INTERVAL_SECONDS))
+    # Optional background job that diffs storage against the DB and cleans up
+    storage_gc_task = None
+    if settings.STORAGE_GC_INTERVAL_SECONDS > 0:
+        from Services.storage_gc import run_storage_gc_loop
+        storage_gc_task = asyncio.create_task(run_storage_gc_loop(settings.STORAGE_GC_INTERVAL_SECONDS))
+    # Background job workers; separate worker processes can share the queue
+    from Services.job_queue import run_worker
+    job_workers = [asyncio.create_task(run_worker()) for _ in range(settings.JOB_IN_APP_WORKERS)]
+    yield
+    if reconcile_task:
+        reconcile_task.cancel()
+    if purge_task:
+        purge_task.cancel()
+    if storage_gc_task:
+        storage_gc_task.cancel()
+    # Running jobs are put back in the queue
+    for worker in job_workers:
+        worker.cancel()
+    await asyncio.gather(*job_workers, return_exceptions=True)
+    # Stop thumbnail and hashing workers and close pooled storage connections on shutdown
+    from Helpers.thumbnails import shutdown_thumbnail_pool
+    shutdown_thumbnail_pool()
+    from Helpers.hashing import shutdown_hash_pool
+    shutdown_hash_pool()
+    from Helpers.storage_backend import close_storage_backend
+    await close_storage_backend()
+
+
+app = FastAPI(title="File Storage API", lifespan=lifespan)
 
 # 🔥 CORS — MUST be first thing after app creation
 app.add_middleware(
@@ -21,6 +65,14 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# Request latency and DB query metrics, outermost so they cover everything else
+if settings.METRICS_ENABLED:
+    from api.database import engine, async_engine
+    from Helpers.instrumentation import MetricsMiddleware, instrument_engine
+    instrument_engine(engine)
+    instrument_engine(async_engine.sync_engine)
+    app.add_middleware(MetricsMiddleware)
+
 # 🔥 Explicit OPTIONS handler (fixes Vercel preflight bug)
 from fastapi import Response
 
@@ -40,10 +92,18 @@ async def preflight_handler(path: str):
 from Endpoints.auth_endpoints import auth_endpoints
 from Endpoints.bucket_endpoints import bucket_router
 from Endpoints.file_endpoints import file_router
+from Endpoints.upload_endpoints import upload_router
+from Endpoints.job_endpoints import job_router
+from Endpoints.storage_endpoints import storage_router
+from Endpoints.metrics_endpoints import metrics_router
 
 app.include_router(auth_endpoints)
 app.include_router(bucket_router, prefix="/api")
 app.include_router(file_router)
+app.include_router(upload_router)
+app.include_router(job_router)
+app.include_router(storage_router)
+app.include_router(metrics_router)
 
 @app.get("/")
 def root():
@@ -0,0 +1,20 @@
+from api.database import Base
+from sqlalchemy import Column,Integer, String, DateTime, func,BigInteger
+from sqlalchemy.orm import relationship
+
+class Blob(Base):
+    
+    __tablename__="blobs"
+    id=Column(Integer,primary_key=True, index=True)
+    sha256_hash=Column(String,unique=True,nullable=False,index=True)
+    md5_hash=Column(String)
+    blob_size=Column(BigInteger,nullable=False)  # Logical (uncompressed) size
+    stored_size=Column(BigInteger,nullable=True)  # Bytes in storage; None for blobs stored before compression
+    compression=Column(String,nullable=True)  # Encoding of the stored bytes, None when stored as is
+    blob_path=Column(String,nullable=False)  # Backend file_path of the single stored copy
+    ref_count=Column(Integer,nullable=False,default=0)  # Number of File rows pointing here
+    created_at=Column(DateTime(timezone=True), server_default=func.now())
+    
+    files=relationship("File",back_populates="blob")
+    thumbnails=relationship("Thumbnail",back_populates="blob",passive_deletes=True)
+    video=relationship("Video",back_populates="blob",uselist=False,passive_deletes=True)
@@ -1,16 +1,22 @@
 from api.database import Base
-from sqlalchemy import Column,Integer, String, DateTime, func, ForeignKey,Boolean,BigInteger
+from sqlalchemy import Column,Integer, String, DateTime, func, ForeignKey,Boolean,BigInteger,Index
 from sqlalchemy.orm import relationship
 class Bucket(Base):
     __tablename__="buckets"
+    # Keyset pagination indexes for the bucket listing
+    __table_args__ = (
+        Index("ix_buckets_user_id_created_at_id", "user_id", "created_at", "id"),
+        Index("ix_buckets_user_id_name_id", "user_id", "name", "id"),
+    )
     
     id=Column(Integer,primary_key=True,index=True)
     user_id=Column(Integer,ForeignKey("users.id"),nullable=False)
-    name=Column(String)
+    name=Column(String,nullable=False)
     is_public=Column(Boolean,default=True)
     storage_limit=Column(BigInteger)
-    created_at=Column(DateTime(timezone=True),server_default=func.now())
+    created_at=Column(DateTime(timezone=True),nullable=False,server_default=func.now())
     updated_at=Column(DateTime(timezone=True),server_default=func.now())
-    used_Storage=Column(BigInteger)
+    used_Storage=Column(BigInteger)  # Stored bytes, i.e. after compression, see QuotaService
+    compression=Column(String,nullable=True)  # "gzip" / "zstd": compress compressible uploads at rest
     owner=relationship("User", back_populates="buckets")
     files=relationship("File",back_populates="bucket")
\ No newline at end of file
@@ -1,21 +1,49 @@
 from api.database import Base
-from sqlalchemy import Column,Integer, String, DateTime, func,ForeignKey,Boolean,BigInteger
+from sqlalchemy import Column,Integer, String, DateTime, func,ForeignKey,Boolean,BigInteger,Index,text
 from sqlalchemy.orm import relationship
 
 class File(Base):
     
     __tablename__="files"
+    # Keyset pagination indexes, one per sort option of the file listing. Partial:
+    # only live files are listed, so deleted rows don't grow them (see LIVE_FILES)
+    __table_args__ = (
+        Index("ix_files_bucket_id_created_at_id", "bucket_id", "created_at", "id",
+              postgresql_where=text("is_deleted = false"), sqlite_where=text("is_deleted = false")),
+        Index("ix_files_bucket_id_file_name_id", "bucket_id", "file_name", "id",
+              postgresql_where=text("is_deleted = false"), sqlite_where=text("is_deleted = false")),
+        Index("ix_files_bucket_id_file_size_id", "bucket_id", "file_size", "id",
+              postgresql_where=text("is_deleted = false"), sqlite_where=text("is_deleted = false")),
+        # The purge's scan of the trash
+        Index("ix_files_deleted_at", "deleted_at",
+              postgresql_where=text("is_deleted = true"), sqlite_where=text("is_deleted = true")),
+    )
     id=Column(Integer,primary_key=True, index=True)
     file_name=Column(String,nullable=False)
     bucket_id=Column(Integer,ForeignKey("buckets.id"),nullable=False)
     file_content_type=Column(String)
-    file_size=Column(BigInteger)
+    file_size=Column(BigInteger,nullable=False)
     is_public=Column(Boolean,default=True)
-    is_deleted=Column(Boolean,default=False)
-    created_at=Column(DateTime(timezone=True), server_default=func.now())
+    is_deleted=Column(Boolean,nullable=False,default=False,server_default=text("false"))  # In the trash, see BatchFileService.purge_deleted
+    deleted_at=Column(DateTime(timezone=True),nullable=True)
+    created_at=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     file_path = Column(String, nullable=False)
     file_url = Column(String, nullable=True)  # Cloud storage URL
+    sha256_hash = Column(String, nullable=True, index=True)
+    md5_hash = Column(String, nullable=True)  # Taken in the same pass as sha256_hash, see Helpers.hashing
+    blob_id = Column(Integer, ForeignKey("blobs.id"), nullable=True, index=True)  # Shared content, see model.Blob
+    # Copied from the blob, like file_path: what is charged to the quota and how to decode it
+    stored_size = Column(BigInteger, nullable=True)
+    compression = Column(String, nullable=True)
     
     bucket=relationship("Bucket",back_populates="files")
+    blob=relationship("Blob",back_populates="files")
+    # Generated previews of the file's content, see Services.thumbnail_service
+    thumbnails=relationship(
+        "Thumbnail",
+        primaryjoin="File.blob_id == foreign(Thumbnail.blob_id)",
+        order_by="Thumbnail.size",
+        viewonly=True
+    )
     
     
\ No newline at end of file
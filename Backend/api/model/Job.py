@@ -0,0 +1,24 @@
+from api.database import Base
+from sqlalchemy import Column,Integer, String, DateTime, func, ForeignKey, JSON, Text, Index
+
+class Job(Base):
+
+    __tablename__="jobs"
+    # Workers poll for due queued jobs; status pages look jobs up by file
+    __table_args__=(
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+    id=Column(Integer,primary_key=True, index=True)
+    kind=Column(String,nullable=False)  # Handler name, see Services.job_queue
+    payload=Column(JSON,nullable=False,default=dict)
+    status=Column(String,nullable=False,default="queued")  # queued / running / succeeded / failed
+    attempts=Column(Integer,nullable=False,default=0)
+    max_attempts=Column(Integer,nullable=False)
+    run_after=Column(DateTime(timezone=True),nullable=False)  # Not picked up before this (retry backoff)
+    locked_by=Column(String,nullable=True)  # Worker running it
+    locked_at=Column(DateTime(timezone=True),nullable=True)
+    last_error=Column(Text,nullable=True)
+    user_id=Column(Integer,ForeignKey("users.id"),nullable=True,index=True)  # Owner, None for system jobs
+    file_id=Column(Integer,nullable=True,index=True)  # File it was queued for; not a FK so the job outlives it
+    created_at=Column(DateTime(timezone=True), server_default=func.now())
+    finished_at=Column(DateTime(timezone=True),nullable=True)
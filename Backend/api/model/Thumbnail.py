@@ -0,0 +1,19 @@
+from api.database import Base
+from sqlalchemy import Column,Integer, String, DateTime, func, ForeignKey,BigInteger,UniqueConstraint
+from sqlalchemy.orm import relationship
+
+class Thumbnail(Base):
+
+    __tablename__="thumbnails"
+    __table_args__=(UniqueConstraint("blob_id","size",name="uq_thumbnails_blob_size"),)
+    id=Column(Integer,primary_key=True, index=True)
+    blob_id=Column(Integer,ForeignKey("blobs.id",ondelete="CASCADE"),nullable=False,index=True)  # Derived from content, so shared by every file of the blob
+    size=Column(Integer,nullable=False)  # Longest edge it was fitted into, in pixels
+    content_type=Column(String,nullable=False)
+    thumbnail_path=Column(String,nullable=False)
+    thumbnail_size=Column(BigInteger,nullable=False)  # Bytes
+    width=Column(Integer,nullable=False)
+    height=Column(Integer,nullable=False)
+    created_at=Column(DateTime(timezone=True), server_default=func.now())
+
+    blob=relationship("Blob",back_populates="thumbnails")
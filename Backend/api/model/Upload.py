@@ -0,0 +1,36 @@
+from api.database import Base
+from sqlalchemy import Column,Integer, String, DateTime, func, ForeignKey,BigInteger,UniqueConstraint
+from sqlalchemy.orm import relationship
+
+class UploadSession(Base):
+    
+    __tablename__="upload_sessions"
+    id=Column(String,primary_key=True)
+    user_id=Column(Integer,ForeignKey("users.id"),nullable=False)
+    bucket_id=Column(Integer,ForeignKey("buckets.id"),nullable=False)
+    file_name=Column(String,nullable=False)
+    file_content_type=Column(String)
+    total_size=Column(BigInteger,nullable=True)  # Declared by the client, checked against quota
+    sha256_hash=Column(String,nullable=True)  # Declared by the client, checked on complete
+    status=Column(String,nullable=False,default="pending")  # pending / completing / completed / aborted
+    file_id=Column(Integer,ForeignKey("files.id"),nullable=True)  # Set once completed
+    created_at=Column(DateTime(timezone=True), server_default=func.now())
+    updated_at=Column(DateTime(timezone=True), server_default=func.now(),onupdate=func.now())
+    
+    parts=relationship("UploadPart",back_populates="session",cascade="all, delete-orphan",order_by="UploadPart.part_number",lazy="selectin")
+
+
+class UploadPart(Base):
+    
+    __tablename__="upload_parts"
+    __table_args__=(UniqueConstraint("session_id","part_number",name="uq_upload_parts_session_part"),)
+    id=Column(Integer,primary_key=True, index=True)
+    session_id=Column(String,ForeignKey("upload_sessions.id"),nullable=False,index=True)
+    part_number=Column(Integer,nullable=False)
+    part_size=Column(BigInteger,nullable=False)
+    md5_hash=Column(String,nullable=False)
+    sha256_hash=Column(String,nullable=False)
+    part_path=Column(String,nullable=False)
+    created_at=Column(DateTime(timezone=True), server_default=func.now())
+    
+    session=relationship("UploadSession",back_populates="parts")
@@ -0,0 +1,36 @@
+from api.database import Base
+from sqlalchemy import Column,Integer, String, DateTime, func, ForeignKey,BigInteger,Float,UniqueConstraint
+from sqlalchemy.orm import relationship
+
+class Video(Base):
+
+    __tablename__="videos"
+    id=Column(Integer,primary_key=True, index=True)
+    blob_id=Column(Integer,ForeignKey("blobs.id",ondelete="CASCADE"),nullable=False,unique=True,index=True)  # Derived from content, like thumbnails
+    duration=Column(Float,nullable=True)  # Seconds
+    width=Column(Integer,nullable=True)
+    height=Column(Integer,nullable=True)
+    video_codec=Column(String,nullable=True)
+    audio_codec=Column(String,nullable=True)
+    bit_rate=Column(BigInteger,nullable=True)  # Bits per second, whole container
+    format_name=Column(String,nullable=True)
+    segment_count=Column(Integer,nullable=True)  # None until the HLS rendition is stored
+    hls_size=Column(BigInteger,nullable=True)  # Bytes of all segments
+    created_at=Column(DateTime(timezone=True), server_default=func.now())
+
+    blob=relationship("Blob",back_populates="video")
+    segments=relationship("VideoSegment",back_populates="video",order_by="VideoSegment.sequence",passive_deletes=True)
+
+class VideoSegment(Base):
+
+    __tablename__="video_segments"
+    __table_args__=(UniqueConstraint("video_id","sequence",name="uq_video_segments_video_sequence"),)
+    id=Column(Integer,primary_key=True, index=True)
+    video_id=Column(Integer,ForeignKey("videos.id",ondelete="CASCADE"),nullable=False,index=True)
+    sequence=Column(Integer,nullable=False)  # Position in the playlist, from 0
+    duration=Column(Float,nullable=False)  # Seconds, as written to #EXTINF
+    segment_path=Column(String,nullable=False)
+    segment_size=Column(BigInteger,nullable=False)  # Bytes
+    created_at=Column(DateTime(timezone=True), server_default=func.now())
+
+    video=relationship("Video",back_populates="segments")
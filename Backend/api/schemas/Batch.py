@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+class Batch_File_Filter_Schema(BaseModel):
+    content_type: Optional[str] = None
+    name_prefix: Optional[str] = None
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+class Batch_Delete_Schema(BaseModel):
+    # Either explicit ids, or a bucket plus optional filters
+    file_ids: Optional[List[int]] = None
+    bucket_id: Optional[int] = None
+    filters: Optional[Batch_File_Filter_Schema] = None
+
+class Batch_Move_Schema(BaseModel):
+    file_ids: List[int]
+    target_bucket_id: int
+
+class Batch_Item_Schema(BaseModel):
+    file_id: Optional[int] = None
+    file_name: Optional[str] = None
+    file_size: Optional[int] = None
+    sha256_hash: Optional[str] = None
+    status_code: int
+    detail: Optional[str] = None
+
+class Batch_Result_Schema(BaseModel):
+    succeeded: int
+    failed: int
+    has_more: bool = False
+    results: List[Batch_Item_Schema]
@@ -1,11 +1,12 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 
 class Bucket_create_Schema(BaseModel):
     name:str
     is_public:Optional[bool]=True
     storage_limit:Optional[int]=None
+    compression:Optional[Literal["gzip","zstd"]]=None  # Compress text-like uploads at rest
     
     
 class Bucket_Response_schema(BaseModel):
@@ -15,6 +16,7 @@ class Bucket_Response_schema(BaseModel):
     is_public: bool
     storage_limit: Optional[int]
     used_Storage:Optional[int]
+    compression:Optional[str]=None
     created_at: datetime
     updated_at: datetime
     
@@ -23,4 +25,6 @@ class Bucket_Response_schema(BaseModel):
         
 class Bucket_update_Schema(BaseModel):
     name: Optional[str] = None
-    storage_limit: Optional[int] = None
\ No newline at end of file
+    storage_limit: Optional[int] = None
+    is_public: Optional[bool] = None
+    compression: Optional[Literal["none", "gzip", "zstd"]] = None  # "none" turns it off; applies to new uploads
\ No newline at end of file
@@ -17,9 +17,14 @@ class File_Response_Schema(BaseModel):
     is_public: Optional[bool]=None
     is_deleted: Optional[bool]=None
     created_at: Optional[datetime]=None
+    sha256_hash: Optional[str] = None
     path: Optional[str] = None
     filename: Optional[str] = None
     media_type: Optional[str] = None
 
     class Config:
         from_attributes = True
+
+class Signed_URL_Schema(BaseModel):
+    url: str
+    expires_at: datetime
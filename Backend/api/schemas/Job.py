@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+from datetime import datetime
+
+class Job_Response_Schema(BaseModel):
+    id: int
+    kind: str
+    status: str
+    attempts: int
+    max_attempts: int
+    run_after: Optional[datetime] = None
+    last_error: Optional[str] = None
+    file_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class Job_Stats_Schema(BaseModel):
+    totals: Dict[str, int]
+    kinds: Dict[str, Dict[str, int]]
+    oldest_due_seconds: float
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class Latency_Summary_Schema(BaseModel):
+    operation: str
+    outcome: str
+    count: int
+    mean_seconds: Optional[float] = None
+    p50_seconds: Optional[float] = None
+    p90_seconds: Optional[float] = None
+    p99_seconds: Optional[float] = None
+
+class Storage_Stats_Schema(BaseModel):
+    backend: str
+    requests: List[Latency_Summary_Schema]
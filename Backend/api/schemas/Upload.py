@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+class Upload_Create_Schema(BaseModel):
+    file_name: str
+    file_content_type: Optional[str] = None
+    total_size: Optional[int] = None
+    sha256_hash: Optional[str] = None
+
+class Upload_Part_Schema(BaseModel):
+    part_number: int
+    part_size: int
+    md5_hash: str
+    sha256_hash: str
+
+    class Config:
+        from_attributes = True
+
+class Upload_Session_Schema(BaseModel):
+    id: str
+    bucket_id: int
+    file_name: str
+    file_content_type: Optional[str] = None
+    total_size: Optional[int] = None
+    sha256_hash: Optional[str] = None
+    status: str
+    file_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    max_part_size: Optional[int] = None
+    parts: List[Upload_Part_Schema] = []
+
+    class Config:
+        from_attributes = True
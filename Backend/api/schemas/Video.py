@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class Video_Response_Schema(BaseModel):
+    file_id: int
+    status: str  # processing / ready
+    duration: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    video_codec: Optional[str] = None
+    audio_codec: Optional[str] = None
+    bit_rate: Optional[int] = None
+    format_name: Optional[str] = None
+    segment_count: Optional[int] = None
+    hls_size: Optional[int] = None
+    playlist_url: Optional[str] = None
+    expires_at: Optional[datetime] = None
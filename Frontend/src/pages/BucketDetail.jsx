@@ -1,6 +1,6 @@
 import { useState, useEffect, useRef } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import api from '../services/api';
+import api, { getAllPages } from '../services/api';
 import { Button } from '../components/ui/Button';
 import { Card } from '../components/ui/Card';
 import { Input } from '../components/ui/Input';
@@ -32,8 +32,7 @@ const BucketDetail = () => {
         try {
             const bucketRes = await api.get(`/api/buckets/${bucketId}`);
             setBucket(bucketRes.data);
-            const filesRes = await api.get(`/api/buckets/${bucketId}/files`);
-            setFiles(filesRes.data);
+            setFiles(await getAllPages(`/api/buckets/${bucketId}/files`));
         } catch (error) {
             console.error(error);
             toast.error('Failed to load details');
@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import api from '../services/api';
+import api, { getAllPages } from '../services/api';
 import { Button } from '../components/ui/Button';
 import { Card, CardContent } from '../components/ui/Card';
 import CreateBucketModal from '../components/Modals/CreateBucketModal';
@@ -15,8 +15,7 @@ const Dashboard = () => {
 
     const fetchBuckets = async () => {
         try {
-            const response = await api.get('/api/buckets');
-            setBuckets(response.data);
+            setBuckets(await getAllPages('/api/buckets'));
         } catch (error) {
             console.error(error);
             toast.error('Failed to load buckets');
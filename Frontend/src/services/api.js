@@ -71,4 +71,18 @@ api.interceptors.response.use(
     }
 );
 
+// Fetch every page of a cursor-paginated list endpoint
+export const getAllPages = async (url, params = {}) => {
+    const items = [];
+    let cursor = null;
+    do {
+        const response = await api.get(url, {
+            params: { ...params, limit: 1000, ...(cursor ? { cursor } : {}) },
+        });
+        items.push(...response.data);
+        cursor = response.headers['x-next-cursor'];
+    } while (cursor);
+    return items;
+};
+
 export default api;
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""add listing pagination indexes
+
+Revision ID: 1b84ffe89dee
+Revises: f82f040c8be8
+Create Date: 2026-10-17 16:05:55.028003
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b84ffe89dee'
+down_revision: Union[str, Sequence[str], None] = 'f82f040c8be8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index("ix_files_bucket_id_created_at_id", "files", ["bucket_id", "created_at", "id"], unique=False)
+    op.create_index("ix_files_bucket_id_file_name_id", "files", ["bucket_id", "file_name", "id"], unique=False)
+    op.create_index("ix_files_bucket_id_file_size_id", "files", ["bucket_id", "file_size", "id"], unique=False)
+    op.create_index("ix_buckets_user_id_created_at_id", "buckets", ["user_id", "created_at", "id"], unique=False)
+    op.create_index("ix_buckets_user_id_name_id", "buckets", ["user_id", "name", "id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_buckets_user_id_name_id", table_name="buckets")
+    op.drop_index("ix_buckets_user_id_created_at_id", table_name="buckets")
+    op.drop_index("ix_files_bucket_id_file_size_id", table_name="files")
+    op.drop_index("ix_files_bucket_id_file_name_id", table_name="files")
+    op.drop_index("ix_files_bucket_id_created_at_id", table_name="files")
@@ -0,0 +1,33 @@
+"""add file md5 hash
+
+Revision ID: 2b6f0d8e4a15
+Revises: e41a7c6d9f03
+Create Date: 2026-10-17 20:11:48.902317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b6f0d8e4a15'
+down_revision: Union[str, Sequence[str], None] = 'e41a7c6d9f03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("files", sa.Column("md5_hash", sa.String(), nullable=True))
+    # Files with a blob take its digest; legacy files get theirs on the next verify
+    op.execute(
+        "UPDATE files SET md5_hash = (SELECT blobs.md5_hash FROM blobs WHERE blobs.id = files.blob_id) "
+        "WHERE blob_id IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("files", "md5_hash")
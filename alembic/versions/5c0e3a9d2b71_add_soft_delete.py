@@ -0,0 +1,49 @@
+"""add soft delete
+
+Revision ID: 5c0e3a9d2b71
+Revises: abbebdd7d418
+Create Date: 2026-10-17 18:02:37.514826
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0e3a9d2b71'
+down_revision: Union[str, Sequence[str], None] = 'abbebdd7d418'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LISTING_INDEXES = {
+    "ix_files_bucket_id_created_at_id": ["bucket_id", "created_at", "id"],
+    "ix_files_bucket_id_file_name_id": ["bucket_id", "file_name", "id"],
+    "ix_files_bucket_id_file_size_id": ["bucket_id", "file_size", "id"],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("UPDATE files SET is_deleted = false WHERE is_deleted IS NULL")
+    op.alter_column("files", "is_deleted", existing_type=sa.Boolean(), nullable=False, server_default=sa.text("false"))
+    op.add_column("files", sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True))
+
+    # Listings only ever read live files
+    live = sa.text("is_deleted = false")
+    for name, columns in LISTING_INDEXES.items():
+        op.drop_index(name, table_name="files")
+        op.create_index(name, "files", columns, unique=False, postgresql_where=live, sqlite_where=live)
+    trash = sa.text("is_deleted = true")
+    op.create_index("ix_files_deleted_at", "files", ["deleted_at"], unique=False, postgresql_where=trash, sqlite_where=trash)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_files_deleted_at", table_name="files")
+    for name, columns in LISTING_INDEXES.items():
+        op.drop_index(name, table_name="files")
+        op.create_index(name, "files", columns, unique=False)
+    op.drop_column("files", "deleted_at")
+    op.alter_column("files", "is_deleted", existing_type=sa.Boolean(), nullable=True, server_default=None)
@@ -0,0 +1,28 @@
+"""add upload session sha256
+
+Revision ID: 7d3e9b1c5a28
+Revises: 2b6f0d8e4a15
+Create Date: 2026-10-17 21:02:37.415680
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7d3e9b1c5a28'
+down_revision: Union[str, Sequence[str], None] = '2b6f0d8e4a15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("upload_sessions", sa.Column("sha256_hash", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("upload_sessions", "sha256_hash")
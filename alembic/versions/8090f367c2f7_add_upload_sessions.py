@@ -0,0 +1,63 @@
+"""add upload sessions
+
+Revision ID: 8090f367c2f7
+Revises: 
+Create Date: 2026-10-17 15:57:22.680040
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8090f367c2f7'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "upload_sessions",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("bucket_id", sa.Integer(), nullable=False),
+        sa.Column("file_name", sa.String(), nullable=False),
+        sa.Column("file_content_type", sa.String(), nullable=True),
+        sa.Column("total_size", sa.BigInteger(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("file_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["bucket_id"], ["buckets.id"]),
+        sa.ForeignKeyConstraint(["file_id"], ["files.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "upload_parts",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("session_id", sa.String(), nullable=False),
+        sa.Column("part_number", sa.Integer(), nullable=False),
+        sa.Column("part_size", sa.BigInteger(), nullable=False),
+        sa.Column("md5_hash", sa.String(), nullable=False),
+        sa.Column("sha256_hash", sa.String(), nullable=False),
+        sa.Column("part_path", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.ForeignKeyConstraint(["session_id"], ["upload_sessions.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("session_id", "part_number", name="uq_upload_parts_session_part"),
+    )
+    op.create_index(op.f("ix_upload_parts_id"), "upload_parts", ["id"], unique=False)
+    op.create_index(op.f("ix_upload_parts_session_id"), "upload_parts", ["session_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_upload_parts_session_id"), table_name="upload_parts")
+    op.drop_index(op.f("ix_upload_parts_id"), table_name="upload_parts")
+    op.drop_table("upload_parts")
+    op.drop_table("upload_sessions")
@@ -0,0 +1,46 @@
+"""add image thumbnails
+
+Revision ID: 9107d3da9b20
+Revises: 1b84ffe89dee
+Create Date: 2026-10-17 16:17:40.715294
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9107d3da9b20'
+down_revision: Union[str, Sequence[str], None] = '1b84ffe89dee'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "thumbnails",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("blob_id", sa.Integer(), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("content_type", sa.String(), nullable=False),
+        sa.Column("thumbnail_path", sa.String(), nullable=False),
+        sa.Column("thumbnail_size", sa.BigInteger(), nullable=False),
+        sa.Column("width", sa.Integer(), nullable=False),
+        sa.Column("height", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.ForeignKeyConstraint(["blob_id"], ["blobs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("blob_id", "size", name="uq_thumbnails_blob_size"),
+    )
+    op.create_index(op.f("ix_thumbnails_id"), "thumbnails", ["id"], unique=False)
+    op.create_index(op.f("ix_thumbnails_blob_id"), "thumbnails", ["blob_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_thumbnails_blob_id"), table_name="thumbnails")
+    op.drop_index(op.f("ix_thumbnails_id"), table_name="thumbnails")
+    op.drop_table("thumbnails")
@@ -0,0 +1,45 @@
+"""make listing sort columns not null
+
+Revision ID: 9a4c2e7f1b60
+Revises: 7d3e9b1c5a28
+Create Date: 2026-10-17 21:40:12.508391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c2e7f1b60'
+down_revision: Union[str, Sequence[str], None] = '7d3e9b1c5a28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keyset pagination compares (sort column, id) tuples, which never match
+    # a NULL, so rows with one dropped out of every listing
+    op.execute(
+        "UPDATE files SET file_size = COALESCE("
+        "(SELECT blobs.blob_size FROM blobs WHERE blobs.id = files.blob_id), stored_size, 0"
+        ") WHERE file_size IS NULL"
+    )
+    op.execute("UPDATE files SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+    op.execute("UPDATE buckets SET name = 'bucket-' || id WHERE name IS NULL")
+    op.execute("UPDATE buckets SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+    op.alter_column("files", "file_size", existing_type=sa.BigInteger(), nullable=False)
+    op.alter_column("files", "created_at", existing_type=sa.DateTime(timezone=True), nullable=False, existing_server_default=sa.func.now())
+    op.alter_column("buckets", "name", existing_type=sa.String(), nullable=False)
+    op.alter_column("buckets", "created_at", existing_type=sa.DateTime(timezone=True), nullable=False, existing_server_default=sa.func.now())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column("buckets", "created_at", existing_type=sa.DateTime(timezone=True), nullable=True, existing_server_default=sa.func.now())
+    op.alter_column("buckets", "name", existing_type=sa.String(), nullable=True)
+    op.alter_column("files", "created_at", existing_type=sa.DateTime(timezone=True), nullable=True, existing_server_default=sa.func.now())
+    op.alter_column("files", "file_size", existing_type=sa.BigInteger(), nullable=True)
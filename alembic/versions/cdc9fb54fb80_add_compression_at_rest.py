@@ -0,0 +1,36 @@
+"""add compression at rest
+
+Revision ID: cdc9fb54fb80
+Revises: 9107d3da9b20
+Create Date: 2026-10-17 16:40:12.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cdc9fb54fb80'
+down_revision: Union[str, Sequence[str], None] = '9107d3da9b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("buckets", sa.Column("compression", sa.String(), nullable=True))
+    op.add_column("blobs", sa.Column("stored_size", sa.BigInteger(), nullable=True))
+    op.add_column("blobs", sa.Column("compression", sa.String(), nullable=True))
+    op.add_column("files", sa.Column("stored_size", sa.BigInteger(), nullable=True))
+    op.add_column("files", sa.Column("compression", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("files", "compression")
+    op.drop_column("files", "stored_size")
+    op.drop_column("blobs", "compression")
+    op.drop_column("blobs", "stored_size")
+    op.drop_column("buckets", "compression")
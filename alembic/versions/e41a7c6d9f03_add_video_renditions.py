@@ -0,0 +1,67 @@
+"""add video renditions
+
+Revision ID: e41a7c6d9f03
+Revises: 5c0e3a9d2b71
+Create Date: 2026-10-17 19:24:11.308645
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e41a7c6d9f03'
+down_revision: Union[str, Sequence[str], None] = '5c0e3a9d2b71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "videos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("blob_id", sa.Integer(), nullable=False),
+        sa.Column("duration", sa.Float(), nullable=True),
+        sa.Column("width", sa.Integer(), nullable=True),
+        sa.Column("height", sa.Integer(), nullable=True),
+        sa.Column("video_codec", sa.String(), nullable=True),
+        sa.Column("audio_codec", sa.String(), nullable=True),
+        sa.Column("bit_rate", sa.BigInteger(), nullable=True),
+        sa.Column("format_name", sa.String(), nullable=True),
+        sa.Column("segment_count", sa.Integer(), nullable=True),
+        sa.Column("hls_size", sa.BigInteger(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.ForeignKeyConstraint(["blob_id"], ["blobs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_videos_id"), "videos", ["id"], unique=False)
+    op.create_index(op.f("ix_videos_blob_id"), "videos", ["blob_id"], unique=True)
+
+    op.create_table(
+        "video_segments",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("video_id", sa.Integer(), nullable=False),
+        sa.Column("sequence", sa.Integer(), nullable=False),
+        sa.Column("duration", sa.Float(), nullable=False),
+        sa.Column("segment_path", sa.String(), nullable=False),
+        sa.Column("segment_size", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.ForeignKeyConstraint(["video_id"], ["videos.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("video_id", "sequence", name="uq_video_segments_video_sequence"),
+    )
+    op.create_index(op.f("ix_video_segments_id"), "video_segments", ["id"], unique=False)
+    op.create_index(op.f("ix_video_segments_video_id"), "video_segments", ["video_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_video_segments_video_id"), table_name="video_segments")
+    op.drop_index(op.f("ix_video_segments_id"), table_name="video_segments")
+    op.drop_table("video_segments")
+    op.drop_index(op.f("ix_videos_blob_id"), table_name="videos")
+    op.drop_index(op.f("ix_videos_id"), table_name="videos")
+    op.drop_table("videos")
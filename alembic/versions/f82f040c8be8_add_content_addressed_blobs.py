@@ -0,0 +1,54 @@
+"""add content addressed blobs
+
+Revision ID: f82f040c8be8
+Revises: 8090f367c2f7
+Create Date: 2026-10-17 16:01:20.778809
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f82f040c8be8'
+down_revision: Union[str, Sequence[str], None] = '8090f367c2f7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "blobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("sha256_hash", sa.String(), nullable=False),
+        sa.Column("md5_hash", sa.String(), nullable=True),
+        sa.Column("blob_size", sa.BigInteger(), nullable=False),
+        sa.Column("blob_path", sa.String(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_blobs_id"), "blobs", ["id"], unique=False)
+    op.create_index(op.f("ix_blobs_sha256_hash"), "blobs", ["sha256_hash"], unique=True)
+
+    op.add_column("files", sa.Column("sha256_hash", sa.String(), nullable=True))
+    op.add_column("files", sa.Column("blob_id", sa.Integer(), nullable=True))
+    op.create_index(op.f("ix_files_sha256_hash"), "files", ["sha256_hash"], unique=False)
+    op.create_index(op.f("ix_files_blob_id"), "files", ["blob_id"], unique=False)
+    op.create_foreign_key("fk_files_blob_id_blobs", "files", "blobs", ["blob_id"], ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint("fk_files_blob_id_blobs", "files", type_="foreignkey")
+    op.drop_index(op.f("ix_files_blob_id"), table_name="files")
+    op.drop_index(op.f("ix_files_sha256_hash"), table_name="files")
+    op.drop_column("files", "blob_id")
+    op.drop_column("files", "sha256_hash")
+
+    op.drop_index(op.f("ix_blobs_sha256_hash"), table_name="blobs")
+    op.drop_index(op.f("ix_blobs_id"), table_name="blobs")
+    op.drop_table("blobs")
@@ -0,0 +1,246 @@
+"""
+Local stand-in for the Vercel Blob REST API, so BlobStorageBackend can be
+exercised offline. Objects are kept as plain files under a root directory.
+
+    python tools/blob_server.py --port 9000 --root ./.blob-server
+
+then run the API with STORAGE_BACKEND=blob, BLOB_BASE_URL=http://127.0.0.1:9000
+and any BLOB_READ_WRITE_TOKEN (checked only when --token is given).
+A development tool, kept out of Backend/ so it isn't deployed with the app.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# Range handling is shared with the API
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "Backend" / "api"))
+from Helpers.http_range import RangeNotSatisfiable, parse_range_header
+
+COPY_BUFFER = 64 * 1024
+
+
+class BlobRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real service
+    root: Path = Path("./.blob-server")
+    token: Optional[str] = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # HELPERS
+
+    def _resolve(self, key: str) -> Optional[Path]:
+        path = (self.root / key).resolve()
+        if not key or self.root.resolve() not in path.parents:
+            return None
+        return path
+
+    def _object_path(self) -> Optional[Path]:
+        return self._resolve(self.path.split("?", 1)[0].lstrip("/"))
+
+    def _authorized(self) -> bool:
+        if not self.token:
+            return True
+        return self.headers.get("Authorization") == f"Bearer {self.token}"
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_empty(self, status: int, headers: Tuple[Tuple[str, str], ...] = ()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _iter_body(self):
+        """Yield the request body, decoding chunked transfer encoding"""
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            while True:
+                size = int(self.rfile.readline().split(b";", 1)[0].strip(), 16)
+                if size == 0:
+                    # Trailer section ends with an empty line
+                    while self.rfile.readline() not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                remaining = size
+                while remaining:
+                    chunk = self.rfile.read(min(COPY_BUFFER, remaining))
+                    if not chunk:
+                        return
+                    remaining -= len(chunk)
+                    yield chunk
+                self.rfile.readline()
+        else:
+            remaining = int(self.headers.get("Content-Length") or 0)
+            while remaining:
+                chunk = self.rfile.read(min(COPY_BUFFER, remaining))
+                if not chunk:
+                    return
+                remaining -= len(chunk)
+                yield chunk
+
+    def _drain_body(self):
+        for _ in self._iter_body():
+            pass
+
+    # VERBS
+
+    def do_PUT(self):
+        path = self._object_path()
+        if not self._authorized():
+            self._drain_body()
+            return self._send_json(403, {"error": "forbidden"})
+        if path is None:
+            self._drain_body()
+            return self._send_json(400, {"error": "invalid pathname"})
+        if path.exists() and self.headers.get("x-allow-overwrite") != "1":
+            self._drain_body()
+            return self._send_json(400, {"error": "blob already exists"})
+
+        # A copy: the new object's content is an existing one's, named by fromUrl
+        from_url = parse_qs(self.path.split("?", 1)[1] if "?" in self.path else "").get("fromUrl", [None])[0]
+        source = None
+        if from_url is not None:
+            self._drain_body()
+            source = self._resolve(urlsplit(from_url).path.lstrip("/"))
+            if source is None or not source.is_file():
+                return self._send_json(404, {"error": "source blob not found"})
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".partial")
+        if source is not None:
+            shutil.copyfile(source, tmp_path)
+        else:
+            with open(tmp_path, "wb") as f:
+                for chunk in self._iter_body():
+                    f.write(chunk)
+        tmp_path.replace(path)
+
+        key = path.relative_to(self.root.resolve()).as_posix()
+        host = self.headers.get("Host", f"{self.server.server_address[0]}:{self.server.server_address[1]}")
+        self._send_json(200, {
+            "url": f"http://{host}/{key}",
+            "pathname": key,
+            "contentType": self.headers.get("Content-Type", "application/octet-stream")
+        })
+
+    def do_GET(self):
+        if not self.path.split("?", 1)[0].lstrip("/"):
+            return self._list()
+        self._serve(send_body=True)
+
+    def _list(self):
+        """The list endpoint: pages of objects in key order; the cursor is the last key sent"""
+        if not self._authorized():
+            return self._send_json(403, {"error": "forbidden"})
+        query = parse_qs(self.path.split("?", 1)[1] if "?" in self.path else "")
+        limit = min(int(query.get("limit", ["1000"])[0]), 1000)
+        cursor = query.get("cursor", [""])[0]
+        root = self.root.resolve()
+        keys = []
+        for directory, _, names in os.walk(root):
+            for name in names:
+                key = (Path(directory) / name).relative_to(root).as_posix()
+                if key > cursor and not name.endswith(".partial"):
+                    keys.append(key)
+        keys.sort()
+        host = self.headers.get("Host", f"{self.server.server_address[0]}:{self.server.server_address[1]}")
+        blobs = []
+        for key in keys[:limit]:
+            stat = (root / key).stat()
+            blobs.append({
+                "url": f"http://{host}/{key}",
+                "pathname": key,
+                "size": stat.st_size,
+                "uploadedAt": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat()
+            })
+        has_more = len(keys) > limit
+        self._send_json(200, {"blobs": blobs, "cursor": blobs[-1]["pathname"] if has_more else None, "hasMore": has_more})
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def _serve(self, send_body: bool):
+        path = self._object_path()
+        if path is None or not path.is_file():
+            return self._send_empty(404)
+
+        size = path.stat().st_size
+        try:
+            byte_range = parse_range_header(self.headers.get("Range"), size)
+        except RangeNotSatisfiable:
+            return self._send_empty(416, (("Content-Range", f"bytes */{size}"),))
+
+        start, end = byte_range or (0, size - 1)
+        length = max(end - start + 1, 0)
+        self.send_response(206 if byte_range else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(length))
+        if byte_range:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if not send_body:
+            return
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = length
+            while remaining:
+                chunk = f.read(min(COPY_BUFFER, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                self.wfile.write(chunk)
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return self._send_json(403, {"error": "forbidden"})
+        path = self._object_path()
+        if path is None or not path.is_file():
+            return self._send_empty(404)
+        path.unlink()
+        self._send_empty(200)
+
+
+def start_blob_server(root: str, host: str = "127.0.0.1", port: int = 0, token: Optional[str] = None):
+    """
+    Start the stand-in server on a background thread.
+    Returns (server, base_url); call server.shutdown() to stop it.
+    """
+    root_path = Path(root)
+    root_path.mkdir(parents=True, exist_ok=True)
+    handler = type("Handler", (BlobRequestHandler,), {"root": root_path, "token": token})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Vercel Blob stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--root", default="./.blob-server")
+    parser.add_argument("--token", default=None)
+    args = parser.parse_args()
+
+    server, base_url = start_blob_server(args.root, args.host, args.port, args.token)
+    print(f"Blob stand-in serving {args.root} at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()